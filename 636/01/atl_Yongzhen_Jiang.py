@@ -3,148 +3,102 @@
 # Student ID :  1162376
 # ================================================================
  
-from datetime import datetime, date, timedelta     # datetime module is required for working with dates
-import re                                          # used to check against email format
+from datetime import date                          # datetime module is required for working with dates
+from bisect import bisect_right                    # used to page through query results
+import os                                          # used to read page sizes from environment variables
+import sys                                         # the profiler wraps the functions of this module, see main()
 
-# use namedtuple to receive data which is easy to access value with field name, rather than with integer index.
-# but we could also use normal tuples here
-from collections import namedtuple
+# tours and customers are read and changed through a storage backend (in memory or SQLite), see atl_storage.py
+from atl_storage import open_storage, TOURS
 
-# Make the variables and function in atl_data.py available in this code (without needing 'atl_data.' prefix)
-from atl_data import customers, tours, unique_id, display_formatted_row   
+# reports (options 2, 3 and 4) read from a point-in-time snapshot, so changes made meanwhile never show half way, see atl_versions.py
+from atl_versions import VersionedBackend
 
-# color code for in command line
-# red = "\033[91m"
-# green = "\033[92m"
-# blue = "\033[94m"
-# yellow = "\033[93m"
-# magenta = "\033[95m"
-# cyan = "\033[96m"
-# reset = "\033[0m"
+# the reports of options 3 and 4 are kept rendered until a tour changes, see atl_report_cache.py
+from atl_report_cache import ReportCache
 
-# some helper functions for printing with color
-def red(format_str):
-    return format_str.replace("{", "\033[91m{").replace("}", "}\033[0m")
+# email and date rules are shared with the bulk importer, see atl_validation.py
+from atl_validation import is_email, is_valid_date
 
-def green(format_str):
-    return format_str.replace("{", "\033[92m{").replace("}", "}\033[0m")
+# tables and colours are drawn by the renderer: buffered output, colours only on a terminal, see atl_render.py
+from atl_render import Buffer, Column, Table, paint
 
-def blue(format_str):
-    return format_str.replace("{", "\033[94m{").replace("}", "}\033[0m")
+# customers can be found with a query (option 7), see atl_query.py
+from atl_query import QueryError, explain, run_query
 
-def yellow(format_str):
-    return format_str.replace("{", "\033[93m{").replace("}", "}\033[0m")
+# long listings are shown page by page, see atl_pager.py
+from atl_pager import page_through
+from atl_customer_store import name_key
 
-def magenta(format_str):
-    return format_str.replace("{", "\033[95m{").replace("}", "}\033[0m")
+# Listings longer than one page switch to the pager (options 1 and 2)
+CUSTOMER_PAGE_SIZE = int(os.environ.get("ATL_PAGE_SIZE", "20"))          # customers per page
+GROUP_PAGE_SIZE = int(os.environ.get("ATL_GROUP_PAGE_SIZE", "5"))        # tour groups per page
 
-def cyan(format_str):
-    return format_str.replace("{", "\033[96m{").replace("}", "}\033[0m")
+# Option 5 only lists every customer up to this many, above it the customer is searched for by name or email (see atl_search.py)
+CUSTOMER_LIST_LIMIT = int(os.environ.get("ATL_CUSTOMER_LIST_LIMIT", "100"))
+SEARCH_RESULTS = int(os.environ.get("ATL_SEARCH_RESULTS", "10"))          # best matches shown for a search
+
+# Tables are defined once, each column with its minimum width (a column grows to fit its widest cell)
+CUSTOMER_TABLE = Table([Column("ID", 5, None), Column("First Name", 15, None), Column("Family Name", 15, None),
+                        Column("Birth Date", 15, None), Column("E-Mail", 40, None)], header_colours=["green"] * 5)
+TOUR_GROUP_TABLE = Table([Column("No", 5, None), Column("Tour Group", 33, None), Column("Tour Date", 48, None)], header_colours=["green"] * 3)
+TOUR_TABLE = Table([Column("Tour", 12, None), Column("", 33, "green")], header_colours=[None, "cyan"])
+DESTINATION_TABLE = Table([Column("Destination", 20, "cyan"), Column("Tour", 35, "green")])
 
 def print_warning(s):
-    print("\033[91m{}\033[0m".format(s))
+    print(paint(s, "red"))
 
 def print_success(s):
-    print("\033[92m{}\033[0m".format(s))
+    print(paint(s, "green"))
 
 
 # ----------------------- Start of Internal functions -----------------------
-def display_customer_list(customers):
+def display_customer_list(customers, out=None):
     """
-    Display all customer"""
-
-    print("-"*106)
-    format_str = "| {: <5} | {: <15} | {: <15} | {: <15} | {: <40} |"            # Use the same format_str for column headers and rows to ensure consistent spacing. 
-    display_formatted_row(["ID","First Name","Family Name","Birth Date","E-Mail"], green(format_str))     # Use the display_formatted_row() function to display the column headers with consistent spacing
-    print("-"*106)
-
-    if len(customers) == 0:
-        # Display None Customer if no customer is within this group
-        display_formatted_row(["None Customer"], "| {: <102} |")
-
-    else:
-        # sort customers by family name first and then by first name
-        customers = sorted(customers, key=lambda c: c[1])
-        customers = sorted(customers, key=lambda c: c[2])
-        
-        # display customer record
-        for customer in customers:
-            id = customer[0]
-            first_name = customer[1]
-            family_name = customer[2]
-            birthdate = customer[3].strftime("%d %b %Y")
-            email = customer[4]
+    Display all customer.
+    customers must be in (family name, first name) order already, the storage keeps them in that order (see atl_name_order.py).
+    out is the output Buffer to add the table to, if not given the table is written out straight away."""
 
-            display_formatted_row([id,first_name,family_name,birthdate,email],format_str)     # Use the display_formatted_row() function to display each row with consistent spacing
+    if out is None:
+        with Buffer() as out:
+            return display_customer_list(customers, out)
 
-    print("-"*106)
+    # display customer records, "None Customer" if no customer is within this group
+    rows = ((c[0], c[1], c[2], c[3].strftime("%d %b %Y"), c[4]) for c in customers)
+    CUSTOMER_TABLE.render(rows, out, empty_text="None Customer")
 
 
 def display_tour_groups(tour_group_list):
     """
     Display tour groups, the left column No is the index sequence for tour groups. User selects this number to choose a tour group."""
 
-    print()
-    print("-"*96)
-    format_str = "| {: <5} | {: <33} | {: <48} |"
-    # display header
-    display_formatted_row(["No", "Tour Group", "Tour Date"], green(format_str))
-    print("-"*96)
-
-    # display tour groups as table of: (Sequence No, tour name, tour date)
-    for index, tg in enumerate(tour_group_list):
-        display_formatted_row([index + 1, tg.header.name, tg.header.date.strftime("%d %b %Y")], format_str)
-    
-    print("-"*96)
-
-
-def is_email(email):
-    """
-    Check email address format using regex"""
+    with Buffer() as out:
+        out.line()
+        # display tour groups as table of: (Sequence No, tour name, tour date)
+        rows = ((index + 1, tg.header.name, tg.header.date.strftime("%d %b %Y")) for index, tg in enumerate(tour_group_list))
+        TOUR_GROUP_TABLE.render(rows, out)
 
-    email_patter = r"^\S+@\S+\.\S+$"
-    return re.match(email_patter, email)
 
-
-def is_valid_date(birth_date):
+def is_customer_id_existed(id):
     """
-    Check whether the birth date is a valid date"""
-
-    try:
-        birth_date = datetime.strptime(birth_date, "%d/%m/%Y")
+    Check whether the customer id is already existed"""
 
-        # check whether the date is later than today
-        if birth_date.date() > date.today():
-            return "The date input is later than today"
-        # check whether the date is earlier than 110 years ago
-        elif birth_date.date() < yearsago(110, date.today()):
-            return "The date input is earlier than 110 years ago"
-        else:
-            return birth_date.date()
-    except ValueError:      # Incorrect date format which should be 'dd/mm/yyyy'
-        return "Incorrect date format"
+    return db.customer_exists(id)
 
 
-def yearsago(years, current_date=None):
+def search_customers(text):
     """
-    Calcuate the date which is a number of years ago. Need to check whether that year was a leap year and the current date is 29 Feb."""
+    Show the customers whose names or email match text best (prefixes and misspellings too), best first"""
 
-    if current_date is None:
-        current_date = datetime.today().date()
+    if text.strip() == "":
+        print_warning("Please input a customer id, or a name or email to search for.\n")
+        return
 
-    try:
-        # It was not a leap year
-        return current_date.replace(year=current_date.year - years)
-    except ValueError:
-        # Leap year and is 29 Feb, then replace the date as 28 Feb
-        return current_date.replace(year=current_date.year - 100, month=2, day=28)
-
-
-def is_customer_id_existed(id):
-    """
-    Check whether the customer id is already existed"""
-
-    return id in [c[0] for c in customers]
+    found = db.search_customers(text, SEARCH_RESULTS)
+    if len(found) == 0:
+        print_warning("No customer matches {!r}, please try again (input :q to quit).\n".format(text.strip()))
+        return
+    display_customer_list(found)
 
 
 def is_tour_group_existed(index, tour_group_list):
@@ -160,7 +114,8 @@ def is_customer_already_in_tour_group(customer_id, index, tour_group_list):
     Check whether the customer id is already existed in the tour group.
     see data structure of tour_group_list in function get_tour_groups"""
 
-    return customer_id in tour_group_list[index].member_list
+    header = tour_group_list[index].header
+    return db.is_member(header.name, header.date, customer_id)          # indexed lookup in the backend
 
 
 def is_customer_age_valid(customer_id, index, tour_group_list):
@@ -168,19 +123,9 @@ def is_customer_age_valid(customer_id, index, tour_group_list):
     Check whether the age of the customer is equal or larger than the restricted age.
     see data structure of tour_group_list in function get_tour_groups"""
 
-    date_of_birth = [c[3] for c in customers if c[0] == customer_id][0] # get the birth date of the customer
     age_restricted = tour_group_list[index].age_restriction             # get the restricted age of the tour group
 
-    return get_customer_age(date_of_birth) >= age_restricted
-
-
-def get_customer_age(birthdate):
-    """
-    Get the customer's age"""
-
-    today = date.today()
-    # get the customer's age
-    return today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
+    return db.is_eligible(customer_id, age_restricted)                  # compare the birth date with today's cutoff for that age
 
 
 def _add_customer_to_tourgroup(customer_id, index, tour_group_list):
@@ -188,166 +133,96 @@ def _add_customer_to_tourgroup(customer_id, index, tour_group_list):
     Add the customer into the tour group selected.
     see data structure of tour_group_list in function get_tour_groups"""
 
-    group_date = tour_group_list[index].header.date                         # get tour group date
-    new_member_list = tour_group_list[index].member_list + [customer_id]    # get new customer id into customer member list
+    header = tour_group_list[index].header                                  # get tour group (name, date)
 
-    current_groups = tours[tour_group_list[index].header.name]["groups"]    # get the "groups" dict within the tour
+    db.add_member(header.name, header.date, customer_id)                    # add the customer to the group in the backend
 
-    current_groups.update({                                                 # udpate the "groups" dict to add new customer
-        group_date: new_member_list
-    })
 
-
-def get_tour_groups(name_descending=False, date_descending=False):
+def get_tour_groups(name_descending=False, date_descending=False, view=None):
     """
-    Re-structure tours data, grouped by a namedtuple with name header = (tour_name, tour_date), and sorted by tour_name ascending, tour_date ascending.
-    Because pair of (tour_name, tour_date) is unique.
+    Get tour groups from the storage backend, as a list of namedtuple with name header = (tour_name, tour_date),
+    sorted by tour_name ascending, tour_date ascending. Because pair of (tour_name, tour_date) is unique.
     
-    Finally the data structure will be list of following namedtuple:
+    The data structure is list of following namedtuple (see atl_tour_groups.py):
     (header, age_restriction, member_list) -> (("name" "date"), age_restriction, member_list) -> (("UK", date(2023,7,10)), 0, [816,923,343])
     
-    name_descending & date_descending controls order by direction (ascending or descending)"""
-
-    tour_group_list = []
-    tour_group = namedtuple("TourGroup", "header age_restriction member_list")
-    tour_group_header = namedtuple("TourGroupHeader", "name date")              # header is embedded named tuple
-
-
-    # Transform tours data into a list of namedtuple ("header age_restriction memeber_list"), where header is another namedtuple ("name date")
-    # Finally: ("("name date") age_restriction member_list") -> (("WestEurope", date(2023,8,15)), 0, [810,801])
-    for tour in tours.items():
-        for group in tour[1]["groups"].items():
-            header = tour_group_header(tour[0], group[0])
-            tour_group_list.append(tour_group(header, tour[1]["age_restriction"], group[1]))
-    
-    # sort by group date ascending (use reverse=True for descending)
-    tour_group_list = sorted(tour_group_list, key=lambda x: x.header.date, reverse=date_descending)
+    name_descending & date_descending controls order by direction (ascending or descending)
+    view is a snapshot to read from (see list_customers_by_tourgroup), the backend itself if not given"""
 
-    # sort by group name ascending (use reversed=True for descending)
-    tour_group_list = sorted(tour_group_list, key=lambda x: x.header.name, reverse=name_descending)
+    return (db if view is None else view).tour_groups(name_descending, date_descending)
 
-    return tour_group_list
 
-
-def display_customer_by_tour_group(tour_group_list):
+def display_customer_by_tour_group(tour_group_list, view=None):
     """
     Display customers grouped by tour group.
-    see data structure of tour_group_list in function get_tour_groups"""
+    see data structure of tour_group_list in function get_tour_groups, the members are read from view as in get_tour_groups"""
 
-    customers_dict = get_customers_dict(customers)  # convert customer list into dict, customer id as the key
+    view = db if view is None else view
 
     # Calculate max length of tour name
     max_length = max([len(tour_group.header.name) for tour_group in tour_group_list])
 
-    for tg in tour_group_list:
-        print()
-
-        # print("-"*106)
-        print(" Tour  ", end="")
-        display_tour_group_header(tg.header.name, tg.header.date, max_length)   # print tour group header (name, date)
-
-        customer_list = []                                                      # get customer list with full customer info
-        for c in tg.member_list:
-            customer_list.append(customers_dict[c])
+    with Buffer() as out:
+        for tg in tour_group_list:
+            out.line()
+            display_tour_group_header(tg.header.name, tg.header.date, max_length, out)     # print tour group header (name, date)
 
-        display_customer_list(customer_list)                                    # display customer list
+            customer_list = view.group_members_by_name(tg.header.name, tg.header.date)  # members with full customer info, in name order
+            display_customer_list(customer_list, out)                                   # display customer list
 
-        # if len(tg.member_list) == 0:
-        #     display_customer_list([])                                           
-        # else:
-        #     customer_list = []
-        #     for c in tg.member_list:
-        #         customer_list.append(customers_dict[c])
-        #     display_customer_list(customer_list)
 
-
-def display_tour_group_header(tour_name, tour_date, max_length):
+def display_tour_group_header(tour_name, tour_date, max_length, out):
     """
     Display tour group header as tour name, tour date, tour month."""
 
-    format_str = "\033[94m{: <" + str(max_length) + "}\033[0m        Date  \033[96m{: <15}\033[0m  Month  \033[95m{: <40}\033[0m "
-    display_formatted_row([tour_name, tour_date.strftime("%d %b %Y"), tour_date.strftime("%b %Y"), ], format_str)
+    out.line(" Tour  " + paint("{: <{}}".format(tour_name, max_length), "blue")
+             + "        Date  " + paint("{: <15}".format(tour_date.strftime("%d %b %Y")), "cyan")
+             + "  Month  " + paint("{: <40}".format(tour_date.strftime("%b %Y")), "magenta") + " ")
 
 
 def display_tour_details(tours):
     """
-    Display tour details"""
-    
-    for tour in tours:
-        # print(tour[0])
-        print()
-        print("-"*52)
-        print("| Tour         |", end="")
-        display_formatted_row([tour[0]], cyan(" {: <33} |"))
-        print("-"*52)
-        print("| Destinations |", end="")
-        first_line_mark = True                              # mark whether this is the first itinerary in that tour
-        for itinerary in sorted(tour[1]["itinerary"]):
-            if not first_line_mark:                         # only display tour name one time for multiple itinerary
-                print("|              |", end="")
-            display_formatted_row([itinerary], green(" {: <33} |"))
-            first_line_mark = False
-        print("-"*52)
+    Display tour details, tours are (tour name, itinerary, age restriction) as get_tour_details gives them"""
 
+    with Buffer() as out:
+        for name, itinerary, _ in tours:
+            out.line()
+            # tour name as the header, then destinations (the label "Destinations" only on the first line)
+            rows = (("Destinations" if i == 0 else "", destination) for i, destination in enumerate(sorted(itinerary)))
+            TOUR_TABLE.render(rows, out, header=["Tour", name])
 
-def get_all_destinations_with_tour():
-    """
-    Get all destinations, each with a tour list whose itinerary contains this destination
+
+def get_tour_details():
     """
+    Get (tour name, itinerary, age restriction) of every tour, sorted by tour name, as they were when the snapshot was taken.
+    Only these are kept in the report cache: not the tours themselves, whose member lists are big and keep changing."""
 
-    destinations = set()
+    with db.snapshot() as view:
+        return [(name, tuple(tour["itinerary"]), tour["age_restriction"]) for name, tour in view.tour_details()]
 
-    # Add all destinations into a set (so there"s no duplicate destination)
-    for tour in tours.items():
-        destinations |= set(tour[1]["itinerary"])
 
-    # Sort destinations by name ascending
-    destinations = sorted(destinations)
+def get_all_destinations_with_tour():
+    """
+    Get all destinations sorted by name, each with a sorted tour list whose itinerary contains this destination.
+    The backend already keeps this order (destination index or SQL index), so it is a straight walk."""
 
-    # Create a list of touple, each tuple is a pair of (destination, tour_list)
-    destinations_tour = []
-    for d in destinations:
-        tour_list = []
-        for tour in tours.items():
-            if d in tour[1]["itinerary"]:           # check whether this destination is within that tour
-                tour_list.append(tour[0])
-        tour_list = sorted(tour_list)               # sort tour by tour name
-        destinations_tour.append((d, tour_list))
-    
-    return destinations_tour
+    # list of touple, each tuple is a pair of (destination, tour_list), as they were when the snapshot was taken
+    with db.snapshot() as view:
+        return list(view.destinations())
 
 
 def display_destinations_with_tour(destintions):
     """
     Display destinations"""
 
-    print()
-
-    format_str_header = "| {: <20} | {: <35} |"
-    format_str = "| \033[96m{: <20}\033[0m | \033[92m{: <35}\033[0m |"
-
-    print("-"*62)
-    display_formatted_row(["Destination", "Tour"], format_str_header)       # display header (Destination, Tour)
-    print("-"*62)
-
-    for destination, tour_list in destintions:
-        first_line_mark = True                                              # remark whether this is the first tour that visits the destination
-        for tour in tour_list:
-            if first_line_mark:
-                display_formatted_row([destination, tour], format_str)
-                first_line_mark = False
-            else:
-                display_formatted_row(["", tour], format_str)               # display distination only one time if multiple tours visit it
-    
-    print("-"*62)
-
-
-def get_customers_dict(customers):
-    """
-    Convert customer list to dictionary, using customer id as the key.
-    The purpose is to find customer by customer id quickly"""
+    def rows():
+        for destination, tour_list in destintions:
+            for i, tour in enumerate(tour_list):
+                yield destination if i == 0 else "", tour                  # display distination only one time if multiple tours visit it
 
-    return {c[0]: [c[0], c[1], c[2], c[3], c[4]] for c in customers}
+    with Buffer() as out:
+        out.line()
+        DESTINATION_TABLE.render(rows(), out)
 
 
 def get_user_input(prompt, validation=None):
@@ -383,9 +258,9 @@ def get_user_input(prompt, validation=None):
 
 def _add_new_customer(new_customer):
     """
-    Add new customer into customers"""
+    Add new customer into the storage backend"""
 
-    customers.append([unique_id(), *new_customer])              # add a new customer into customers list
+    db.add_customer(*new_customer)                              # add a new customer with the next available id
 
 
 # ----------------------- End of Internal functions -----------------------
@@ -400,8 +275,15 @@ def list_all_customers():
     This is an example of how to produce basic output."""
 
     print()
+
+    if db.customer_count() > CUSTOMER_PAGE_SIZE:
+        # too many customers for one screen: fetch and display one page at a time
+        page_through(lambda after, skip: db.customer_page(after, CUSTOMER_PAGE_SIZE, skip), name_key,
+                     db.customer_count(), CUSTOMER_PAGE_SIZE, display_customer_list)
+        return
+
     # display function to display customers. so that it could be reused by other functions
-    display_customer_list(customers)
+    display_customer_list(db.customers_by_name())
 
     input("\nPress Enter to continue.")
 
@@ -410,11 +292,19 @@ def list_customers_by_tourgroup():
     """
     Lists Customer details (including birth date), grouped by tour then tour group."""
 
-    # Get tour groups, see data structure in function get_tour_groups
-    tour_group_list = get_tour_groups()
-    
-    # Display tour groups
-    display_customer_by_tour_group(tour_group_list)
+    # the whole listing is read from one snapshot, also across pages, so enrollments made meanwhile don't show half way
+    with db.snapshot() as view:
+        if view.group_count() > GROUP_PAGE_SIZE:
+            # too many tour groups for one screen: fetch and display one page of groups at a time
+            page_through(lambda after, skip: view.tour_group_page(after, GROUP_PAGE_SIZE, skip), lambda tg: tuple(tg.header),
+                         view.group_count(), GROUP_PAGE_SIZE, lambda groups: display_customer_by_tour_group(groups, view))
+            return
+
+        # Get tour groups, see data structure in function get_tour_groups
+        tour_group_list = get_tour_groups(view=view)
+        
+        # Display tour groups
+        display_customer_by_tour_group(tour_group_list, view)
 
     input("\nPress Enter to continue.")
 
@@ -423,11 +313,8 @@ def list_tour_details():
     """
     List the tours and all locations visited."""
     
-    # Sort tours by tour name
-    tours_sorted = sorted(tours.items(), key=lambda x: x[0])
-    
-    # Display sorted tours
-    display_tour_details(tours_sorted)
+    # Get tours sorted by tour name and display them, or print the report kept from last time if no tour changed since
+    print(reports.get_rendered(("tour details",), [TOURS], display_tour_details, get_tour_details), end="")
     
     input("\nPress Enter to continue.")
 
@@ -436,12 +323,15 @@ def add_customer_to_tourgroup():
     """
     Choose a customer, then a tour & group, add customers to tour groups only if they meet the minimum age requirement """
 
-    # display customer list
-    display_customer_list(customers)
+    # display customer list, unless there are too many customers to read through: then they are searched for
+    if db.customer_count() <= CUSTOMER_LIST_LIMIT:
+        display_customer_list(db.customers_by_name())
+    else:
+        print("\nThere are {} customers, search for one by name or email to find the id.".format(db.customer_count()))
     
-    # Input and validate customer id
+    # Input and validate customer id, anything that is not a number is searched for
     while True:
-        customer_id = input("Please input a customer id (input :q to quit): ")
+        customer_id = input("Please input a customer id, or a name or email to search for (input :q to quit): ")
 
         if customer_id.lower() == ":q":
             input("\nPress Enter to continue.")
@@ -453,11 +343,16 @@ def add_customer_to_tourgroup():
                 print_warning("Customer ID not existing, please try again (input :q to quit).\n")
             else:
                 break
-        except ValueError:                                  # input is not an integer
-            print_warning("Please input an integer.\n")
+        except ValueError:                                  # input is not an integer: search for it
+            search_customers(customer_id)
     
-    # Get tour groups
-    tour_group_list = get_tour_groups()
+    # Get tour groups, only those the customer is old enough to join
+    tour_group_list = db.eligible_groups(customer_id, get_tour_groups())
+
+    if len(tour_group_list) == 0:
+        print_warning("The customer is not old enough to join any tour group.\n")
+        input("\nPress Enter to continue.")
+        return
 
     # Display tour groups
     display_tour_groups(tour_group_list)
@@ -528,53 +423,114 @@ def list_all_destinations():
     """
     List all destinations that ATL Visit and the tours that visit them"""
 
-    destinations = get_all_destinations_with_tour()     # get all destinations with a tour list which visits them
-    display_destinations_with_tour(destinations)        # display the destinations with tour names
+    # get all destinations with a tour list which visits them, and display them with tour names (kept until a tour changes)
+    print(reports.get_rendered(("destinations",), [TOURS], display_destinations_with_tour, get_all_destinations_with_tour), end="")
 
     input("\nPress Enter to continue.")
 
 
+def query_customers():
+    """
+    Find customers with a query, e.g. family_name ^= 'Char' and age >= 18 and tour = 'UK' (the language is in atl_query.py).
+    "explain <query>" shows which index the query would use instead of running it."""
+
+    while True:
+        text = input("\nPlease input a query, or explain <query> to see its plan (input :q to quit):\n").strip()
+        if text == ":q":
+            break
+        try:
+            if text.lower().startswith("explain "):
+                print("\n".join(explain(db, text[len("explain "):])))
+                continue
+            customers = run_query(db, text).customers
+        except QueryError as e:
+            print_warning(str(e))
+            continue
+
+        print()
+        if len(customers) > CUSTOMER_PAGE_SIZE:
+            # the results are in name order, so they are paged with the same cursors as option 1
+            keys = [name_key(c) for c in customers]
+
+            def fetch(after, skip):
+                start = (0 if after is None else bisect_right(keys, tuple(after))) + skip
+                return customers[start:start + CUSTOMER_PAGE_SIZE]
+
+            page_through(fetch, name_key, len(customers), CUSTOMER_PAGE_SIZE, display_customer_list)
+        else:
+            display_customer_list(customers)
+        print_success("{} customer(s) found.".format(len(customers)))
+
+
 def disp_menu():
     """
     Displays the menu and current date.  No parameters required.
     """
-    print("\033[94m==== WELCOME TO AOTEAROA TOURS MANAGEMENT SYSTEM ====\033[00m")
+    print(paint("==== WELCOME TO AOTEAROA TOURS MANAGEMENT SYSTEM ====", "blue"))
     print(" 1 - List Customers")
     print(" 2 - List Customers By Tour Groups")
     print(" 3 - List Tours and their details")
     print(" 4 - List all Tours that visit Destinations")
     print(" 5 - Add Existing Customer to Tour Group")
     print(" 6 - Add New Customer")
+    print(" 7 - Find Customers with a Query")
     print(" X - eXit (stops the program)")
 
 
 
 # ------------ This is the main program ------------------------
 
-# Don't change the menu numbering or function names in this menu.
-# Although you can add arguments to the function calls, if you wish.
-# Repeat this loop until the user enters an "X" or "x"
-response = ""
-while response != "X":
-    # Display menu for the first time, and ask for response
-    disp_menu()
-    # Convert input to upper case to accept both 'x' and 'X'
-    response = input("Please enter menu choice: ").upper()
-    if response == "1":
-        list_all_customers()
-    elif response == "2":
-        list_customers_by_tourgroup()
-    elif response == "3":
-        list_tour_details()
-    elif response == "4":
-        list_all_destinations()
-    elif response == "5":
-        add_customer_to_tourgroup()
-    elif response == "6":
-        add_new_customer()
-    elif response != "X":
-        print("\n*** Invalid response, please try again (enter 1-6 or X)")
-
-    print("")
-
-print("\n\033[94m=== Thank you for using the AOTEAROA TOURS MANAGEMENT SYSTEM! ===\033[0m\n")
+db = None       # the storage backend, opened by main() (atl_cli.py runs the same operations without the menu)
+reports = None  # the report cache of options 3 and 4, made by main()
+
+
+def main():
+    """
+    Run the menu until the user enters "X" """
+
+    global db, reports
+
+    # Open the storage backend once at startup (ATL_STORAGE=memory or sqlite), with snapshots for the reports
+    db = VersionedBackend(open_storage())
+    reports = ReportCache(db)
+
+    # ATL_PROFILE=metrics.json times every operation of the session, see atl_profile.py (not even imported when off)
+    if os.environ.get("ATL_PROFILE") or os.environ.get("ATL_CPROFILE"):
+        from atl_profile import profile_menu
+        profile_menu(sys.modules[__name__], db)
+
+    # Don't change the menu numbering or function names in this menu.
+    # Although you can add arguments to the function calls, if you wish.
+    # Repeat this loop until the user enters an "X" or "x"
+    response = ""
+    while response != "X":
+        # Display menu for the first time, and ask for response
+        disp_menu()
+        # Convert input to upper case to accept both 'x' and 'X'
+        response = input("Please enter menu choice: ").upper()
+        if response == "1":
+            list_all_customers()
+        elif response == "2":
+            list_customers_by_tourgroup()
+        elif response == "3":
+            list_tour_details()
+        elif response == "4":
+            list_all_destinations()
+        elif response == "5":
+            add_customer_to_tourgroup()
+        elif response == "6":
+            add_new_customer()
+        elif response == "7":
+            query_customers()
+        elif response != "X":
+            print("\n*** Invalid response, please try again (enter 1-7 or X)")
+
+        print("")
+
+    db.close()
+
+    print("\n" + paint("=== Thank you for using the AOTEAROA TOURS MANAGEMENT SYSTEM! ===", "blue") + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Benchmarks of the menu operations on generated datasets (atl_generate.py), without the menu: the functions of atl_Yongzhen_Jiang.py
+# are called directly (their output is thrown away) against a backend filled with a dataset of the size asked for.
+# For each operation: wall time per call, calls per second, and the peak memory allocated by one call (tracemalloc).
+#
+# Run:      python atl_bench.py run [--sizes 1k,100k,1M] [--storage memory|sqlite] [--seed 1] [--save results.json]
+# Compare:  python atl_bench.py compare before.json after.json [--threshold 10]
+#
+# Sizes: 1k = 1,000 customers in 10 groups, 100k = 100,000 customers in 1,000 groups,
+# 1M = 1,000,000 customers in 100,000 groups, or customers:groups, e.g. 5000:50.
+# compare lists the change in calls per second of every operation found in both runs,
+# and exits with status 1 if any operation got slower by more than the threshold (percent).
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+SIZES = {"1k": (1000, 10), "100k": (100000, 1000), "1M": (1000000, 100000)}
+
+MIN_TIME = 0.2              # seconds each operation is repeated for (at least one call)
+MAX_CALLS = 100000
+
+
+class Discard:
+    """
+    An output stream that throws everything away, so that display functions are timed without the terminal"""
+
+    def write(self, s):
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+def parse_size(name):
+    if name in SIZES:
+        return SIZES[name]
+    customers, groups = name.split(":")
+    return int(customers), int(groups)
+
+
+def open_backend(storage, tours, customers, directory):
+    from atl_storage import MemoryBackend, SQLiteBackend
+
+    if storage == "sqlite":
+        return SQLiteBackend(os.path.join(directory, "bench.db"), tours, customers)
+    return MemoryBackend(tours, customers)
+
+
+def operations(menu, db, rng):
+    """
+    The operations to time as (name, function) pairs. Each function does one call of the operation."""
+
+    groups = menu.get_tour_groups()
+    customer_count = db.customer_count()
+    ids = [c.id for c in db.customers_by_name(0, 1000)] or [0]
+    keys = [(c.family_name, c.first_name, c.id) for c in db.customer_page(None, 1000)]
+    today = date.today()
+
+    def pick_customer():
+        return rng.choice(ids)
+
+    def add_customer():
+        menu._add_new_customer(["Bench", "Mark", today - timedelta(days=rng.randrange(365 * 18, 365 * 80)), "bench@mark.nz"])
+
+    def add_to_group():
+        # option 5 as the menu does it: check, then add
+        index = rng.randrange(len(groups))
+        customer_id = pick_customer()
+        if not menu.is_customer_already_in_tour_group(customer_id, index, groups) and menu.is_customer_age_valid(customer_id, index, groups):
+            menu._add_customer_to_tourgroup(customer_id, index, groups)
+
+    return [
+        ("get_tour_groups", lambda: menu.get_tour_groups()),
+        ("display_tour_groups", lambda: menu.display_tour_groups(groups)),
+        ("display_customer_by_tour_group (one page)", lambda: menu.display_customer_by_tour_group(db.tour_group_page(None, menu.GROUP_PAGE_SIZE))),
+        ("display_customer_by_tour_group (all)", lambda: menu.display_customer_by_tour_group(menu.get_tour_groups())),
+        ("display_customer_list (first page)", lambda: menu.display_customer_list(db.customer_page(None, menu.CUSTOMER_PAGE_SIZE))),
+        ("customer_page (keyset, random)", lambda: db.customer_page(rng.choice(keys), menu.CUSTOMER_PAGE_SIZE)),
+        ("customer_page (last page)", lambda: db.customer_page(None, menu.CUSTOMER_PAGE_SIZE, max(0, customer_count - menu.CUSTOMER_PAGE_SIZE))),
+        ("display_tour_details", lambda: menu.display_tour_details(menu.get_tour_details())),
+        ("get_all_destinations_with_tour", lambda: menu.get_all_destinations_with_tour()),
+        ("display_destinations_with_tour", lambda: menu.display_destinations_with_tour(menu.get_all_destinations_with_tour())),
+        ("is_customer_id_existed", lambda: menu.is_customer_id_existed(pick_customer())),
+        ("is_customer_age_valid", lambda: menu.is_customer_age_valid(pick_customer(), rng.randrange(len(groups)), groups)),
+        ("is_customer_already_in_tour_group", lambda: menu.is_customer_already_in_tour_group(pick_customer(), rng.randrange(len(groups)), groups)),
+        ("eligible_groups (option 5)", lambda: db.eligible_groups(pick_customer(), groups)),
+        ("add new customer (option 6)", add_customer),
+        ("add customer to tour group (option 5)", add_to_group),
+    ]
+
+
+def measure(function):
+    """
+    Time the function: call it until MIN_TIME has passed, then once more with tracemalloc for its peak memory"""
+
+    function()                                      # warm up (caches, lazy indexes)
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_TIME or calls >= MAX_CALLS:
+            break
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"calls": calls, "seconds_per_call": elapsed / calls, "ops_per_sec": calls / elapsed, "peak_kib": round(peak / 1024, 1)}
+
+
+def run(sizes, storage, seed, out=sys.stdout):
+    import atl_Yongzhen_Jiang as menu
+    from atl_generate import generate
+    from atl_versions import VersionedBackend
+
+    results = []
+    for size in sizes:
+        customer_count, group_count = parse_size(size)
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            tours, customers = generate(customer_count, group_count, seed)
+            generated = time.perf_counter() - started
+            db = open_backend(storage, tours, customers, directory)
+            del customers
+            setup = time.perf_counter() - started - generated
+            out.write("\n{} ({:,} customers, {:,} groups, {}): generated in {:.2f}s, loaded in {:.2f}s, peak RSS {:,} MiB\n".format(
+                size, customer_count, group_count, storage, generated, setup, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+            out.write("  {:<45} {:>14} {:>14} {:>12}\n".format("operation", "time/call", "calls/s", "peak KiB"))
+            results.append({"size": size, "operation": "load", "calls": 1, "seconds_per_call": setup, "ops_per_sec": 1 / setup, "peak_kib": None})
+
+            db = menu.db = VersionedBackend(db)         # as the menu opens it, the reports read from snapshots
+            rng = random.Random(seed)
+            with contextlib.redirect_stdout(Discard()):
+                timed = [(name, measure(function)) for name, function in operations(menu, db, rng)]
+            for name, result in timed:
+                out.write("  {:<45} {:>12.3f}ms {:>14,.0f} {:>12,.1f}\n".format(name, result["seconds_per_call"] * 1000, result["ops_per_sec"], result["peak_kib"]))
+                results.append(dict(size=size, operation=name, **result))
+            db.close()
+            menu.db = None
+
+    return {"meta": {"date": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                     "platform": platform.platform(), "storage": storage, "seed": seed},
+            "results": results}
+
+
+def compare(before, after, threshold, out=sys.stdout):
+    """
+    Print the change of every operation found in both runs, return the number of regressions beyond the threshold"""
+
+    old = {(r["size"], r["operation"]): r for r in before["results"]}
+    regressions = 0
+    out.write("{:<6} {:<45} {:>14} {:>14} {:>9}\n".format("size", "operation", "before/s", "after/s", "change"))
+    for r in after["results"]:
+        key = (r["size"], r["operation"])
+        if key not in old:
+            continue
+        change = (r["ops_per_sec"] / old[key]["ops_per_sec"] - 1) * 100
+        mark = ""
+        if change < -threshold:
+            mark = "  SLOWER"
+            regressions += 1
+        elif change > threshold:
+            mark = "  faster"
+        out.write("{:<6} {:<45} {:>14,.0f} {:>14,.0f} {:>+8.1f}%{}\n".format(key[0], key[1], old[key]["ops_per_sec"], r["ops_per_sec"], change, mark))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the menu operations on generated datasets")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("run", help="run the benchmarks")
+    command.add_argument("--sizes", default="1k,100k,1M", help="comma separated: 1k, 100k, 1M or customers:groups")
+    command.add_argument("--storage", choices=("memory", "sqlite"), default="memory")
+    command.add_argument("--seed", type=int, default=1)
+    command.add_argument("--save", help="write the results to this JSON file")
+
+    command = commands.add_parser("compare", help="compare two saved runs")
+    command.add_argument("before")
+    command.add_argument("after")
+    command.add_argument("--threshold", type=float, default=10, help="percent change counted as a regression (default 10)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(args.sizes.split(","), args.storage, args.seed)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=1)
+    else:
+        with open(args.before, encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.after, encoding="utf-8") as f:
+            after = json.load(f)
+        sys.exit(1 if compare(before, after, args.threshold) else 0)
@@ -0,0 +1,235 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Seat booking for tour groups: each group has a capacity, a seat is first held for a while and then confirmed,
+# and when a group is full customers wait in line for a seat (first come, first served).
+#
+#   engine = BookingEngine(db, default_capacity=20)
+#   r = engine.reserve(customer_id, tour_name, tour_date)      # HELD (with a hold_id) or WAITLISTED (with a position)
+#   engine.confirm(r.hold_id)                                  # CONFIRMED: the customer is added to the group
+#   engine.release(r.hold_id)                                  # give the seat back
+#
+# A hold that is not confirmed within hold_seconds expires and its seat is given back. Whenever a seat is given back,
+# the first customer on the waitlist is promoted: they get a hold of their own, and on_promote(reservation) is called.
+# Expired holds are cleared when their group is next used, so no background thread is needed.
+#
+# The atl_data schema has no capacity, so capacities are given to the engine (default_capacity, or set_capacity).
+# Once the engine is used, tour group enrollments should all go through it, otherwise its seat counts are wrong.
+#
+# Concurrency: every group has its own lock (KeyedLocks from atl_locking.py), there is no lock over all groups,
+# so reservations for different departures never wait for each other. The customer is read before the group's lock
+# is taken, without the customers lock either, so it doesn't hold up other groups. Use a ThreadSafeBackend for db
+# when the engine is used from many threads. See atl_booking_bench.py for reservations per second under contention.
+
+import heapq
+import itertools
+import time
+from collections import deque, namedtuple
+
+from datetime import date
+
+from atl_eligibility import birthdate_cutoff
+from atl_enroll import ALREADY_MEMBER, NO_CUSTOMER, NO_GROUP, TOO_YOUNG
+from atl_locking import KeyedLocks
+
+HELD = "held"
+WAITLISTED = "waitlisted"
+CONFIRMED = "confirmed"
+RELEASED = "released"
+EXPIRED = "expired"
+REJECTED = "rejected"
+
+ALREADY_BOOKED = "Customer already holds a seat or is waiting for one in this tour group"
+NO_HOLD = "Hold not existing"
+
+# status: one of the above, hold_id: for HELD (None otherwise), expires: clock time the hold runs out,
+# position: place on the waitlist (1 = next) for WAITLISTED, reason: why it was REJECTED
+Reservation = namedtuple("Reservation", "status customer_id tour date hold_id expires position reason")
+
+
+class GroupSeats:
+    """
+    The seats of one tour group: confirmed members, holds and the waitlist"""
+
+    def __init__(self, capacity, confirmed, age_restriction):
+        self.capacity = capacity
+        self.confirmed = confirmed          # members of the group
+        self.age_restriction = age_restriction
+        self.holds = {}                     # customer id -> (hold id, expires)
+        self.expiry = []                    # heap of (expires, hold id, customer id), may hold stale entries
+        self.waitlist = deque()             # customer ids, first come first served
+        self.waiting = set()
+
+    def free(self):
+        return self.capacity - self.confirmed - len(self.holds)
+
+
+class BookingEngine:
+    """
+    Capacity, seat holds and waitlists for tour groups on top of a storage backend"""
+
+    def __init__(self, db, default_capacity=20, capacities=None, hold_seconds=600, clock=time.monotonic, on_promote=None, locks=None):
+        self.db = db
+        self.hold_seconds = hold_seconds
+        self._clock = clock
+        self._on_promote = on_promote
+        self._locks = KeyedLocks() if locks is None else locks
+        self._hold_ids = itertools.count(1)
+        self._holds = {}                    # hold id -> (tour name, tour date, customer id)
+
+        capacities = capacities or {}
+        self._groups = {tuple(tg.header): GroupSeats(capacities.get(tuple(tg.header), default_capacity), len(tg.member_list), tg.age_restriction)
+                        for tg in db.tour_groups()}
+
+    def _seats(self, tour_name, tour_date):
+        """
+        The seats of the group, with its expired holds cleared. Call with the group's lock held."""
+
+        seats = self._groups[(tour_name, tour_date)]
+        now = self._clock()
+        freed = False
+        while seats.expiry and seats.expiry[0][0] <= now:
+            expires, hold_id, customer_id = heapq.heappop(seats.expiry)
+            if seats.holds.get(customer_id, (None,))[0] == hold_id:            # not confirmed or released meanwhile
+                del seats.holds[customer_id]
+                self._holds.pop(hold_id, None)
+                freed = True
+        if freed:
+            self._promote(tour_name, tour_date, seats)
+        return seats
+
+    def _hold(self, tour_name, tour_date, seats, customer_id):
+        hold_id = next(self._hold_ids)
+        expires = self._clock() + self.hold_seconds
+        seats.holds[customer_id] = (hold_id, expires)
+        heapq.heappush(seats.expiry, (expires, hold_id, customer_id))
+        self._holds[hold_id] = (tour_name, tour_date, customer_id)
+        return Reservation(HELD, customer_id, tour_name, tour_date, hold_id, expires, None, None)
+
+    def _promote(self, tour_name, tour_date, seats):
+        """
+        Give free seats to the customers first on the waitlist"""
+
+        while seats.waitlist and seats.free() > 0:
+            customer_id = seats.waitlist.popleft()
+            seats.waiting.discard(customer_id)
+            reservation = self._hold(tour_name, tour_date, seats, customer_id)
+            if self._on_promote is not None:
+                self._on_promote(reservation)
+
+    def _group_of(self, hold_id):
+        group = self._holds.get(hold_id)
+        return (None, None, None) if group is None else group
+
+    # ---------- reservations ----------
+    def reserve(self, customer_id, tour_name, tour_date):
+        """
+        Hold a seat in the group for the customer, or put them on the waitlist if the group is full.
+        The same rules as option 5 apply (customer exists, not in the group yet, old enough), otherwise REJECTED."""
+
+        def rejected(reason):
+            return Reservation(REJECTED, customer_id, tour_name, tour_date, None, None, None, reason)
+
+        if (tour_name, tour_date) not in self._groups:
+            return rejected(NO_GROUP)
+        # the customer is read once, before the group's lock: a birth date never changes, and reading it takes
+        # no lock shared by all groups (see ThreadSafeBackend.customer_birthdate)
+        birthdate = self.db.customer_birthdate(customer_id)
+        if birthdate is None:
+            return rejected(NO_CUSTOMER)
+        old_enough = birthdate <= birthdate_cutoff(self._groups[(tour_name, tour_date)].age_restriction, date.today())
+
+        with self._locks((tour_name, tour_date)):
+            seats = self._seats(tour_name, tour_date)
+            if customer_id in seats.holds or customer_id in seats.waiting:
+                return rejected(ALREADY_BOOKED)
+            if self.db.is_member(tour_name, tour_date, customer_id):
+                return rejected(ALREADY_MEMBER)
+            if not old_enough:
+                return rejected(TOO_YOUNG)
+
+            if seats.free() > 0:
+                return self._hold(tour_name, tour_date, seats, customer_id)
+            seats.waitlist.append(customer_id)
+            seats.waiting.add(customer_id)
+            return Reservation(WAITLISTED, customer_id, tour_name, tour_date, None, None, len(seats.waitlist), None)
+
+    def confirm(self, hold_id):
+        """
+        Turn a hold into a confirmed seat: the customer is added to the group. EXPIRED if the hold ran out first."""
+
+        tour_name, tour_date, customer_id = self._group_of(hold_id)
+        if tour_name is None:
+            return Reservation(EXPIRED, None, None, None, hold_id, None, None, NO_HOLD)
+
+        with self._locks((tour_name, tour_date)):
+            seats = self._seats(tour_name, tour_date)
+            if seats.holds.get(customer_id, (None,))[0] != hold_id:
+                return Reservation(EXPIRED, customer_id, tour_name, tour_date, hold_id, None, None, NO_HOLD)
+            self.db.add_member(tour_name, tour_date, customer_id)
+            del seats.holds[customer_id]
+            del self._holds[hold_id]
+            seats.confirmed += 1
+            return Reservation(CONFIRMED, customer_id, tour_name, tour_date, hold_id, None, None, None)
+
+    def release(self, hold_id):
+        """
+        Give a held seat back before it expires, the first customer on the waitlist gets it"""
+
+        tour_name, tour_date, customer_id = self._group_of(hold_id)
+        if tour_name is None:
+            return Reservation(EXPIRED, None, None, None, hold_id, None, None, NO_HOLD)
+
+        with self._locks((tour_name, tour_date)):
+            seats = self._seats(tour_name, tour_date)
+            if seats.holds.get(customer_id, (None,))[0] != hold_id:
+                return Reservation(EXPIRED, customer_id, tour_name, tour_date, hold_id, None, None, NO_HOLD)
+            del seats.holds[customer_id]
+            del self._holds[hold_id]
+            self._promote(tour_name, tour_date, seats)
+            return Reservation(RELEASED, customer_id, tour_name, tour_date, hold_id, None, None, None)
+
+    def leave_waitlist(self, customer_id, tour_name, tour_date):
+        """
+        Take the customer off the group's waitlist, False if they were not on it"""
+
+        with self._locks((tour_name, tour_date)):
+            seats = self._seats(tour_name, tour_date)
+            if customer_id not in seats.waiting:
+                return False
+            seats.waitlist.remove(customer_id)
+            seats.waiting.discard(customer_id)
+            return True
+
+    # ---------- capacity and state ----------
+    def set_capacity(self, tour_name, tour_date, capacity):
+        """
+        Change the capacity of the group. Seats already confirmed or held are kept even if they no longer fit;
+        if the capacity grows, customers on the waitlist are promoted."""
+
+        with self._locks((tour_name, tour_date)):
+            seats = self._seats(tour_name, tour_date)
+            seats.capacity = capacity
+            self._promote(tour_name, tour_date, seats)
+
+    def hold_of(self, customer_id, tour_name, tour_date):
+        """
+        The customer's current hold in the group as a HELD Reservation (e.g. after being promoted), None if there is none"""
+
+        with self._locks((tour_name, tour_date)):
+            hold = self._seats(tour_name, tour_date).holds.get(customer_id)
+            return None if hold is None else Reservation(HELD, customer_id, tour_name, tour_date, hold[0], hold[1], None, None)
+
+    def availability(self, tour_name, tour_date):
+        """
+        (capacity, confirmed, held, waiting) of the group"""
+
+        with self._locks((tour_name, tour_date)):
+            seats = self._seats(tour_name, tour_date)
+            return seats.capacity, seats.confirmed, len(seats.holds), len(seats.waitlist)
+
+    def waitlist(self, tour_name, tour_date):
+        with self._locks((tour_name, tour_date)):
+            return list(self._seats(tour_name, tour_date).waitlist)
@@ -0,0 +1,114 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Benchmark of the booking engine (atl_booking.py): reservations per second with many threads at once.
+#   hot     every thread books the same departure (the launch-day case)
+#   spread  every thread books a random departure
+# Each attempt reserves a seat for a random customer, then confirms it (10%) or gives it back (90%),
+# so groups fill up slowly, waitlists build up and get promoted. --global-lock runs the same with one lock
+# for all groups instead of a lock per group, for comparison.
+# After each run the groups are checked: never more seats confirmed + held than the capacity, nobody in a group twice,
+# and the engine's count of confirmed seats matches the members in storage.
+#
+# Run: python atl_booking_bench.py [--customers 100000] [--threads 8] [--attempts 5000] [--capacity 50] [--global-lock]
+
+import argparse
+import copy
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+
+def build(customer_count):
+    from atl_data import tours
+    from atl_locking import ThreadSafeBackend
+    from atl_storage import MemoryBackend
+
+    # adults only, so that every customer may join every group
+    customers = [(i, "First{}".format(i % 500), "Family{}".format(i % 2000), date(1960 + i % 40, 1 + i % 12, 1 + i % 28),
+                  "c{}@bench.nz".format(i)) for i in range(1, customer_count + 1)]
+    return ThreadSafeBackend(MemoryBackend(copy.deepcopy(tours), customers))
+
+
+def worker(engine, number, attempts, groups, customer_count, counts, start):
+    from atl_booking import CONFIRMED, HELD
+
+    rng = random.Random(number)
+    held = confirmed = 0
+    start.wait()
+    for _ in range(attempts):
+        tour_name, tour_date = rng.choice(groups)
+        r = engine.reserve(rng.randint(1, customer_count), tour_name, tour_date)
+        if r.status == HELD:
+            held += 1
+            if rng.random() < 0.1:
+                confirmed += engine.confirm(r.hold_id).status == CONFIRMED
+            else:
+                engine.release(r.hold_id)
+    counts.append((held, confirmed))
+
+
+def check(engine, db):
+    problems = []
+    for tg in db.tour_groups():
+        capacity, confirmed, held, waiting = engine.availability(*tg.header)
+        if confirmed + held > capacity:
+            problems.append("{} {}: {} confirmed + {} held > capacity {}".format(*tg.header, confirmed, held, capacity))
+        if confirmed != len(tg.member_list):
+            problems.append("{} {}: engine counts {} confirmed, storage has {} members".format(*tg.header, confirmed, len(tg.member_list)))
+        if any(n > 1 for n in Counter(tg.member_list).values()):
+            problems.append("{} {}: a customer is in the group twice".format(*tg.header))
+    return problems
+
+
+def run(scenario, customer_count, threads, attempts, capacity, global_lock):
+    from atl_booking import BookingEngine
+
+    db = build(customer_count)
+    one_lock = threading.RLock()
+    # existing members count too, so leave room for them on top of the capacity asked for
+    engine = BookingEngine(db, capacities={tuple(tg.header): capacity + len(tg.member_list) for tg in db.tour_groups()},
+                           locks=(lambda key: one_lock) if global_lock else None)
+
+    all_groups = [tuple(tg.header) for tg in db.tour_groups()]
+    groups = all_groups[:1] if scenario == "hot" else all_groups
+    counts = []
+    start = threading.Barrier(threads)
+    pool = [threading.Thread(target=worker, args=(engine, n, attempts, groups, customer_count, counts, start)) for n in range(threads)]
+
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = threads * attempts
+    held = sum(h for h, c in counts)
+    confirmed = sum(c for h, c in counts)
+    waiting = sum(engine.availability(*g)[3] for g in groups)
+    print("{:<6} {:>3} threads  {:>9.0f} reservations/s  ({} attempts in {:.2f}s, {} held, {} confirmed, {} waiting){}".format(
+        scenario, threads, total / elapsed, total, elapsed, held, confirmed, waiting, "  [global lock]" if global_lock else ""))
+    return check(engine, db)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reservations per second of the booking engine under contention")
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--attempts", type=int, default=5000, help="reservation attempts per thread")
+    parser.add_argument("--capacity", type=int, default=50, help="seats per group")
+    parser.add_argument("--global-lock", action="store_true", help="one lock for all groups, for comparison")
+    args = parser.parse_args()
+
+    problems = []
+    for scenario in ("hot", "spread"):
+        problems += run(scenario, args.customers, args.threads, args.attempts, args.capacity, args.global_lock)
+    for problem in problems:
+        print("OVERSOLD/INCONSISTENT: " + problem)
+    if not problems:
+        print("OK: no group oversold")
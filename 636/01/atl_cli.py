@@ -0,0 +1,275 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Non-interactive command line for scripts and nightly jobs: the menu options as subcommands, output as JSON, JSON lines or CSV.
+# Nothing is asked with input() and nothing is paged; the exit status tells whether the command did everything asked.
+#
+# Run: python atl_cli.py [--storage memory|sqlite|snapshot] [--db PATH] [--format json|jsonl|csv] <command> ...      (these options may also follow the command)
+#   list-customers [--offset N] [--limit N]                      option 1, in (family name, first name) order
+#   list-groups [--customers]                                    option 2, --customers gives one row per member with details
+#   tour-details                                                 option 3
+#   destinations                                                 option 4
+#   enroll (--customer-id ID --tour NAME --date DD/MM/YYYY | --file CSV)      option 5, see atl_enroll.py
+#   add-customer --first-name F --family-name N --birth-date DD/MM/YYYY --email E   option 6
+#   query QUERY [--explain]                                      option 7, e.g. "family_name ^= 'Char' and age >= 18", see atl_query.py
+#   search TEXT [--limit N]                                      customers best matching names or email, as option 5 finds them (atl_search.py)
+#
+# --profile FILE times the command, its backend calls and its output (FILE.prom: Prometheus text format, else JSON),
+# --profile-memory adds the memory allocated, --cprofile FILE writes the cProfile stats of the command (see atl_profile.py).
+#
+# Changes are kept by the sqlite backend or with ATL_JOURNAL (see atl_storage.py), the plain memory backend forgets them.
+# Modules are imported by the command that needs them, so a quick command doesn't pay for the others.
+#
+# Exit status: 0 done, 1 a customer or enrollment was rejected (the reasons are in the output), 2 wrong arguments.
+
+import argparse
+import os
+import sys
+
+FORMATS = ("json", "jsonl", "csv")
+
+CUSTOMER_FIELDS = ("id", "first_name", "family_name", "birthdate", "email")
+GROUP_FIELDS = ("tour", "date", "age_restriction", "members")
+GROUP_CUSTOMER_FIELDS = ("tour", "date") + CUSTOMER_FIELDS
+TOUR_FIELDS = ("tour", "age_restriction", "itinerary")
+DESTINATION_FIELDS = ("destination", "tours")
+PLAN_FIELDS = ("chosen", "index", "conditions", "estimated_rows")
+
+
+def plain(value):
+    """
+    Turn a value into something JSON can write: dates as 'YYYY-MM-DD', tuples as lists"""
+
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [plain(v) for v in value]
+    return value
+
+
+def write_records(rows, fields, file_format, out):
+    """
+    Write rows (tuples in the order of fields) to out as a JSON array, JSON lines or CSV with a header.
+    Rows are written one at a time, so a listing of any length is never held in memory as a whole."""
+
+    if file_format == "csv":
+        import csv
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(fields)
+        for row in rows:
+            # lists (itinerary, tours, members) go into one cell, separated by ";"
+            writer.writerow([";".join(map(str, v)) if isinstance(v, (list, tuple)) else plain(v) for v in row])
+        return
+
+    import json
+    records = (json.dumps(dict(zip(fields, map(plain, row))), ensure_ascii=False) for row in rows)
+    if file_format == "jsonl":
+        for record in records:
+            out.write(record + "\n")
+        return
+
+    out.write("[")
+    separator = "\n"
+    for record in records:
+        out.write(separator + record)
+        separator = ",\n"
+    out.write("\n]\n")
+
+
+def _parse_date(parser, s):
+    from atl_validation import parse_date
+    try:
+        return parse_date(s)
+    except ValueError:
+        parser.error("incorrect date {!r}, the format is 'dd/mm/yyyy'".format(s))
+
+
+# ---------- commands: each gets the open backend and the arguments, writes its output and returns the exit status ----------
+def list_customers(db, args, out):
+    stop = None if args.limit is None else args.offset + args.limit
+    write_records(db.customers_by_name(args.offset, stop), CUSTOMER_FIELDS, args.format, out)
+    return 0
+
+
+def list_groups(db, args, out):
+    groups = db.tour_groups()
+    if args.customers:
+        rows = ((tg.header.name, tg.header.date) + tuple(c)
+                for tg in groups for c in db.group_members_by_name(tg.header.name, tg.header.date))
+        write_records(rows, GROUP_CUSTOMER_FIELDS, args.format, out)
+    else:
+        rows = ((tg.header.name, tg.header.date, tg.age_restriction, [c.id for c in db.group_members_by_name(tg.header.name, tg.header.date)])
+                for tg in groups)
+        write_records(rows, GROUP_FIELDS, args.format, out)
+    return 0
+
+
+def tour_details(db, args, out):
+    rows = ((name, tour["age_restriction"], tour["itinerary"]) for name, tour in db.tour_details())
+    write_records(rows, TOUR_FIELDS, args.format, out)
+    return 0
+
+
+def destinations(db, args, out):
+    write_records(db.destinations(), DESTINATION_FIELDS, args.format, out)
+    return 0
+
+
+def enroll(db, args, out):
+    from atl_enroll import EnrollResult, enroll_many, read_enrollments
+
+    if args.file:
+        rows, bad = read_enrollments(args.file)
+    else:
+        rows, bad = [(1, args.customer_id, args.tour, args.date)], []
+    results = sorted(enroll_many(db, rows) + bad, key=lambda r: r.line)
+    write_records(results, EnrollResult._fields, args.format, out)
+    return 0 if all(r.enrolled for r in results) else 1
+
+
+def add_customer(db, args, out):
+    from atl_validation import validate_customer
+
+    customer, reason = validate_customer(args.first_name, args.family_name, args.birth_date, args.email)
+    if customer is None:
+        write_records([(None,) + (args.first_name, args.family_name, args.birth_date, args.email) + (False, reason)],
+                      CUSTOMER_FIELDS + ("added", "reason"), args.format, out)
+        return 1
+
+    customer_id = db.add_customer(*customer)
+    write_records([(customer_id,) + customer + (True, None)], CUSTOMER_FIELDS + ("added", "reason"), args.format, out)
+    return 0
+
+
+def query(db, args, out):
+    from atl_query import QueryError, describe, plan, run_query
+
+    try:
+        if args.explain:
+            # one row per index that applies, the chosen one first
+            rows = ((n == 0, path.index, " and ".join(map(describe, path.conditions)), path.estimate)
+                    for n, path in enumerate(plan(db, args.query)))
+            write_records(rows, PLAN_FIELDS, args.format, out)
+            return 0
+        customers = run_query(db, args.query).customers
+    except QueryError as e:
+        sys.stderr.write("atl_cli.py: error: {}\n".format(e))
+        return 2
+    write_records(customers, CUSTOMER_FIELDS, args.format, out)
+    return 0
+
+
+def search(db, args, out):
+    write_records(db.search_customers(args.text, args.limit), CUSTOMER_FIELDS, args.format, out)
+    return 0
+
+
+def build_parser():
+    def add_common(parser, default):
+        parser.add_argument("--storage", choices=("memory", "sqlite", "snapshot"), default=default,
+                            help="storage backend (default: ATL_STORAGE or memory)")
+        parser.add_argument("--db", default=default, help="SQLite database or snapshot file (default: ATL_DB / ATL_SNAPSHOT)")
+        parser.add_argument("--format", choices=FORMATS, default=default or "json", help="output format (default: json)")
+        parser.add_argument("--profile", default=default, metavar="FILE", help="write timings of the command to FILE (.prom or JSON)")
+        parser.add_argument("--profile-memory", action="store_true", default=default, help="with --profile, also measure memory allocated")
+        parser.add_argument("--cprofile", default=default, metavar="FILE", help="write cProfile stats of the command to FILE")
+
+    parser = argparse.ArgumentParser(prog="atl_cli.py", description="Aotearoa Tours Management System without the menu")
+    add_common(parser, None)
+
+    # the common options can also be given after the command; there they only count if given (SUPPRESS)
+    common = argparse.ArgumentParser(add_help=False)
+    add_common(common, argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("list-customers", parents=[common], help="customers in (family name, first name) order")
+    command.add_argument("--offset", type=int, default=0, help="skip this many customers first")
+    command.add_argument("--limit", type=int, help="at most this many customers")
+    command.set_defaults(run=list_customers)
+
+    command = commands.add_parser("list-groups", parents=[common], help="tour groups in (tour, date) order with their members")
+    command.add_argument("--customers", action="store_true", help="one row per member, with the customer details")
+    command.set_defaults(run=list_groups)
+
+    command = commands.add_parser("tour-details", parents=[common], help="tours with their age restriction and itinerary")
+    command.set_defaults(run=tour_details)
+
+    command = commands.add_parser("destinations", parents=[common], help="destinations with the tours that visit them")
+    command.set_defaults(run=destinations)
+
+    command = commands.add_parser("enroll", parents=[common], help="add existing customers to tour groups")
+    command.add_argument("--customer-id", type=int)
+    command.add_argument("--tour")
+    command.add_argument("--date", help="tour group date, 'dd/mm/yyyy'")
+    command.add_argument("--file", help="CSV file with customer_id, tour, date columns instead of one enrollment")
+    command.set_defaults(run=enroll)
+
+    command = commands.add_parser("add-customer", parents=[common], help="add a new customer with the next available id")
+    command.add_argument("--first-name", required=True)
+    command.add_argument("--family-name", required=True)
+    command.add_argument("--birth-date", required=True, help="'dd/mm/yyyy'")
+    command.add_argument("--email", required=True)
+    command.set_defaults(run=add_customer)
+
+    command = commands.add_parser("query", parents=[common], help="customers matching a query, in name order")
+    command.add_argument("query", help="e.g. \"family_name ^= 'Char' and age >= 18 and tour = 'UK' and date in 2025\"")
+    command.add_argument("--explain", action="store_true", help="show the indexes the query could use instead of running it")
+    command.set_defaults(run=query)
+
+    command = commands.add_parser("search", parents=[common], help="customers whose names or email best match, best first")
+    command.add_argument("text", help="e.g. \"simone char\", prefixes and misspelt words match too")
+    command.add_argument("--limit", type=int, default=10, help="at most this many customers (default: 10)")
+    command.set_defaults(run=search)
+
+    return parser
+
+
+def main(argv=None, out=None):
+    """
+    Run one command, return the exit status"""
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    out = sys.stdout if out is None else out
+
+    if args.command == "enroll":
+        if args.file is None and None in (args.customer_id, args.tour, args.date):
+            parser.error("enroll needs --file, or --customer-id, --tour and --date")
+        if args.date is not None:
+            args.date = _parse_date(parser, args.date)
+    if getattr(args, "offset", 0) < 0 or (getattr(args, "limit", None) or 0) < 0:
+        parser.error("--offset and --limit can't be negative")
+
+    from atl_storage import open_storage
+    db = open_storage(args.storage, args.db)
+    run = args.run
+    profiler = None
+    if args.profile or args.cprofile:
+        from atl_profile import BACKEND_OPERATIONS, Profiler
+        operation = "cli." + args.command
+        profiler = Profiler(memory=bool(args.profile_memory), cprofile={operation: args.cprofile} if args.cprofile else None)
+        profiler.instrument_object(db, "db", BACKEND_OPERATIONS)
+        profiler.instrument_module(sys.modules[__name__], "cli", names=("write_records",))
+        run = profiler.wrap(operation, run)
+        profiler.start()
+    try:
+        return run(db, args, out)
+    finally:
+        db.close()
+        if profiler is not None:
+            profiler.stop()
+            if args.profile:
+                profiler.write(args.profile)
+
+
+if __name__ == "__main__":
+    try:
+        status = main()
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # the reader went away (e.g. piped into head): stop quietly, and don't let Python complain again at exit
+        sys.stdout = open(os.devnull, "w")
+        status = 1
+    sys.exit(status)
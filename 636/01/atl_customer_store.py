@@ -0,0 +1,214 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Customer storage with a hash index on customer id.
+# atl_data.py must not be changed, so the store is built from its `customers` literal at startup.
+#
+# Records are kept column by column rather than as one Python list per customer:
+#   ids and birthdates (as date ordinals) are typed arrays,
+#   first and family names are codes into a string table (dictionary encoding, names repeat a lot),
+#   emails are packed as UTF-8 into one byte buffer (they are nearly all different, so a table would not save anything).
+# A record is only turned back into a Customer namedtuple when it is read.
+# See atl_memory_compare.py for the memory measured against the atl_data layout.
+
+from array import array
+from collections import namedtuple
+from datetime import date
+
+# Same field order as atl_data.customers, so c[0] ... c[4] still works for existing code
+Customer = namedtuple("Customer", "id first_name family_name birthdate email")
+
+
+def name_key(customer):
+    """
+    Sort key of customers: family name, then first name, then id (so that the key is unique)"""
+
+    return (customer.family_name, customer.first_name, customer.id)
+
+
+class StringTable:
+    """
+    Dictionary-encode strings: each distinct string is kept once and referred to by an integer code"""
+
+    def __init__(self):
+        self._strings = []      # code -> string
+        self._codes = {}        # string -> code
+
+    def __len__(self):
+        return len(self._strings)
+
+    def encode(self, s):
+        """
+        Get the code of the string, adding it to the table if it is new"""
+
+        code = self._codes.get(s)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(s)
+            self._codes[s] = code
+        return code
+
+    def decode(self, code):
+        return self._strings[code]
+
+
+class StringHeap:
+    """
+    Pack strings as UTF-8 into one growing buffer, string n is buffer[offsets[n]:offsets[n+1]]"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets = array("q", [0])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def append(self, s):
+        self._buffer += s.encode("utf-8")
+        self._offsets.append(len(self._buffer))
+
+    def get(self, n):
+        return self._buffer[self._offsets[n]:self._offsets[n + 1]].decode("utf-8")
+
+
+class CustomerStore:
+    """
+    Keep customer records indexed by customer id.
+    Each record has the same fields as atl_data.customers: (id, first_name, family_name, birthdate, email)"""
+
+    def __init__(self, customers=()):
+        self._ids = array("q")              # row -> customer id
+        self._birthdates = array("i")       # row -> birthdate as date.toordinal()
+        self._first_names = array("i")      # row -> code in self._names
+        self._family_names = array("i")     # row -> code in self._names
+        self._names = StringTable()         # first and family names
+        self._emails = StringHeap()         # row -> email
+
+        # customer id -> row. Ids are mostly small and dense, so an array indexed directly by id is used (-1 = no customer),
+        # ids far beyond the size of the store go to a dict instead so one odd id can't blow up the array
+        self._rows = array("i")
+        self._sparse_rows = {}
+        self._max_id = 0                    # running max id, so a new id never needs a scan
+
+        for c in customers:
+            self._add(c[0], c[1], c[2], c[3], c[4])
+
+    def _row(self, customer_id):
+        """
+        Get the row of the customer id, None if the id is not existed"""
+
+        if 0 <= customer_id < len(self._rows):
+            row = self._rows[customer_id]
+            return row if row >= 0 else None
+        return self._sparse_rows.get(customer_id)
+
+    def _set_row(self, customer_id, row):
+        if customer_id >= len(self._rows) and customer_id < 4 * len(self._ids) + 1024:
+            self._rows.extend([-1] * (customer_id + 1 - len(self._rows)))
+        if 0 <= customer_id < len(self._rows):
+            self._rows[customer_id] = row
+        else:
+            self._sparse_rows[customer_id] = row
+
+    def _add(self, customer_id, first_name, family_name, birthdate, email):
+        """
+        Append one record to the columns and keep the index and running max id.
+        The id is put in the index last, so a record can be read by id while another thread adds one (see get_birthdate)."""
+
+        row = len(self._ids)
+        self._ids.append(customer_id)
+        self._birthdates.append(birthdate.toordinal())
+        self._first_names.append(self._names.encode(first_name))
+        self._family_names.append(self._names.encode(family_name))
+        self._emails.append(email)
+        self._set_row(customer_id, row)
+
+        if customer_id > self._max_id:
+            self._max_id = customer_id
+
+    def _record(self, row):
+        """
+        Decode the record at this row into a Customer namedtuple"""
+
+        return Customer(self._ids[row],
+                        self._names.decode(self._first_names[row]),
+                        self._names.decode(self._family_names[row]),
+                        date.fromordinal(self._birthdates[row]),
+                        self._emails.get(row))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        for row in range(len(self._ids)):
+            yield self._record(row)
+
+    def __contains__(self, customer_id):
+        return self._row(customer_id) is not None
+
+    def exists(self, customer_id):
+        """
+        Check whether the customer id is already existed"""
+
+        return self._row(customer_id) is not None
+
+    def get(self, customer_id):
+        """
+        Get the customer record by customer id, None if the id is not existed"""
+
+        row = self._row(customer_id)
+        if row is None:
+            return None
+        return self._record(row)
+
+    def name_keys(self):
+        """
+        Iterate name_key (family name, first name, id) of every customer, without decoding the whole records"""
+
+        decode = self._names.decode
+        for row in range(len(self._ids)):
+            yield decode(self._family_names[row]), decode(self._first_names[row]), self._ids[row]
+
+    def get_name_key(self, customer_id):
+        """
+        Get only the name_key (family name, first name, id) of the customer"""
+
+        row = self._row(customer_id)
+        return self._names.decode(self._family_names[row]), self._names.decode(self._first_names[row]), customer_id
+
+    def birthdate_ordinals(self):
+        """
+        Iterate (birthdate ordinal, customer id) of every customer, without decoding the records"""
+
+        return zip(self._birthdates, self._ids)
+
+    def get_birthdate(self, customer_id):
+        """
+        Get only the birth date of the customer, without decoding the whole record.
+        Records are only appended and never changed, so this needs no lock while other threads add customers."""
+
+        return date.fromordinal(self._birthdates[self._row(customer_id)])
+
+    def next_id(self):
+        """
+        Return the next available ID, one higher than the current maximum ID"""
+
+        return self._max_id + 1
+
+    def add(self, customer_id, first_name, family_name, birthdate, email):
+        """
+        Add a customer whose ID is already decided"""
+
+        if self.exists(customer_id):
+            raise ValueError("Customer ID {} is already existed".format(customer_id))
+        self._add(customer_id, first_name, family_name, birthdate, email)
+
+    def insert(self, first_name, family_name, birthdate, email):
+        """
+        Add a new customer with the next available ID, and return the new ID"""
+
+        customer_id = self.next_id()
+        self._add(customer_id, first_name, family_name, birthdate, email)
+        return customer_id
@@ -0,0 +1,71 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Destination index: destination -> names of the tours whose itinerary visits it.
+# Built once from atl_data.tours and updated whenever a tour's itinerary changes,
+# so listing destinations is a walk over the index rather than a destinations x tours scan.
+
+from bisect import bisect_right, insort
+
+
+class DestinationIndex:
+    """
+    Keep destinations sorted by name, each with a sorted list of tour names visiting it."""
+
+    def __init__(self, tours):
+        self._tours = tours
+        self._destinations = []         # sorted destination names, used for ordered walks and keyset pages
+        self._tours_by_destination = {} # destination -> sorted tour names
+
+        for name, tour in tours.items():
+            self._add_tour(name, tour["itinerary"])
+
+    def _add_tour(self, name, itinerary):
+        for destination in set(itinerary):                  # a tour can visit a destination twice (e.g. start and end)
+            tour_list = self._tours_by_destination.get(destination)
+            if tour_list is None:
+                tour_list = self._tours_by_destination[destination] = []
+                insort(self._destinations, destination)
+            insort(tour_list, name)
+
+    def _remove_tour(self, name, itinerary):
+        for destination in set(itinerary):
+            tour_list = self._tours_by_destination[destination]
+            tour_list.remove(name)
+            if len(tour_list) == 0:                         # no tour visits it any more
+                del self._tours_by_destination[destination]
+                self._destinations.remove(destination)
+
+    def __len__(self):
+        return len(self._destinations)
+
+    def __iter__(self):
+        """
+        Walk (destination, tour_list) pairs in destination order"""
+
+        for destination in self._destinations:
+            yield destination, self._tours_by_destination[destination]
+
+    def tours_for(self, destination):
+        """
+        Get the sorted tour names visiting the destination, empty list if no tour visits it"""
+
+        return self._tours_by_destination.get(destination, [])
+
+    def page(self, after=None, limit=20):
+        """
+        Get up to limit (destination, tour_list) pairs that come after the destination `after` (keyset pagination).
+        Pass the last destination of a page as `after` to get the next page, None starts from the beginning."""
+
+        start = 0 if after is None else bisect_right(self._destinations, after)
+        return [(destination, self._tours_by_destination[destination]) for destination in self._destinations[start:start + limit]]
+
+    def set_itinerary(self, name, itinerary):
+        """
+        Change the itinerary of a tour, both in the tours dict and in the index"""
+
+        self._remove_tour(name, self._tours[name]["itinerary"])
+        self._tours[name]["itinerary"] = itinerary
+        self._add_tour(name, itinerary)
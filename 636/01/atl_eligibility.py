@@ -0,0 +1,149 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Age eligibility for age-restricted tours.
+# A customer is old enough for age_restriction N when they were born on or before the cutoff date (today, N years ago).
+# Customers are kept ordered by birthdate, so "everyone eligible" is one bisect against the cutoff.
+# Cutoffs are worked out once per day for each age restriction, and thrown away when the date changes.
+# New customers are buffered and merged into the birthdate order in one pass at the next lookup,
+# so adding many customers at once (bulk import) doesn't shift the arrays once per customer.
+# The birthdate order is only sorted the first time it is used (is_eligible doesn't need it), so that startup doesn't
+# read every customer (a snapshot's customers are only read when asked for, see atl_snapshot.py).
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from heapq import merge
+
+
+def birthdate_cutoff(age_restriction, today):
+    """
+    Get the latest birth date of someone who is at least age_restriction years old today.
+    If today is 29 Feb and that year was not a leap year, the cutoff is 28 Feb.
+    Ages beyond what a date can hold (negative or thousands of years) give the first or last date there is:
+
+    >>> birthdate_cutoff(18, date(2024, 2, 29))
+    datetime.date(2006, 2, 28)
+    >>> birthdate_cutoff(3000, date(2025, 6, 1)), birthdate_cutoff(-9000, date(2025, 6, 1))
+    (datetime.date(1, 1, 1), datetime.date(9999, 12, 31))
+    """
+
+    year = today.year - age_restriction
+    if year < date.min.year:
+        return date.min
+    if year > date.max.year:
+        return date.max
+    try:
+        return today.replace(year=today.year - age_restriction)
+    except ValueError:
+        return today.replace(year=today.year - age_restriction, day=28)
+
+
+class EligibilityIndex:
+    """
+    Keep customer ids ordered by birthdate, with the age cutoffs of the current day."""
+
+    def __init__(self, customer_store, today=date.today):
+        self._store = customer_store
+        self._today = today             # function returning today's date, can be replaced for testing
+
+        # (birthdate ordinal, customer id) sorted by birthdate, kept in two arrays at the same position,
+        # sorted at the first lookup
+        self._ordinals = None
+        self._ids = None
+
+        self._pending = []              # (birthdate ordinal, customer id) added but not yet merged into the arrays
+
+        self._cutoff_day = None         # the day the cutoffs below were worked out
+        self._cutoffs = {}              # age_restriction -> cutoff as a date ordinal
+
+    def add(self, customer_id, birthdate):
+        """
+        Add a new customer into the birthdate order"""
+
+        if self._ids is not None:       # not sorted yet: it will be sorted with the new customer
+            self._pending.append((birthdate.toordinal(), customer_id))
+
+    def _merge_pending(self):
+        """
+        Merge the customers added since the last lookup into the birthdate order"""
+
+        if self._ids is None:
+            pairs = sorted(self._store.birthdate_ordinals())
+            self._ordinals = array("i", [p[0] for p in pairs])
+            self._ids = array("q", [p[1] for p in pairs])
+            return
+        if len(self._pending) == 0:
+            return
+        if len(self._pending) == 1:
+            ordinal, customer_id = self._pending[0]
+            i = bisect_right(self._ordinals, ordinal)
+            self._ordinals.insert(i, ordinal)
+            self._ids.insert(i, customer_id)
+        else:
+            self._pending.sort()
+            ordinals = array("i")
+            ids = array("q")
+            for ordinal, customer_id in merge(zip(self._ordinals, self._ids), self._pending):
+                ordinals.append(ordinal)
+                ids.append(customer_id)
+            self._ordinals, self._ids = ordinals, ids
+        self._pending = []
+
+    def cutoff(self, age_restriction):
+        """
+        Get the cutoff date ordinal for the age restriction, worked out once per day"""
+
+        today = self._today()
+        if today != self._cutoff_day:   # the day has rolled over, so all cutoffs are out of date
+            self._cutoff_day = today
+            self._cutoffs = {}
+
+        cutoff = self._cutoffs.get(age_restriction)
+        if cutoff is None:
+            cutoff = self._cutoffs[age_restriction] = birthdate_cutoff(age_restriction, today).toordinal()
+        return cutoff
+
+    def is_eligible(self, customer_id, age_restriction):
+        """
+        Check whether the customer is at least age_restriction years old"""
+
+        return self._store.get_birthdate(customer_id).toordinal() <= self.cutoff(age_restriction)
+
+    def eligible_customers(self, age_restriction):
+        """
+        Get the ids of all customers at least age_restriction years old, oldest first"""
+
+        self._merge_pending()
+        return self._ids[:bisect_right(self._ordinals, self.cutoff(age_restriction))]
+
+    def born_between(self, first=None, last=None):
+        """
+        Get the positions (start, stop) of the customers born between the date ordinals first and last
+        (both included, None = no limit), for ids_at()"""
+
+        self._merge_pending()
+        start = 0 if first is None else bisect_left(self._ordinals, first)
+        stop = len(self._ordinals) if last is None else bisect_right(self._ordinals, last)
+        return start, max(start, stop)
+
+    def ids_at(self, start, stop):
+        self._merge_pending()
+        return self._ids[start:stop]
+
+    def eligible_groups(self, customer_id, tour_group_list):
+        """
+        Keep only the tour groups which the customer is old enough to join, in the same order.
+        Each distinct age restriction is checked only once."""
+
+        allowed = {}
+        result = []
+        for tg in tour_group_list:
+            ok = allowed.get(tg.age_restriction)
+            if ok is None:
+                ok = allowed[tg.age_restriction] = self.is_eligible(customer_id, tg.age_restriction)
+            if ok:
+                result.append(tg)
+        return result
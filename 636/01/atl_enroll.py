@@ -0,0 +1,123 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Bulk enrollment of customers into tour groups, e.g. loading a whole charter at once instead of one menu round per person.
+# Every (customer_id, tour, date) row is checked with the same rules as option 5:
+#   the customer exists, the tour group exists, the customer is not already in the group, the customer is old enough.
+# All accepted rows are then added in one batch, and a result is returned for each row.
+#
+# Run: python atl_enroll.py enrollments.csv [--report report.csv]
+# CSV columns: customer_id, tour, date ('dd/mm/yyyy')
+# The storage backend comes from ATL_STORAGE etc. (see atl_storage.py), use sqlite or ATL_JOURNAL to keep the changes.
+
+import argparse
+import csv
+from collections import namedtuple
+
+from atl_validation import parse_date
+
+EnrollResult = namedtuple("EnrollResult", "line customer_id tour date enrolled reason")
+
+# why an enrollment is rejected
+NO_CUSTOMER = "Customer ID not existing"
+NO_GROUP = "Tour group not existing"
+ALREADY_MEMBER = "Customer already in this tour group"
+TOO_YOUNG = "Customer is younger than the age restricted"
+
+
+def check_enrollments(db, rows):
+    """
+    Check (line, customer_id, tour, date) rows against the backend in one pass.
+    A customer listed twice for the same group is only accepted the first time.
+    Return the list of EnrollResult, one per row, in the same order."""
+
+    results = []
+    accepted = set()                # (customer_id, tour, date) accepted so far in this batch
+    age_restrictions = {}           # (tour, date) -> age restriction, None if the group is not existed
+
+    for line, customer_id, tour, group_date in rows:
+        group = (tour, group_date)
+        if group not in age_restrictions:
+            age_restrictions[group] = db.group_age_restriction(tour, group_date)
+
+        if not db.customer_exists(customer_id):
+            reason = NO_CUSTOMER
+        elif age_restrictions[group] is None:
+            reason = NO_GROUP
+        elif (customer_id, tour, group_date) in accepted or db.is_member(tour, group_date, customer_id):
+            reason = ALREADY_MEMBER
+        elif not db.is_eligible(customer_id, age_restrictions[group]):
+            reason = TOO_YOUNG
+        else:
+            reason = None
+            accepted.add((customer_id, tour, group_date))
+
+        results.append(EnrollResult(line, customer_id, tour, group_date, reason is None, reason))
+    return results
+
+
+def enroll_many(db, rows):
+    """
+    Enroll many customers into tour groups. rows are (customer_id, tour, date) or (line, customer_id, tour, date).
+    All accepted rows are added in one batch. Return the list of EnrollResult, one per row.
+    A shared backend (atl_locking.py) checks membership again under the group's lock when adding: a customer another
+    writer has added to the group meanwhile is rejected for that row, and the rest of the batch still goes ahead."""
+
+    rows = [row if len(row) == 4 else (line,) + tuple(row) for line, row in enumerate(rows, 1)]
+    results = check_enrollments(db, rows)
+
+    with db.batch():
+        for n, result in enumerate(results):
+            if result.enrolled:
+                try:
+                    db.add_member(result.tour, result.date, result.customer_id)
+                except ValueError as e:
+                    results[n] = result._replace(enrolled=False, reason=str(e))
+    return results
+
+
+def read_enrollments(path):
+    """
+    Read (line, customer_id, tour, date) rows from a CSV file. Rows that can't be read are returned as EnrollResult."""
+
+    rows = []
+    bad = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for record in reader:
+            try:
+                rows.append((reader.line_num, int(record["customer_id"]), record["tour"].strip(), parse_date(record["date"].strip())))
+            except (ValueError, KeyError, AttributeError):
+                bad.append(EnrollResult(reader.line_num, record.get("customer_id"), record.get("tour"), record.get("date"), False,
+                                        "Incorrect customer id, tour or date format"))
+    return rows, bad
+
+
+def write_report(path, results):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(EnrollResult._fields)
+        for result in sorted(results, key=lambda r: r.line):
+            writer.writerow(result)
+
+
+if __name__ == "__main__":
+    from atl_storage import open_storage
+
+    parser = argparse.ArgumentParser(description="Enroll customers into tour groups from a CSV file")
+    parser.add_argument("path")
+    parser.add_argument("--report", help="write the result of every row to this CSV file")
+    args = parser.parse_args()
+
+    db = open_storage()
+    rows, bad = read_enrollments(args.path)
+    results = enroll_many(db, rows) + bad
+    db.close()
+
+    if args.report:
+        write_report(args.report, results)
+
+    enrolled = sum(1 for r in results if r.enrolled)
+    print("Enrolled {}, rejected {}.".format(enrolled, len(results) - enrolled))
@@ -0,0 +1,338 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Synthetic datasets in the atl_data schema (a tours dict with itineraries, age restrictions and dated groups,
+# and a customers list), of any size, for trying out and benchmarking the system beyond the 8 customers of atl_data.py.
+# The same seed and sizes always give exactly the same dataset.
+#
+# Run: python atl_generate.py --customers 1000000 --groups 100000 [--seed 1] [--tours N] [--destinations 200]
+#                             [--format module|csv|jsonl|snapshot] output
+#   module    a Python module like atl_data.py, e.g. output atl_data_big.py, then import atl_data_big
+#   csv       a directory with customers.csv (the atl_import.py columns plus id), tours.csv, groups.csv
+#             and members.csv (the atl_enroll.py columns: customer_id, tour, date)
+#   jsonl     one JSON object per line: the customers first ("type": "customer"), then the tours ("type": "tour")
+#   snapshot  a binary snapshot for ATL_STORAGE=snapshot (see atl_snapshot.py)
+#
+# Skew, so that the data looks like real bookings rather than uniform noise:
+#   households  about a third of the customers come in households of 2 to 5 sharing a family name and an email,
+#               with children among them (so age restrictions matter)
+#   names       common family and first names are far more frequent than rare ones (Zipf-like weights)
+#   tours       some tours and destinations are far more popular than others, and a few departures of each tour
+#               are much larger than the rest
+#
+# Customers are generated one at a time and written out as they come, only the member ids of the groups are kept
+# (in arrays, 8 bytes per membership), so a dataset of millions of customers is written in constant memory per customer.
+# The tours are written after the customers for the same reason (the module and snapshot formats put them back first).
+
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unicodedata
+from array import array
+from bisect import bisect_right
+from datetime import date, timedelta
+from itertools import accumulate
+
+from atl_eligibility import birthdate_cutoff
+
+FORMATS = ("module", "csv", "jsonl", "snapshot")
+
+FIRST_DEPARTURE = date(2025, 1, 6)          # fixed, so that a seed gives the same dataset whatever day it is run
+
+FAMILY_NAMES = ["Smith", "Wilson", "Williams", "Brown", "Taylor", "Jones", "Singh", "Wang", "Li", "Anderson",
+                "Thompson", "Walker", "Nguyen", "Kumar", "Harris", "Martin", "White", "Clarke", "Ngata", "Patel",
+                "Robinson", "Campbell", "Kelly", "Young", "Mitchell", "Chen", "King", "Wood", "Te Whāiti", "Parata",
+                "Tūhoe", "Mahuta", "McArthur", "McLeod", "Charles", "Hopere", "Mathewson", "Ross", "Stewart", "Hēnare"]
+FIRST_NAMES = ["Olivia", "Jack", "Charlotte", "Oliver", "Isla", "Noah", "Amelia", "Leo", "Ava", "George",
+               "Aroha", "Wiremu", "Mere", "Tama", "Ngaio", "Hēmi", "Mīria", "Rāwiri", "Kate", "Simon",
+               "Chloe", "James", "Sophie", "William", "Grace", "Thomas", "Ruby", "Lucas", "Mia", "Hunter",
+               "Priya", "Arjun", "Mei", "Wei", "Anahera", "Kahu", "Tāne", "Manaia", "Samantha", "Charlie"]
+SYLLABLES = ["ka", "ta", "ma", "ra", "wa", "ha", "nga", "ki", "ri", "ti", "ho", "ko", "to", "mo", "ru", "tu",
+             "whe", "pa", "ne", "ro", "ā", "ē", "ō", "ū", "son", "ley", "ton", "ford", "well", "ridge"]
+DOMAINS = ["gmail.com", "xtra.co.nz", "outlook.com", "yahoo.co.nz", "icloud.com", "kiwi.nz", "slingshot.co.nz"]
+PLACES = ["Auckland", "Wellington", "Christchurch", "Queenstown", "Rotorua", "Taupō", "Napier", "Dunedin", "Nelson",
+          "Kaikōura", "Wānaka", "Milford Sound", "Aoraki Mount Cook", "Franz Josef", "Hokitika", "Bay of Islands",
+          "Coromandel", "Tauranga", "Whanganui", "New Plymouth", "Hamilton", "Waitomo", "Akaroa", "Picton",
+          "Abel Tasman", "Stewart Island", "Te Anau", "Ōamaru", "Gisborne", "Cape Reinga", "London", "Paris",
+          "Edinburgh", "Berlin", "Budapest", "Sydney", "Melbourne", "Tokyo", "Kyoto", "Singapore"]
+TOUR_STYLES = ["Highlights", "Explorer", "Discovery", "Escape", "Adventure", "Heritage Trail", "Grand Tour", "Getaway"]
+AGE_RESTRICTIONS = [0, 0, 0, 0, 12, 16, 18]
+
+
+def zipf_weights(n, s=1.0):
+    """
+    Cumulative weights of n items where item k is 1/(k+1)^s as likely as the first, for random.choices"""
+
+    return list(accumulate(1 / (k + 1) ** s for k in range(n)))
+
+
+def coined_name(rng):
+    """
+    A made-up name of 2 to 4 syllables, for the long tail of rare names and places"""
+
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def ascii_fold(s):
+    """
+    Lower case ASCII of a name for an email address: macrons dropped (Tūhoe -> tuhoe), spaces and hyphens removed"""
+
+    s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+    return "".join(ch for ch in s.lower() if ch.isalnum())
+
+
+class Dataset:
+    """
+    A synthetic dataset in the atl_data schema. The tours (without members) are made up front, they are small;
+    customers() then streams the customers and fills the groups as it goes, and tours() gives the tours with their
+    members once the customers have been streamed. customers() can be streamed again, it gives the same customers."""
+
+    def __init__(self, customer_count, group_count, seed=1, tour_count=None, destination_count=200, first_id=1):
+        self.customer_count = customer_count
+        self.group_count = group_count
+        self.seed = seed
+        self.first_id = first_id
+        tour_count = max(1, min(group_count, tour_count or group_count // 20)) if group_count else 0
+
+        rng = random.Random("{}:tours".format(seed))
+        self.destinations = self._names(rng, PLACES, destination_count)
+        self.tour_names = self._tour_names(rng, tour_count)
+        destination_weights = zipf_weights(len(self.destinations))
+
+        # per tour: itinerary, age restriction, and the dates of its groups; groups are numbered across all tours
+        self._tours = []
+        self._groups = []                   # group number -> (tour number, date, birth ordinal cutoff)
+        group_weights = []
+        tour_weights = [1 / (t + 1) for t in range(tour_count)]         # popular tours first
+        for t, name in enumerate(self.tour_names):
+            itinerary = []
+            while len(itinerary) < min(rng.randint(3, 9), len(self.destinations)):
+                destination = rng.choices(self.destinations, cum_weights=destination_weights)[0]
+                if destination not in itinerary:
+                    itinerary.append(destination)
+            age_restriction = rng.choice(AGE_RESTRICTIONS)
+            dates = []
+            for g in range(group_count // tour_count + (t < group_count % tour_count)):
+                group_date = FIRST_DEPARTURE + timedelta(days=7 * g + t % 7)
+                dates.append(group_date)
+                self._groups.append((t, group_date, birthdate_cutoff(age_restriction, group_date).toordinal()))
+                # a few departures of a tour are much larger than the rest
+                group_weights.append(tour_weights[t] * rng.paretovariate(1.5))
+            self._tours.append((name, itinerary, age_restriction, dates))
+        self._group_weights = list(accumulate(group_weights))
+        self.members = [array("q") for _ in self._groups]
+
+    @staticmethod
+    def _names(rng, known, count):
+        names = list(known[:count])
+        seen = set(names)
+        while len(names) < count:
+            name = coined_name(rng)
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+        return names
+
+    def _tour_names(self, rng, count):
+        names = []
+        seen = set()
+        for t in range(count):
+            name = "{} {}".format(self.destinations[t % len(self.destinations)], rng.choice(TOUR_STYLES))
+            if name in seen:
+                name = "{} {}".format(name, t)
+            seen.add(name)
+            names.append(name)
+        return names
+
+    def _join_groups(self, rng, customer_id, birth_ordinal):
+        """
+        Put the customer in 0 to 3 groups, the popular ones more likely, only those they are old enough for"""
+
+        if not self._groups:
+            return
+        joined = []
+        for _ in range(rng.choices((0, 1, 2, 3), (30, 45, 18, 7))[0]):
+            g = bisect_right(self._group_weights, rng.random() * self._group_weights[-1])
+            g = min(g, len(self._groups) - 1)
+            if birth_ordinal <= self._groups[g][2] and g not in joined:
+                joined.append(g)
+                self.members[g].append(customer_id)
+
+    def customers(self):
+        """
+        Stream the customers as [id, first_name, family_name, birthdate, email], in increasing id order"""
+
+        rng = random.Random("{}:customers".format(self.seed))
+        self.members = [array("q") for _ in self._groups]
+        family_weights = zipf_weights(len(FAMILY_NAMES), 0.8)
+        first_weights = zipf_weights(len(FIRST_NAMES), 0.8)
+        today = FIRST_DEPARTURE.toordinal()
+
+        customer_id = self.first_id
+        household = 0
+        end = self.first_id + self.customer_count
+        while customer_id < end:
+            household += 1
+            size = rng.choices((1, 2, 3, 4, 5), (65, 15, 10, 7, 3))[0]
+            if rng.random() < 0.7:
+                family_name = rng.choices(FAMILY_NAMES, cum_weights=family_weights)[0]
+            else:
+                family_name = coined_name(rng)
+            parent_age = rng.randint(20, 85)
+            email = None
+            for member in range(min(size, end - customer_id)):
+                first_name = rng.choices(FIRST_NAMES, cum_weights=first_weights)[0]
+                if member < 2:              # adults of the household, around the same age
+                    age = max(18, parent_age + rng.randint(-4, 4))
+                else:                       # children
+                    age = rng.randint(0, min(17, max(0, parent_age - 18)))
+                birthdate = date.fromordinal(today - age * 365 - rng.randrange(365))
+                if email is None:           # the whole household shares the email of its first member
+                    email = "{}.{}{}@{}".format(ascii_fold(first_name), ascii_fold(family_name), household % 1000,
+                                                rng.choice(DOMAINS))
+                self._join_groups(rng, customer_id, birthdate.toordinal())
+                yield [customer_id, first_name, family_name, birthdate, email]
+                customer_id += 1
+
+    def tours(self):
+        """
+        The atl_data-shaped tours dict, with the members of the customers streamed so far"""
+
+        groups = iter(self.members)
+        return {name: {"itinerary": list(itinerary), "age_restriction": age_restriction,
+                       "groups": {group_date: list(next(groups)) for group_date in dates}}
+                for name, itinerary, age_restriction, dates in self._tours}
+
+    def tour_rows(self):
+        """
+        (name, itinerary, age restriction, [(date, member id array), ...]) per tour, without copying the member lists"""
+
+        groups = iter(self.members)
+        for name, itinerary, age_restriction, dates in self._tours:
+            yield name, itinerary, age_restriction, [(group_date, next(groups)) for group_date in dates]
+
+
+def generate(customer_count, group_count, seed=1, **options):
+    """
+    The whole dataset in memory as (tours, customers), as atl_data has them"""
+
+    dataset = Dataset(customer_count, group_count, seed, **options)
+    customers = list(dataset.customers())
+    return dataset.tours(), customers
+
+
+# ---------- writers: stream the customers to disk, then write the tours ----------
+def write_module(path, dataset):
+    """
+    Write a Python module like atl_data.py. The customers are spooled to a temporary file first,
+    so that the tours (which are only complete after the customers) come first as in atl_data.py."""
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        for c in dataset.customers():
+            spool.write("\t[{}, {!r}, {!r}, date({},{},{}), {!r}],\n".format(c[0], c[1], c[2], c[3].year, c[3].month, c[3].day, c[4]))
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# Generated by atl_generate.py: {:,} customers, {:,} tour groups, seed {}\n\n".format(
+                dataset.customer_count, dataset.group_count, dataset.seed))
+            f.write("from datetime import date,datetime,timedelta\n\n\n")
+            f.write("tours = {\n")
+            for name, itinerary, age_restriction, groups in dataset.tour_rows():
+                f.write("    {!r}: {{\"itinerary\":{!r},\n".format(name, itinerary))
+                f.write("           \"age_restriction\":{},\n".format(age_restriction))
+                f.write("           \"groups\":{{{}}}}},\n".format(",".join(
+                    "date({},{},{}):{}".format(d.year, d.month, d.day, list(members)) for d, members in groups)))
+            f.write("}\n\n\n")
+            f.write("# [id, first_name, family_name, birthdate ,email address]\n")
+            f.write("customers = [\n")
+            spool.seek(0)
+            shutil.copyfileobj(spool, f)
+            f.write("]\n")
+
+
+def write_csv(directory, dataset):
+    """
+    Write customers.csv, tours.csv, groups.csv and members.csv into the directory (made if missing)"""
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "customers.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("id", "first_name", "family_name", "birth_date", "email"))
+        for c in dataset.customers():
+            writer.writerow((c[0], c[1], c[2], c[3].strftime("%d/%m/%Y"), c[4]))
+
+    with open(os.path.join(directory, "tours.csv"), "w", newline="", encoding="utf-8") as tours_file, \
+            open(os.path.join(directory, "groups.csv"), "w", newline="", encoding="utf-8") as groups_file, \
+            open(os.path.join(directory, "members.csv"), "w", newline="", encoding="utf-8") as members_file:
+        tours_csv, groups_csv, members_csv = csv.writer(tours_file), csv.writer(groups_file), csv.writer(members_file)
+        tours_csv.writerow(("tour", "age_restriction", "itinerary"))
+        groups_csv.writerow(("tour", "date"))
+        members_csv.writerow(("customer_id", "tour", "date"))
+        for name, itinerary, age_restriction, groups in dataset.tour_rows():
+            tours_csv.writerow((name, age_restriction, ";".join(itinerary)))
+            for group_date, members in groups:
+                day = group_date.strftime("%d/%m/%Y")
+                groups_csv.writerow((name, day))
+                members_csv.writerows((customer_id, name, day) for customer_id in members)
+
+
+def write_jsonl(path, dataset):
+    """
+    Write one JSON object per line: customers (with the atl_import.py keys plus id), then tours"""
+
+    with open(path, "w", encoding="utf-8") as f:
+        for c in dataset.customers():
+            f.write(json.dumps({"type": "customer", "id": c[0], "first_name": c[1], "family_name": c[2],
+                                "birth_date": c[3].strftime("%d/%m/%Y"), "email": c[4]}, ensure_ascii=False) + "\n")
+        for name, itinerary, age_restriction, groups in dataset.tour_rows():
+            f.write(json.dumps({"type": "tour", "tour": name, "itinerary": itinerary, "age_restriction": age_restriction,
+                                "groups": {group_date.isoformat(): list(members) for group_date, members in groups}},
+                               ensure_ascii=False) + "\n")
+
+
+def write_snapshot(path, dataset):
+    from atl_snapshot import SnapshotWriter
+
+    with SnapshotWriter(path) as writer:
+        for c in dataset.customers():
+            writer.add_customer(*c)
+        for name, itinerary, age_restriction, groups in dataset.tour_rows():
+            writer.add_tour(name, itinerary, age_restriction, groups)
+
+
+WRITERS = {"module": write_module, "csv": write_csv, "jsonl": write_jsonl, "snapshot": write_snapshot}
+
+
+def guess_format(path):
+    if path.endswith(".py"):
+        return "module"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if path.endswith(".snap"):
+        return "snapshot"
+    return "csv"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset in the atl_data schema")
+    parser.add_argument("output", help="file (module, jsonl, snapshot) or directory (csv) to write")
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=10, help="number of tour groups (departures)")
+    parser.add_argument("--tours", type=int, help="number of tours (default: one for every 20 groups)")
+    parser.add_argument("--destinations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--format", choices=FORMATS, help="default: from the output name (.py, .jsonl, .snap, else csv)")
+    args = parser.parse_args()
+
+    if args.customers < 0 or args.groups < 0:
+        parser.error("--customers and --groups must not be negative")
+    dataset = Dataset(args.customers, args.groups, args.seed, tour_count=args.tours, destination_count=args.destinations)
+    WRITERS[args.format or guess_format(args.output)](args.output, dataset)
+    print("{:,} customers in {:,} tour groups of {:,} tours written to {}".format(
+        args.customers, args.groups, len(dataset.tour_names), args.output), file=sys.stderr)
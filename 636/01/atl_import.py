@@ -0,0 +1,153 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Bulk customer import from CSV or JSONL, for loading a partner's whole customer list at once.
+# The file is streamed in chunks, each chunk is validated with the same rules as adding a customer from the menu
+# (see atl_validation.py), and the good rows of each chunk are added in one batch with ids from the backend's counter.
+# Bad rows are written to a reject file with the reason.
+#
+# Run: python atl_import.py customers.csv [--format csv|jsonl] [--rejects rejects.csv] [--batch-size 10000] [--processes 4]
+# Columns (CSV header or JSONL keys): first_name, family_name, birth_date ('dd/mm/yyyy'), email
+# The storage backend comes from ATL_STORAGE etc. (see atl_storage.py), use sqlite or ATL_JOURNAL to keep the import.
+
+import argparse
+import csv
+import json
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+
+from atl_validation import validate_customers
+
+FIELDS = ("first_name", "family_name", "birth_date", "email")
+
+ImportResult = namedtuple("ImportResult", "read accepted rejected first_id last_id")
+
+
+def read_rows(path, file_format=None):
+    """
+    Stream (line number, first_name, family_name, birth_date, email) rows from a CSV or JSONL file.
+    The format is taken from the file extension if not given.
+    A JSONL line that can't be read as those fields gets the reason as a sixth item, so that it is rejected."""
+
+    if file_format is None:
+        file_format = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield (reader.line_num,) + tuple(record.get(field) for field in FIELDS)
+        elif file_format == "jsonl":
+            for line_number, line in enumerate(f, 1):
+                if line.strip() == "":
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield (line_number, None, None, None, None, "The line is not valid JSON")
+                    continue
+                if not isinstance(record, dict):
+                    yield (line_number, None, None, None, None, "The line is not a JSON object")
+                    continue
+                row = tuple(record.get(field) for field in FIELDS)
+                wrong = [field for field, value in zip(FIELDS, row) if value is not None and not isinstance(value, str)]
+                if wrong:
+                    yield (line_number,) + row + ("{} must be a string".format(wrong[0]),)
+                else:
+                    yield (line_number,) + row
+        else:
+            raise ValueError("Unknown file format: {}".format(file_format))
+
+
+def chunks(rows, size):
+    """
+    Split a stream of rows into lists of up to size rows"""
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def validated_chunks(row_chunks, processes=None, today=None):
+    """
+    Validate each chunk, in order. With processes > 1 the chunks are validated in a process pool,
+    with only a few chunks in flight so the file is never read into memory all at once."""
+
+    if today is None:
+        today = date.today()
+
+    if not processes or processes <= 1:
+        for chunk in row_chunks:
+            yield validate_customers(chunk, today)
+        return
+
+    with ProcessPoolExecutor(processes) as pool:
+        in_flight = deque()
+        for chunk in row_chunks:
+            in_flight.append(pool.submit(validate_customers, chunk, today))
+            if len(in_flight) >= 2 * processes:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def import_customers(db, path, file_format=None, rejects_path=None, batch_size=10000, processes=None):
+    """
+    Import customers from a CSV or JSONL file into the storage backend, committing one batch per chunk.
+    Return an ImportResult with the counts and the range of ids given to the new customers."""
+
+    read = accepted = rejected = 0
+    first_id = last_id = None
+
+    rejects_file = open(rejects_path, "w", newline="", encoding="utf-8") if rejects_path else None
+    try:
+        rejects = csv.writer(rejects_file) if rejects_file else None
+        if rejects:
+            rejects.writerow(("line", "reason") + FIELDS)
+
+        for good, bad in validated_chunks(chunks(read_rows(path, file_format), batch_size), processes):
+            with db.batch():
+                for line_number, customer in good:
+                    last_id = db.add_customer(*customer)
+                    if first_id is None:
+                        first_id = last_id
+
+            if rejects:
+                for line_number, row, reason in bad:
+                    rejects.writerow((line_number, reason) + tuple(row[1:]))
+
+            read += len(good) + len(bad)
+            accepted += len(good)
+            rejected += len(bad)
+    finally:
+        if rejects_file:
+            rejects_file.close()
+
+    return ImportResult(read, accepted, rejected, first_id, last_id)
+
+
+if __name__ == "__main__":
+    from atl_storage import open_storage
+
+    parser = argparse.ArgumentParser(description="Import customers from a CSV or JSONL file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--rejects", help="write rejected rows and reasons to this CSV file")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=None, help="validate chunks in this many processes")
+    args = parser.parse_args()
+
+    db = open_storage()
+    result = import_customers(db, args.path, args.format, args.rejects, args.batch_size, args.processes)
+    db.close()
+
+    print("Read {}, imported {}, rejected {}.".format(result.read, result.accepted, result.rejected))
+    if result.accepted:
+        print("New customer ids {} to {}.".format(result.first_id, result.last_id))
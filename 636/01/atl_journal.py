@@ -0,0 +1,224 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Append-only journal of every change, with snapshots, so the in-memory backend survives restarts.
+#
+# Files in the journal directory, <n> is the generation number:
+#   snapshot-<n>.pickle   all tours and customers at the start of generation n (written atomically)
+#   journal-<n>.log       every change made since that snapshot
+# On startup the latest snapshot is loaded and only its journal is replayed.
+# After ATL_JOURNAL_COMPACT_EVERY changes (default 10000) a new snapshot is written and a new journal started.
+#
+# Each journal record is: 4-byte length | 4-byte CRC32 of the payload | payload (JSON)
+# A torn or corrupt record at the end of the journal (e.g. a crash while writing) is cut off when the journal is opened.
+
+import json
+import os
+import pickle
+import struct
+import zlib
+from contextlib import contextmanager
+from datetime import date
+
+from atl_storage import MemoryBackend
+
+RECORD_HEADER = struct.Struct(">II")        # payload length, CRC32 of payload
+
+
+class Journal:
+    """
+    Append records to a journal file. Each append is fsync'ed, unless it is inside batch(),
+    where all appends of the batch are fsync'ed together when the batch ends (group commit)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "ab")
+        self._batch_depth = 0
+        self.count = 0                      # records in the journal file
+
+    def append(self, entry):
+        payload = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+        self._file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.count += 1
+        if self._batch_depth == 0:
+            self.commit()
+
+    def commit(self):
+        """
+        Make everything appended so far durable"""
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def in_batch(self):
+        return self._batch_depth > 0
+
+    @contextmanager
+    def batch(self):
+        """
+        Group the appends inside the with block into a single fsync"""
+
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.commit()
+
+    def close(self):
+        self.commit()
+        self._file.close()
+
+
+def read_journal(path):
+    """
+    Read all good records of a journal file. A torn or corrupt tail is cut off the file, so new records follow good ones."""
+
+    entries = []
+    if not os.path.exists(path):
+        return entries
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, crc = RECORD_HEADER.unpack_from(data, offset)
+        payload = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        entries.append(json.loads(payload))
+        offset += RECORD_HEADER.size + length
+
+    if offset < len(data):
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+    return entries
+
+
+def write_snapshot(path, backend):
+    """
+    Write all tours and customers of the backend to path, via a temporary file so a crash never leaves half a snapshot"""
+
+    state = {
+        "tours": {name: {"itinerary": list(tour["itinerary"]),
+                         "age_restriction": tour["age_restriction"],
+                         "groups": {group_date: list(member_list) for group_date, member_list in tour["groups"].items()}}
+                  for name, tour in backend.tours.items()},
+        "customers": [tuple(c) for c in backend.customers()],
+    }
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+class JournaledBackend(MemoryBackend):
+    """
+    The in-memory backend, with every change written to the journal"""
+
+    def __init__(self, directory, tours, customers, compact_every=None):
+        self._directory = directory
+        self._compact_every = compact_every or int(os.environ.get("ATL_JOURNAL_COMPACT_EVERY", "10000"))
+        os.makedirs(directory, exist_ok=True)
+
+        # start from the latest snapshot if there is one, otherwise from the tours and customers given (atl_data)
+        self._generation = max(self._generations("snapshot-", ".pickle"), default=0)
+        if self._generation > 0:
+            with open(self._snapshot_path(self._generation), "rb") as f:
+                state = pickle.load(f)
+            tours, customers = state["tours"], state["customers"]
+        super().__init__(tours, customers)
+
+        # replay only the changes made since the snapshot
+        entries = read_journal(self._journal_path(self._generation))
+        for entry in entries:
+            self._apply(entry)
+
+        self._journal = Journal(self._journal_path(self._generation))
+        self._journal.count = len(entries)
+
+    def _generations(self, prefix, suffix):
+        for name in os.listdir(self._directory):
+            if name.startswith(prefix) and name.endswith(suffix):
+                yield int(name[len(prefix):-len(suffix)])
+
+    def _snapshot_path(self, generation):
+        return os.path.join(self._directory, "snapshot-{}.pickle".format(generation))
+
+    def _journal_path(self, generation):
+        return os.path.join(self._directory, "journal-{}.log".format(generation))
+
+    def _apply(self, entry):
+        """
+        Redo one journal entry on the in-memory data, without writing it to the journal again"""
+
+        op = entry["op"]
+        if op == "add_customer":
+            customer_id = super().add_customer(entry["first_name"], entry["family_name"], date.fromordinal(entry["birthdate"]), entry["email"])
+            if customer_id != entry["id"]:
+                raise ValueError("Journal replay gave customer id {} instead of {}".format(customer_id, entry["id"]))
+        elif op == "add_member":
+            super().add_member(entry["tour"], date.fromordinal(entry["date"]), entry["customer_id"])
+        elif op == "set_itinerary":
+            super().set_itinerary(entry["tour"], entry["itinerary"])
+        else:
+            raise ValueError("Unknown journal entry: {}".format(op))
+
+    def _record(self, entry):
+        self._journal.append(entry)
+        if not self._journal.in_batch():
+            self._compact_if_due()
+
+    def _compact_if_due(self):
+        if self._journal.count >= self._compact_every:
+            self.compact()
+
+    @contextmanager
+    def batch(self):
+        """
+        Group many changes into one journal commit, e.g. for bulk imports"""
+
+        with self._journal.batch():
+            yield self
+        if not self._journal.in_batch():
+            self._compact_if_due()
+
+    def compact(self):
+        """
+        Write a snapshot of the current data as the next generation, and start a new empty journal for it"""
+
+        self._journal.close()
+        self._generation += 1
+        write_snapshot(self._snapshot_path(self._generation), self)
+        self._journal = Journal(self._journal_path(self._generation))
+
+        # older generations are no longer needed once the new snapshot is on disk
+        for generation in list(self._generations("snapshot-", ".pickle")):
+            if generation < self._generation:
+                os.remove(self._snapshot_path(generation))
+        for generation in list(self._generations("journal-", ".log")):
+            if generation < self._generation:
+                os.remove(self._journal_path(generation))
+
+    # ---------- changes, each one journaled ----------
+    def add_customer(self, first_name, family_name, birthdate, email):
+        customer_id = super().add_customer(first_name, family_name, birthdate, email)
+        self._record({"op": "add_customer", "id": customer_id, "first_name": first_name, "family_name": family_name,
+                      "birthdate": birthdate.toordinal(), "email": email})
+        return customer_id
+
+    def add_member(self, tour_name, tour_date, customer_id):
+        super().add_member(tour_name, tour_date, customer_id)
+        self._record({"op": "add_member", "tour": tour_name, "date": tour_date.toordinal(), "customer_id": customer_id})
+
+    def set_itinerary(self, tour_name, itinerary):
+        super().set_itinerary(tour_name, itinerary)
+        self._record({"op": "set_itinerary", "tour": tour_name, "itinerary": list(itinerary)})
+
+    def close(self):
+        self._journal.close()
@@ -0,0 +1,240 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# A storage backend that many threads can share (e.g. one session per thread).
+# The backends themselves assume one caller at a time: adding a customer reads the next id and then appends,
+# enrolling checks membership and then appends, and the indexes merge their pending adds on the next lookup.
+# ThreadSafeBackend wraps a backend and makes each of these one atomic step:
+#
+#   customers lock          id allocation + insert + index updates, and every lookup in the customer indexes
+#                           (not reading one customer's birth date, customer_birthdate(), which never changes)
+#   one lock per tour group checking and changing the members of that group. Enrolling only holds the customers lock
+#                           to read the customer first, so enrollments into different groups don't wait for each other
+#   tours lock              itineraries and destinations
+#
+# Locks are always taken in this order: (journal / connection), tour group, customers, tours, so two threads never
+# wait for each other in a circle.
+# With ATL_JOURNAL every change is also one record of one ordered journal file, so journaled changes are made one at
+# a time (reads are not held up). A SQLite backend has one connection, so all its calls are made one at a time.
+#
+# See atl_stress.py for a stress run that checks nothing is lost under many threads.
+
+import threading
+from contextlib import ExitStack, contextmanager, nullcontext
+
+from atl_enroll import ALREADY_MEMBER, NO_CUSTOMER, NO_GROUP, TOO_YOUNG
+from atl_storage import MemoryBackend
+
+
+class KeyedLocks:
+    """
+    A lock for each key (e.g. each tour group), made the first time the key is locked"""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def __call__(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(key, threading.RLock())
+        return lock
+
+
+class ThreadSafeBackend:
+    """
+    Share one storage backend between threads. Has the same methods as the backends, plus enroll()."""
+
+    def __init__(self, backend):
+        from atl_journal import JournaledBackend
+
+        self.backend = backend
+        self._customers = threading.RLock()
+        self._tours = threading.RLock()
+        self._group_locks = KeyedLocks()
+        self._journal = threading.RLock() if isinstance(backend, JournaledBackend) else None
+        self._connection = None if isinstance(backend, MemoryBackend) else threading.RLock()
+
+    @contextmanager
+    def _locked(self, *locks, write=False):
+        """
+        Hold the connection lock (SQLite), the journal lock (journaled writes) and then the given locks"""
+
+        with ExitStack() as stack:
+            if self._connection is not None:
+                stack.enter_context(self._connection)
+            if write and self._journal is not None:
+                stack.enter_context(self._journal)
+            for lock in locks:
+                stack.enter_context(lock)
+            yield
+
+    def _group(self, tour_name, tour_date):
+        return self._group_locks((tour_name, tour_date))
+
+    # ---------- customers ----------
+    def customers(self):
+        """
+        Get all customers. Customers are only ever appended, so this stays safe to iterate while others add customers."""
+
+        with self._locked(self._customers):
+            return self.backend.customers()
+
+    def customer_count(self):
+        with self._locked(self._customers):
+            return self.backend.customer_count()
+
+    def customers_by_name(self, start=0, stop=None):
+        with self._locked(self._customers):
+            return list(self.backend.customers_by_name(start, stop))
+
+    def customer_page(self, after=None, limit=20, skip=0):
+        with self._locked(self._customers):
+            return self.backend.customer_page(after, limit, skip)
+
+    def customer_exists(self, customer_id):
+        with self._locked(self._customers):
+            return self.backend.customer_exists(customer_id)
+
+    def get_customer(self, customer_id):
+        with self._locked(self._customers):
+            return self.backend.get_customer(customer_id)
+
+    def customer_birthdate(self, customer_id):
+        """
+        Get the customer's birth date, None if the customer is not existing. Customers are never removed and their
+        birth dates never change, and the customer store can be read while a customer is added (see atl_customer_store.py),
+        so this doesn't take the customers lock: many threads can check customers at once."""
+
+        with self._locked():
+            return self.backend.customer_birthdate(customer_id)
+
+    def count_by_family_prefix(self, prefix):
+        with self._locked(self._customers):
+            return self.backend.count_by_family_prefix(prefix)
+
+    def customer_ids_by_family_prefix(self, prefix):
+        with self._locked(self._customers):
+            return self.backend.customer_ids_by_family_prefix(prefix)
+
+    def count_born_between(self, first=None, last=None):
+        with self._locked(self._customers):
+            return self.backend.count_born_between(first, last)
+
+    def customer_ids_born_between(self, first=None, last=None):
+        with self._locked(self._customers):
+            return self.backend.customer_ids_born_between(first, last)
+
+    def search_customers(self, text, limit=10):
+        with self._locked(self._customers):
+            return self.backend.search_customers(text, limit)
+
+    def add_customer(self, first_name, family_name, birthdate, email):
+        """
+        Add a new customer and return its id. No two threads ever get the same id."""
+
+        with self._locked(self._customers, write=True):
+            return self.backend.add_customer(first_name, family_name, birthdate, email)
+
+    # ---------- tour groups ----------
+    # tour groups are only added when the data is loaded, so the list of groups needs no lock, only their members do
+    def tour_groups(self, name_descending=False, date_descending=False):
+        with self._locked():
+            return self.backend.tour_groups(name_descending, date_descending)
+
+    def group_count(self):
+        with self._locked():
+            return self.backend.group_count()
+
+    def tour_group_page(self, after=None, limit=10, skip=0):
+        with self._locked():
+            return self.backend.tour_group_page(after, limit, skip)
+
+    def group_age_restriction(self, tour_name, tour_date):
+        with self._locked():
+            return self.backend.group_age_restriction(tour_name, tour_date)
+
+    def tour_group(self, tour_name, tour_date):
+        with self._locked(self._group(tour_name, tour_date)):
+            return self.backend.tour_group(tour_name, tour_date)
+
+    def group_members_by_name(self, tour_name, tour_date):
+        with self._locked(self._group(tour_name, tour_date), self._customers):
+            return list(self.backend.group_members_by_name(tour_name, tour_date))
+
+    def is_member(self, tour_name, tour_date, customer_id):
+        with self._locked(self._group(tour_name, tour_date)):
+            return self.backend.is_member(tour_name, tour_date, customer_id)
+
+    def add_member(self, tour_name, tour_date, customer_id):
+        """
+        Add the customer to the group. Raises ValueError if the customer is already in it (e.g. added by another thread)."""
+
+        with self._locked(self._group(tour_name, tour_date), write=True):
+            if self.backend.is_member(tour_name, tour_date, customer_id):
+                raise ValueError(ALREADY_MEMBER)
+            self.backend.add_member(tour_name, tour_date, customer_id)
+
+    def enroll(self, customer_id, tour_name, tour_date):
+        """
+        Check and add the customer to the group in one step, with the same rules as option 5.
+        Return None if the customer was added, otherwise the reason why not (see atl_enroll.py).
+        Customers are never removed and their birth dates never change, so the customer is checked first under a short
+        customers lock; only the membership check and the add hold the group's lock."""
+
+        with self._locked():
+            age_restriction = self.backend.group_age_restriction(tour_name, tour_date)
+        with self._locked(self._customers):
+            if not self.backend.customer_exists(customer_id):
+                return NO_CUSTOMER
+            if age_restriction is None:
+                return NO_GROUP
+            old_enough = self.backend.is_eligible(customer_id, age_restriction)
+
+        with self._locked(self._group(tour_name, tour_date), write=True):
+            if self.backend.is_member(tour_name, tour_date, customer_id):
+                return ALREADY_MEMBER
+            if not old_enough:
+                return TOO_YOUNG
+            self.backend.add_member(tour_name, tour_date, customer_id)
+            return None
+
+    def is_eligible(self, customer_id, age_restriction):
+        with self._locked(self._customers):
+            return self.backend.is_eligible(customer_id, age_restriction)
+
+    def eligible_groups(self, customer_id, tour_group_list):
+        with self._locked(self._customers):
+            return self.backend.eligible_groups(customer_id, tour_group_list)
+
+    # ---------- tours and destinations ----------
+    def tour_details(self):
+        with self._locked(self._tours):
+            return list(self.backend.tour_details())
+
+    def destinations(self):
+        with self._locked(self._tours):
+            return list(self.backend.destinations())
+
+    def set_itinerary(self, tour_name, itinerary):
+        with self._locked(self._tours, write=True):
+            self.backend.set_itinerary(tour_name, itinerary)
+
+    def data_version(self, topic):
+        return self.backend.data_version(topic)         # a plain read, no lock needed
+
+    @contextmanager
+    def batch(self):
+        """
+        Group many changes together. Journaled and SQLite batches hold the journal / connection for the whole batch."""
+
+        with self._locked(write=True):
+            with self.backend.batch() if self._journal is not None or self._connection is not None else nullcontext():
+                yield self
+
+    def close(self):
+        with self._locked(write=True):
+            self.backend.close()
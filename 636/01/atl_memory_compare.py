@@ -0,0 +1,71 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Compare the memory used by the atl_data customer layout (a list of 5-element lists,
+# plus the id -> record dict copy that option 2 used to build) with the compact CustomerStore.
+#
+# Run: python atl_memory_compare.py [number_of_customers]      (default 1,000,000)
+#
+# Measured with Python 3.11 on Linux x86_64, 1,000,000 customers:
+#   list of lists                           :    248.3 MB
+#   list of lists + id dict copy            :    386.3 MB
+#   CustomerStore (arrays + string table)   :     61.4 MB
+# Most of what is left in CustomerStore is the packed emails, which are nearly all different.
+
+import sys
+import tracemalloc
+from datetime import date
+
+from atl_customer_store import CustomerStore
+
+FIRST_NAMES = ["Simon", "Simone", "Charlie", "Kate", "Jack", "Chloe", "Samantha", "Xue", "Sam", "Aroha", "Wiremu", "Mere"]
+FAMILY_NAMES = ["Charles", "McArthur", "Hopere", "Mathewson", "McLeod", "Liu", "Patel", "Wright", "Ngata", "Tūhoe"]
+
+
+def generate_customers(n):
+    """
+    Generate n customers in the atl_data layout: [id, first_name, family_name, birthdate, email]
+    Names repeat like real data, each customer has its own email"""
+
+    start = date(1940, 1, 1).toordinal()
+    for i in range(n):
+        first_name = FIRST_NAMES[i % len(FIRST_NAMES)]
+        family_name = FAMILY_NAMES[(i // len(FIRST_NAMES)) % len(FAMILY_NAMES)]
+        yield [i + 1, first_name, family_name, date.fromordinal(start + (i * 7) % 30000), "{}.{}{}@kiwi.nz".format(first_name, family_name, i).lower()]
+
+
+def measure(build):
+    """
+    Return the memory (bytes) still held by what build() returns"""
+
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def build_list(n):
+    return list(generate_customers(n))
+
+
+def build_list_and_dict(n):
+    customers = list(generate_customers(n))
+    return customers, {c[0]: [c[0], c[1], c[2], c[3], c[4]] for c in customers}
+
+
+def build_store(n):
+    return CustomerStore(generate_customers(n))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    format_str = "{: <40}: {: >8.1f} MB"
+    print("{:,} customers".format(n))
+    print(format_str.format("list of lists", measure(lambda: build_list(n)) / 1e6))
+    print(format_str.format("list of lists + id dict copy", measure(lambda: build_list_and_dict(n)) / 1e6))
+    print(format_str.format("CustomerStore (arrays + string table)", measure(lambda: build_store(n)) / 1e6))
@@ -0,0 +1,103 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Customers kept in display order: family name, then first name, then id (see name_key in atl_customer_store.py).
+# Only the customer ids are kept, in an array; names are read from the customer store when comparing,
+# so the order costs 8 bytes per customer. Displaying any slice of customers never sorts them again.
+# The order is only sorted the first time it is used, so that startup doesn't read every name (a snapshot's customers
+# are only decoded when read, see atl_snapshot.py).
+#
+# GroupNameOrder keeps the members of each tour group in the same order, so option 2 doesn't sort each group either.
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+
+PREFIX_END = "\U0010ffff"      # the largest character: every name starting with a prefix sorts before prefix + PREFIX_END
+
+
+class NameOrder:
+    """
+    Customer ids sorted by (family name, first name, id), with top-k, range and keyset access"""
+
+    def __init__(self, customer_store):
+        self._store = customer_store
+        self._ids = None                # sorted at the first lookup
+        self._pending = []              # ids added since the last lookup, merged in one pass (bulk imports)
+
+    def add(self, customer_id):
+        if self._ids is not None:       # not sorted yet: it will be sorted with the new customer
+            self._pending.append(customer_id)
+
+    def _merge_pending(self):
+        if self._ids is None:
+            self._ids = array("q", [key[2] for key in sorted(self._store.name_keys())])
+            return
+        if len(self._pending) == 0:
+            return
+        key = self._store.get_name_key
+        if len(self._pending) == 1:
+            insort(self._ids, self._pending[0], key=key)
+        else:
+            pending = sorted(self._pending, key=key)
+            self._ids = array("q", merge(self._ids, pending, key=key))
+        self._pending = []
+
+    def __len__(self):
+        if self._ids is None:
+            return len(self._store)
+        return len(self._ids) + len(self._pending)
+
+    def __iter__(self):
+        self._merge_pending()
+        return iter(self._ids)
+
+    def range(self, start=0, stop=None):
+        """
+        Get the ids at positions start to stop in name order, e.g. range(0, 10) is the top 10"""
+
+        self._merge_pending()
+        return self._ids[start:stop]
+
+    def after(self, after=None, limit=20, skip=0):
+        """
+        Get up to limit ids that come after the name_key `after` (None = from the start), skipping the first `skip` of them"""
+
+        self._merge_pending()
+        start = 0 if after is None else bisect_right(self._ids, tuple(after), key=self._store.get_name_key)
+        return self._ids[start + skip:start + skip + limit]
+
+    def family_prefix(self, prefix):
+        """
+        Get the positions (start, stop) of the customers whose family name starts with prefix, for range()"""
+
+        self._merge_pending()
+        key = self._store.get_name_key
+        return bisect_left(self._ids, (prefix,), key=key), bisect_left(self._ids, (prefix + PREFIX_END,), key=key)
+
+
+class GroupNameOrder:
+    """
+    The members of each tour group in name order. A group's order is built the first time it is asked for,
+    and then kept up to date when a customer joins the group."""
+
+    def __init__(self, customer_store):
+        self._store = customer_store
+        self._groups = {}               # (tour name, tour date) -> member ids in name order
+
+    def members(self, tour_name, tour_date, member_list):
+        """
+        Get the members of the group in name order, member_list is the group's members in joining order"""
+
+        group = (tour_name, tour_date)
+        ids = self._groups.get(group)
+        if ids is None:
+            ids = self._groups[group] = sorted(member_list, key=self._store.get_name_key)
+        return ids
+
+    def add(self, tour_name, tour_date, customer_id):
+        ids = self._groups.get((tour_name, tour_date))
+        if ids is not None:             # not built yet: it will be built with the new member when first asked for
+            insort(ids, customer_id, key=self._store.get_name_key)
@@ -0,0 +1,54 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Page through a long sorted listing one screen at a time.
+# Pages are fetched with keyset cursors: the next page is "the rows after the last row shown", so only the visible page
+# is ever fetched and formatted. Cursors of pages already seen are remembered for going back,
+# jumping to a page not seen yet skips forward from the nearest page whose cursor is known.
+
+PROMPT = " Page {} of {}  -  Enter/n: next, p: previous, <number>: go to page, q: quit  "
+
+
+def page_count(total, page_size):
+    return max(1, (total + page_size - 1) // page_size)
+
+
+def page_through(fetch, key, total, page_size, show, read=None):
+    """
+    Show a listing page by page until the user quits.
+    fetch(after, skip) returns up to page_size rows that come after the cursor `after` (None = from the start),
+    skipping the first `skip` of them. key(row) is the cursor of a row, show(rows) displays one page.
+    read(prompt) asks for the next choice, input() if not given."""
+
+    read = input if read is None else read
+
+    pages = page_count(total, page_size)
+    cursors = {1: None}             # page number -> cursor of the last row before that page
+    number = 1
+
+    while True:
+        if number in cursors:
+            rows = fetch(cursors[number], 0)
+        else:
+            known = max(p for p in cursors if p < number)
+            rows = fetch(cursors[known], (number - known) * page_size)
+        if rows:
+            cursors[number + 1] = key(rows[-1])
+
+        show(rows)
+
+        choice = read(PROMPT.format(number, pages)).strip().lower()
+        if choice == "q":
+            return
+        elif choice in ("", "n"):
+            if number >= pages:
+                return                  # Enter on the last page finishes the listing
+            number += 1
+        elif choice == "p":
+            number = max(1, number - 1)
+        elif choice.isdigit() and 1 <= int(choice) <= pages:
+            number = int(choice)
+        else:
+            print("Please input n, p, q or a page number between 1 and {}.".format(pages))
@@ -0,0 +1,234 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Timing of the menu operations, for finding out where the time goes when an option is slow. Off unless asked for:
+#   ATL_PROFILE=metrics.json    time every menu function, every storage backend call and the table rendering,
+#                               and write the results there when the program ends (metrics.prom: Prometheus text format)
+#   ATL_PROFILE_MEMORY=1        also measure the memory each call allocates (tracemalloc, which makes everything slower)
+#   ATL_CPROFILE=2              run menu option 2 (or any menu function by name, e.g. get_tour_groups) under cProfile,
+#                               the stats of its last run go to atl_profile_<function>.pstats (read with python -m pstats)
+# atl_cli.py has the same as --profile FILE, --profile-memory and --cprofile FILE.
+#
+# When none of these is set this module isn't even imported: nothing is wrapped and the menu runs as without it.
+# When it is on, each function is replaced by a wrapper that times it; time spent waiting for the user at input()
+# is not counted. Times include the functions called from inside (e.g. option 2 includes its get_tour_groups).
+# Backend calls that return an iterator are only timed for making it, reading it is counted in the caller.
+# For each operation: calls, total and mean time, percentiles from a uniform sample of the calls (SAMPLES per operation),
+# the slowest call, and with memory on the net bytes allocated (allocated minus freed) in total and by the largest call.
+# Meant for one thread (the menu, the CLI), the counts are not locked.
+
+import atexit
+import builtins
+import cProfile
+import functools
+import inspect
+import json
+import os
+import random
+import time
+import tracemalloc
+from array import array
+
+SAMPLES = 4096                  # call times kept per operation for the percentiles
+PERCENTILES = (0.5, 0.9, 0.99)
+
+MENU_OPTIONS = {"1": "list_all_customers", "2": "list_customers_by_tourgroup", "3": "list_tour_details",
+                "4": "list_all_destinations", "5": "add_customer_to_tourgroup", "6": "add_new_customer",
+                "7": "query_customers"}
+MENU_SKIPPED = ("main", "disp_menu", "print_warning", "print_success")
+
+# the backend methods the menu and the CLI use
+BACKEND_OPERATIONS = ("customers", "customer_count", "customers_by_name", "customer_page", "customer_exists", "get_customer",
+                      "add_customer", "tour_groups", "group_count", "tour_group_page", "tour_group", "group_age_restriction",
+                      "group_members_by_name", "is_member", "add_member", "is_eligible", "eligible_groups",
+                      "tour_details", "destinations", "set_itinerary", "count_by_family_prefix", "customer_ids_by_family_prefix",
+                      "count_born_between", "customer_ids_born_between", "search_customers")
+
+
+class OperationStats:
+    """
+    Counts, times and allocations of one operation"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.samples = array("d")           # a uniform sample of the call times (reservoir sampling)
+        self.allocated = 0                  # net bytes, only counted with memory on
+        self.largest_allocation = 0
+
+    def record(self, seconds, allocated, rng):
+        self.calls += 1
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+        if len(self.samples) < SAMPLES:
+            self.samples.append(seconds)
+        else:
+            n = rng.randrange(self.calls)
+            if n < SAMPLES:
+                self.samples[n] = seconds
+        self.allocated += allocated
+        self.largest_allocation = max(self.largest_allocation, allocated)
+
+    def percentiles(self):
+        ordered = sorted(self.samples)
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0 for q in PERCENTILES}
+
+
+class Profiler:
+    """
+    Wrap functions so that every call is timed, and export the results as JSON or in the Prometheus text format.
+    cprofile maps operation names to the files their cProfile stats are written to."""
+
+    def __init__(self, memory=False, cprofile=None):
+        self.stats = {}                     # operation name -> OperationStats
+        self.memory = memory
+        self._cprofile = dict(cprofile or {})
+        self._waited = 0.0                  # seconds spent in input() so far
+        self._rng = random.Random(0)
+        self._input = None
+
+    def start(self):
+        """
+        Start counting: time spent in input() is left out from now on, tracemalloc is started if memory is on"""
+
+        self._input = builtins.input
+        builtins.input = self._timed_input
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return self
+
+    def stop(self):
+        if self._input is not None:
+            builtins.input = self._input
+            self._input = None
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _timed_input(self, prompt=""):
+        started = time.perf_counter()
+        try:
+            return self._input(prompt)
+        finally:
+            self._waited += time.perf_counter() - started
+
+    def wrap(self, name, function):
+        """
+        Return function with every call timed as the operation name"""
+
+        stats = self.stats.setdefault(name, OperationStats())
+        cprofile_path = self._cprofile.get(name)
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            waited = self._waited
+            before = tracemalloc.get_traced_memory()[0] if self.memory else 0
+            profile = None
+            if cprofile_path is not None:
+                profile = cProfile.Profile()
+                profile.enable()
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - started - (self._waited - waited)
+                if profile is not None:
+                    profile.disable()
+                    profile.dump_stats(cprofile_path)
+                allocated = tracemalloc.get_traced_memory()[0] - before if self.memory else 0
+                stats.record(seconds, allocated, self._rng)
+
+        return timed
+
+    def instrument_module(self, module, prefix, names=None, skip=()):
+        """
+        Replace the functions of a module (all those defined in it, or only names) by timed ones.
+        Calls between the module's functions go through the module, so they are timed too."""
+
+        if names is None:
+            names = [name for name, value in vars(module).items()
+                     if inspect.isfunction(value) and value.__module__ == module.__name__ and name not in skip]
+        for name in names:
+            setattr(module, name, self.wrap("{}.{}".format(prefix, name), getattr(module, name)))
+
+    def instrument_object(self, obj, prefix, names):
+        """
+        Replace methods of one object (e.g. the open backend) by timed ones, methods it doesn't have are left out"""
+
+        for name in names:
+            if hasattr(obj, name):
+                setattr(obj, name, self.wrap("{}.{}".format(prefix, name), getattr(obj, name)))
+
+    # ---------- export ----------
+    def report(self):
+        """
+        The results as a dict: operation -> calls, seconds (total), mean, p50/p90/p99, max (seconds)
+        and with memory on, allocated_bytes (net, total) and max_allocated_bytes (largest call). Unused operations are left out."""
+
+        report = {}
+        for name, stats in sorted(self.stats.items()):
+            if not stats.calls:
+                continue
+            entry = {"calls": stats.calls, "seconds": stats.seconds, "mean": stats.seconds / stats.calls}
+            entry.update(("p{:g}".format(q * 100), seconds) for q, seconds in stats.percentiles().items())
+            entry["max"] = stats.slowest
+            if self.memory:
+                entry["allocated_bytes"] = stats.allocated
+                entry["max_allocated_bytes"] = stats.largest_allocation
+            report[name] = entry
+        return report
+
+    def to_json(self):
+        return json.dumps({"memory": self.memory, "operations": self.report()}, indent=1)
+
+    def to_prometheus(self):
+        lines = ["# HELP atl_operation_seconds Time spent in an operation, waiting for user input excluded",
+                 "# TYPE atl_operation_seconds summary"]
+        report = self.report()
+        for name, entry in report.items():
+            for q in PERCENTILES:
+                lines.append('atl_operation_seconds{{operation="{}",quantile="{:g}"}} {!r}'.format(name, q, entry["p{:g}".format(q * 100)]))
+            lines.append('atl_operation_seconds_sum{{operation="{}"}} {!r}'.format(name, entry["seconds"]))
+            lines.append('atl_operation_seconds_count{{operation="{}"}} {}'.format(name, entry["calls"]))
+        if self.memory:
+            lines += ["# HELP atl_operation_allocated_bytes Net bytes allocated by an operation (allocated minus freed), all calls",
+                      "# TYPE atl_operation_allocated_bytes gauge"]
+            lines += ['atl_operation_allocated_bytes{{operation="{}"}} {}'.format(name, entry["allocated_bytes"]) for name, entry in report.items()]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write the results to path: Prometheus text format for .prom or .txt files, JSON otherwise"""
+
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def profile_menu(module, db):
+    """
+    Turn on profiling of the menu module as ATL_PROFILE, ATL_PROFILE_MEMORY and ATL_CPROFILE ask,
+    with the results written when the program ends. Return the Profiler, None when none of them is set."""
+
+    path = os.environ.get("ATL_PROFILE")
+    target = os.environ.get("ATL_CPROFILE")
+    if not path and not target:
+        return None
+
+    cprofile = {}
+    if target:
+        function = MENU_OPTIONS.get(target, target)
+        cprofile["menu." + function] = "atl_profile_{}.pstats".format(function)
+
+    from atl_render import Table
+
+    profiler = Profiler(memory=os.environ.get("ATL_PROFILE_MEMORY", "") not in ("", "0"), cprofile=cprofile)
+    profiler.instrument_module(module, "menu", skip=MENU_SKIPPED)
+    profiler.instrument_object(db, "db", BACKEND_OPERATIONS)
+    Table.render = profiler.wrap("render.Table.render", Table.render)
+    profiler.start()
+    if path:
+        atexit.register(profiler.write, path)
+    return profiler
@@ -0,0 +1,478 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# A small query language for finding customers without scrolling a whole listing (menu option 7, atl_cli.py query).
+#
+#     family_name ^= 'Char' and age >= 18 and tour = 'UK' and date in 2025
+#
+# Fields:  customer  id, first_name, family_name, email, birthdate, age
+#          group     tour, date, destination (a place on the tour's itinerary), age_restriction
+# Compare: =  !=  <  <=  >  >=  ^= (starts with)  ~= (contains, any case)
+#          field in (value, ...)      date in 2025 / birthdate in 1990 (the whole year)
+# Combine: and, or, not, ( )
+# Values:  'text' or "text" (a quote is doubled inside), numbers, dates as '24/06/2025', '2025-06-24' or 2025-06-24.
+#
+# The answer is the customers, in name order, for whom the condition holds; group fields are about one tour group
+# the customer is in, so `tour = 'UK' and date in 2025` means in a UK group of 2025. A customer in no group
+# never matches a group condition.
+#
+# Planning: the conditions joined by `and` at the top are looked at for an index to start from:
+#   id hash          id = N, id in (...)
+#   name order       family_name ^= '...', family_name = '...'
+#   birthdate order  age and birthdate comparisons (ages are turned into birthdate ranges, as for age restrictions)
+#   (tour, date)     tour, date and destination conditions pick the tour groups; destination uses the destination index
+# Each index gives an estimate of the rows it would read (cheap counts: bisect in memory, an indexed COUNT in SQLite),
+# the smallest wins, and every row it gives is then checked against the whole condition.
+# When no index applies (e.g. an `or` at the top) the customers are scanned in full.
+# explain() shows the chosen index and the estimates of all of them.
+
+import re
+from collections import namedtuple
+from datetime import date
+
+from atl_customer_store import name_key
+from atl_eligibility import birthdate_cutoff
+from atl_validation import parse_date
+
+
+class QueryError(ValueError):
+    """
+    The query can't be read, the message says where"""
+
+
+CUSTOMER_FIELDS = {"id": int, "first_name": str, "family_name": str, "email": str, "birthdate": date, "age": int}
+GROUP_FIELDS = {"tour": str, "date": date, "destination": str, "age_restriction": int}
+FIELDS = dict(CUSTOMER_FIELDS, **GROUP_FIELDS)
+
+TOKEN = re.compile(r"""\s*(?:(?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+                          |(?P<date>\d{4}-\d\d-\d\d)
+                          |(?P<number>-?\d+)
+                          |(?P<op>\^=|~=|!=|<=|>=|=|<|>)
+                          |(?P<punct>[(),])
+                          |(?P<word>[A-Za-z_]\w*))""", re.VERBOSE)
+
+# the parsed query: op is one of the comparisons, "in" (value is a tuple) or "between" (value is (first, last))
+Compare = namedtuple("Compare", "field op value")
+And = namedtuple("And", "parts")
+Or = namedtuple("Or", "parts")
+Not = namedtuple("Not", "part")
+
+# one way to find the candidate rows: which index, on which conditions, how many rows it is expected to read
+AccessPath = namedtuple("AccessPath", "index conditions estimate rows")
+
+
+# ---------- parsing ----------
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise QueryError("Can't read the query at position {}: {!r}".format(position + 1, text[position:position + 10]))
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    """
+    Recursive descent over the tokens: or_expr := and_expr (or and_expr)*, and_expr := not_expr (and not_expr)*,
+    not_expr := not not_expr | ( or_expr ) | comparison"""
+
+    def __init__(self, text):
+        self._tokens = tokenize(text)
+        self._next = 0
+
+    def _peek(self):
+        return self._tokens[self._next] if self._next < len(self._tokens) else (None, None, None)
+
+    def _take(self, kind=None, value=None):
+        token = self._peek()
+        if token[0] is None or (kind is not None and token[0] != kind) or (value is not None and token[1].lower() != value):
+            expected = value or kind or "more"
+            found = "the end" if token[0] is None else repr(token[1])
+            raise QueryError("Expected {} but found {}{}".format(expected, found, "" if token[2] is None else " at position {}".format(token[2] + 1)))
+        self._next += 1
+        return token
+
+    def _is_word(self, word):
+        kind, value, _ = self._peek()
+        return kind == "word" and value.lower() == word
+
+    def parse(self):
+        if not self._tokens:
+            raise QueryError("The query is empty")
+        node = self._or()
+        if self._next < len(self._tokens):
+            kind, value, position = self._peek()
+            raise QueryError("Unexpected {!r} at position {}".format(value, position + 1))
+        return node
+
+    def _or(self):
+        parts = [self._and()]
+        while self._is_word("or"):
+            self._next += 1
+            parts.append(self._and())
+        return parts[0] if len(parts) == 1 else Or(tuple(parts))
+
+    def _and(self):
+        parts = [self._not()]
+        while self._is_word("and"):
+            self._next += 1
+            parts.append(self._not())
+        return parts[0] if len(parts) == 1 else And(tuple(parts))
+
+    def _not(self):
+        if self._is_word("not"):
+            self._next += 1
+            return Not(self._not())
+        if self._peek()[:2] == ("punct", "("):
+            self._next += 1
+            node = self._or()
+            self._take("punct", ")")
+            return node
+        return self._comparison()
+
+    def _comparison(self):
+        _, field, position = self._take("word")
+        field = field.lower()
+        if field not in FIELDS:
+            raise QueryError("Unknown field {!r} at position {}, the fields are: {}".format(field, position + 1, ", ".join(FIELDS)))
+        kind = FIELDS[field]
+
+        if self._is_word("in"):
+            self._next += 1
+            if self._peek()[:2] == ("punct", "("):
+                self._next += 1
+                values = [self._value(field, kind)]
+                while self._peek()[:2] == ("punct", ","):
+                    self._next += 1
+                    values.append(self._value(field, kind))
+                self._take("punct", ")")
+                return Compare(field, "in", tuple(values))
+            if kind is date:            # a whole year
+                _, year, position = self._take("number")
+                if not 1 <= int(year) <= 9999:
+                    raise QueryError("{} at position {} is not a year".format(year, position + 1))
+                return Compare(field, "between", (date(int(year), 1, 1), date(int(year), 12, 31)))
+            raise QueryError("Expected ( after {} in".format(field))
+
+        _, op, position = self._take("op")
+        if op in ("^=", "~=") and kind is not str:
+            raise QueryError("{} only works on text fields, not on {}".format(op, field))
+        return Compare(field, op, self._value(field, kind))
+
+    def _value(self, field, kind):
+        token_kind, value, position = self._take()
+        try:
+            if kind is str and token_kind == "string":
+                return value[1:-1].replace(value[0] * 2, value[0])
+            if kind is int and token_kind == "number":
+                return int(value)
+            if kind is date and token_kind == "date":
+                return date.fromisoformat(value)
+            if kind is date and token_kind == "string":
+                text = value[1:-1]
+                return date.fromisoformat(text) if "-" in text else parse_date(text)
+        except ValueError:
+            pass
+        raise QueryError("{!r} at position {} is not a valid value for {} ({})".format(
+            value, position + 1, field, {str: "text in quotes", int: "a number", date: "a date"}[kind]))
+
+
+def parse(text):
+    return Parser(text).parse()
+
+
+def describe(node):
+    """
+    The query (or a part of it) written back as text"""
+
+    if isinstance(node, And):
+        return " and ".join(describe(p) if not isinstance(p, Or) else "(" + describe(p) + ")" for p in node.parts)
+    if isinstance(node, Or):
+        return " or ".join(describe(p) for p in node.parts)
+    if isinstance(node, Not):
+        return "not " + (describe(node.part) if isinstance(node.part, Compare) else "(" + describe(node.part) + ")")
+
+    def literal(v):
+        return "'{}'".format(v.replace("'", "''")) if isinstance(v, str) else str(v)
+
+    if node.op == "in":
+        return "{} in ({})".format(node.field, ", ".join(map(literal, node.value)))
+    if node.op == "between":
+        first, last = node.value
+        if (first.month, first.day, last.month, last.day) == (1, 1, 12, 31) and first.year == last.year:
+            return "{} in {}".format(node.field, first.year)
+        return "{} between {} and {}".format(node.field, first, last)
+    return "{} {} {}".format(node.field, node.op, literal(node.value))
+
+
+# ---------- ranges: ages and dates as (first, last) date ordinals, both included, None = no limit ----------
+def age_range(op, age, today):
+    """
+    The birthdates of the customers whose age compares so with age, as a range; for != the range to leave out"""
+
+    def cutoff(n):
+        return birthdate_cutoff(n, today).toordinal()       # ages out of the range of dates give date.min or date.max
+
+    if op == ">=":
+        return None, cutoff(age)
+    if op == ">":
+        return None, cutoff(age + 1)
+    if op == "<=":
+        return cutoff(age + 1) + 1, None
+    if op == "<":
+        return cutoff(age) + 1, None
+    return cutoff(age + 1) + 1, cutoff(age)           # = and !=
+
+
+def date_range(op, value):
+    if op == "between":
+        return value[0].toordinal(), value[1].toordinal()
+    ordinal = value.toordinal()
+    return {">=": (ordinal, None), ">": (ordinal + 1, None), "<=": (None, ordinal), "<": (None, ordinal - 1)}.get(op, (ordinal, ordinal))
+
+
+def range_of(node, today):
+    """
+    The ordinal range of an age, birthdate or date comparison that can be used as a range, None otherwise"""
+
+    if not isinstance(node, Compare) or node.op in ("!=", "in"):
+        return None
+    if node.field == "age":
+        return age_range(node.op, node.value, today)
+    if node.field in ("birthdate", "date"):
+        return date_range(node.op, node.value)
+    return None
+
+
+def intersect(ranges):
+    first = max((r[0] for r in ranges if r[0] is not None), default=None)
+    last = min((r[1] for r in ranges if r[1] is not None), default=None)
+    return first, last
+
+
+def in_range(ordinal, bounds):
+    return (bounds[0] is None or ordinal >= bounds[0]) and (bounds[1] is None or ordinal <= bounds[1])
+
+
+# ---------- compiling to a predicate over rows (customer, tour group or None, itineraries) ----------
+def compile_query(node, today):
+    """
+    Turn the query into a function of (customer, tour group or None, {tour: set of destinations}) -> bool"""
+
+    if isinstance(node, And):
+        parts = [compile_query(p, today) for p in node.parts]
+        return lambda c, g, places: all(p(c, g, places) for p in parts)
+    if isinstance(node, Or):
+        parts = [compile_query(p, today) for p in node.parts]
+        return lambda c, g, places: any(p(c, g, places) for p in parts)
+    if isinstance(node, Not):
+        part = compile_query(node.part, today)
+        return lambda c, g, places: not part(c, g, places)
+
+    field, op, value = node
+    if field == "age":
+        if op == "in":
+            ranges = [age_range("=", age, today) for age in value]
+            return lambda c, g, places: any(in_range(c.birthdate.toordinal(), r) for r in ranges)
+        bounds = age_range(op, value, today)
+        if op == "!=":
+            return lambda c, g, places: not in_range(c.birthdate.toordinal(), bounds)
+        return lambda c, g, places: in_range(c.birthdate.toordinal(), bounds)
+
+    if field == "destination":
+        if op == "in":
+            wanted = set(value)
+            return lambda c, g, places: g is not None and not wanted.isdisjoint(places[g.header.name])
+        test = comparison(op, value)
+        return lambda c, g, places: g is not None and any(test(place) for place in places[g.header.name])
+
+    get = {"id": lambda c, g: c.id, "first_name": lambda c, g: c.first_name, "family_name": lambda c, g: c.family_name,
+           "email": lambda c, g: c.email, "birthdate": lambda c, g: c.birthdate,
+           "tour": lambda c, g: g.header.name, "date": lambda c, g: g.header.date,
+           "age_restriction": lambda c, g: g.age_restriction}[field]
+    test = comparison(op, value)
+    if field in GROUP_FIELDS:
+        return lambda c, g, places: g is not None and test(get(c, g))
+    return lambda c, g, places: test(get(c, g))
+
+
+def comparison(op, value):
+    if op == "in":
+        values = set(value)
+        return lambda v: v in values
+    if op == "between":
+        first, last = value
+        return lambda v: first <= v <= last
+    if op == "^=":
+        return lambda v: v.startswith(value)
+    if op == "~=":
+        lowered = value.lower()
+        return lambda v: lowered in v.lower()
+    return {"=": lambda v: v == value, "!=": lambda v: v != value, "<": lambda v: v < value,
+            "<=": lambda v: v <= value, ">": lambda v: v > value, ">=": lambda v: v >= value}[op]
+
+
+def uses_groups(node):
+    if isinstance(node, (And, Or)):
+        return any(uses_groups(p) for p in node.parts)
+    if isinstance(node, Not):
+        return uses_groups(node.part)
+    return node.field in GROUP_FIELDS
+
+
+# ---------- planning ----------
+def conjuncts(node):
+    """
+    The conditions joined by `and` at the top of the query: every matching row meets each of them"""
+
+    return list(node.parts) if isinstance(node, And) else [node]
+
+
+def access_paths(db, node, today):
+    """
+    Every way of finding the candidate rows of the query, the cheapest (by estimate) first, the full scan last.
+    rows() of a path gives (customer id, tour group or None) pairs; None means "any group of the customer"."""
+
+    parts = conjuncts(node)
+    paths = []
+
+    for part in parts:
+        if not isinstance(part, Compare):
+            continue
+        if part.field == "id" and part.op in ("=", "in"):
+            ids = [part.value] if part.op == "=" else sorted(set(part.value))
+            paths.append(AccessPath("id hash", [part], len(ids), lambda ids=ids: ((i, None) for i in ids)))
+        elif part.field == "family_name" and part.op in ("=", "^="):
+            prefix = part.value
+            paths.append(AccessPath("name order", [part], db.count_by_family_prefix(prefix),
+                                    lambda prefix=prefix: ((i, None) for i in db.customer_ids_by_family_prefix(prefix))))
+
+    born = [(part, range_of(part, today)) for part in parts if isinstance(part, Compare) and part.field in ("age", "birthdate")]
+    born = [(part, r) for part, r in born if r is not None]
+    if born:
+        first, last = intersect([r for part, r in born])
+        paths.append(AccessPath("birthdate order", [part for part, r in born], db.count_born_between(first, last),
+                                lambda: ((i, None) for i in db.customer_ids_born_between(first, last))))
+
+    path = group_path(db, parts, today)
+    if path is not None:
+        paths.append(path)
+
+    paths.append(AccessPath("full scan", [], db.customer_count(), lambda: ((c.id, None) for c in db.customers())))
+    paths.sort(key=lambda p: (p.estimate, p.index == "full scan"))         # stable: on a tie, the order above
+    return paths
+
+
+def group_path(db, parts, today):
+    """
+    The tour groups picked by the tour, date and destination conditions, with their members as the rows"""
+
+    tours = dates = None
+    places = []
+    used = []
+    for part in parts:
+        if not isinstance(part, Compare):
+            continue
+        if part.field == "tour" and part.op in ("=", "in"):
+            wanted = {part.value} if part.op == "=" else set(part.value)
+            tours = wanted if tours is None else tours & wanted
+            used.append(part)
+        elif part.field == "date" and range_of(part, today) is not None:
+            dates = [range_of(part, today)] if dates is None else dates + [range_of(part, today)]
+            used.append(part)
+        elif part.field == "destination" and part.op in ("=", "in"):
+            places.append({part.value} if part.op == "=" else set(part.value))
+            used.append(part)
+    if not used:
+        return None
+
+    if places:
+        # the destination index: tours visiting one of the places, for every destination condition
+        tours_by_destination = {}
+        wanted_places = set().union(*places)
+        for destination, tour_list in db.destinations():
+            if destination in wanted_places:
+                tours_by_destination[destination] = set(tour_list)
+        for wanted in places:
+            visiting = set().union(*(tours_by_destination.get(place, set()) for place in wanted))
+            tours = visiting if tours is None else tours & visiting
+
+    bounds = intersect(dates) if dates else (None, None)
+    groups = [tg for tg in db.tour_groups()
+              if (tours is None or tg.header.name in tours) and in_range(tg.header.date.toordinal(), bounds)]
+    index = "destination index, (tour, date)" if places else "(tour, date)"
+    return AccessPath(index, used, sum(len(tg.member_list) for tg in groups),
+                      lambda: ((customer_id, tg) for tg in groups for customer_id in tg.member_list))
+
+
+# ---------- running ----------
+QueryResult = namedtuple("QueryResult", "customers plan")
+
+
+def run_query(db, text, today=None):
+    """
+    Find the customers the query matches, in name order. Returns QueryResult(customers, plan),
+    plan being the access paths looked at, the one used first."""
+
+    today = date.today() if today is None else today
+    node = parse(text)
+    matches = compile_query(node, today)
+    paths = access_paths(db, node, today)
+    chosen = paths[0]
+
+    needs_groups = uses_groups(node)
+    places = {}
+    groups_of = {}
+    if needs_groups:
+        places = {name: set(tour["itinerary"]) for name, tour in db.tour_details()}
+        if chosen.index in ("id hash", "name order", "birthdate order", "full scan"):
+            # rows give customers only: their groups come from the member lists
+            for tg in db.tour_groups():
+                for customer_id in tg.member_list:
+                    groups_of.setdefault(customer_id, []).append(tg)
+
+    found = {}
+    for customer_id, group in chosen.rows():
+        if customer_id in found:
+            continue
+        customer = db.get_customer(customer_id)
+        if customer is None:
+            continue
+        if group is not None:
+            ok = matches(customer, group, places)
+        elif needs_groups:
+            ok = any(matches(customer, tg, places) for tg in groups_of.get(customer_id, [None]))
+        else:
+            ok = matches(customer, None, places)
+        if ok:
+            found[customer_id] = customer
+
+    return QueryResult(sorted(found.values(), key=name_key), paths)
+
+
+def plan(db, text, today=None):
+    """
+    The access paths of the query, the one that would be used first"""
+
+    return access_paths(db, parse(text), date.today() if today is None else today)
+
+
+def explain(db, text, today=None):
+    """
+    The plan of the query as lines of text: the index chosen and the estimated rows of every index that applies"""
+
+    paths = plan(db, text, today)
+    lines = ["Query:  " + describe(parse(text))]
+    for n, path in enumerate(paths):
+        on = " on " + " and ".join(map(describe, path.conditions)) if path.conditions else ""
+        lines.append("{}{}{}: estimated {:,} rows".format("Plan:   " if n == 0 else "        ", path.index, on, path.estimate)
+                     + ("  <- chosen" if n == 0 else ""))
+    lines.append("Filter: every row read is checked against the whole query")
+    return lines
@@ -0,0 +1,138 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Rendering of tables and coloured text for the terminal.
+# Output is built up in a buffer and written with a few large writes instead of one print() per row.
+# A table works out its column widths in one pass over its cells (a column is never narrower than its set width),
+# then builds its row format once and uses it for every row.
+#
+# Colours are only used when the output is a terminal. Set ATL_COLOR=always or ATL_COLOR=never to force it,
+# NO_COLOR (any value) turns colours off as well.
+
+import os
+import sys
+from collections import namedtuple
+
+RESET = "\033[0m"
+COLOURS = {
+    "red": "\033[91m",
+    "green": "\033[92m",
+    "blue": "\033[94m",
+    "yellow": "\033[93m",
+    "magenta": "\033[95m",
+    "cyan": "\033[96m",
+}
+
+
+def use_colour(stream=None):
+    """
+    Check whether ANSI colours should be written to the stream (default stdout)"""
+
+    setting = os.environ.get("ATL_COLOR", "auto").lower()
+    if setting == "always":
+        return True
+    if setting == "never" or "NO_COLOR" in os.environ:
+        return False
+    stream = sys.stdout if stream is None else stream
+    return hasattr(stream, "isatty") and stream.isatty()
+
+
+def paint(text, colour, enabled=None):
+    """
+    Wrap the text in the ANSI code of the colour (a name in COLOURS), unless colours are off"""
+
+    if colour is None or not (use_colour() if enabled is None else enabled):
+        return text
+    return COLOURS[colour] + text + RESET
+
+
+class Buffer:
+    """
+    Collect output lines and write them to the stream in large pieces.
+    Use as a with block so that everything is written at the end."""
+
+    def __init__(self, stream=None, limit=1 << 16):
+        self._stream = sys.stdout if stream is None else stream
+        self._limit = limit
+        self._parts = []
+        self._size = 0
+
+    def write(self, s):
+        self._parts.append(s)
+        self._size += len(s)
+        if self._size >= self._limit:
+            self.flush()
+
+    def line(self, s=""):
+        self.write(s + "\n")
+
+    def flush(self):
+        if self._parts:
+            self._stream.write("".join(self._parts))
+            self._parts = []
+            self._size = 0
+        self._stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+# title: column header, width: minimum width, colour: colour of the cells (None for plain)
+Column = namedtuple("Column", "title width colour")
+
+
+class Table:
+    """
+    A table of columns drawn like this:
+        ----------------------
+        | ID    | First Name |
+        ----------------------
+        | 816   | Simon      |
+        ----------------------
+    header_colours gives the colour of each header cell (None for plain)."""
+
+    def __init__(self, columns, header_colours=None, colour=None):
+        self.columns = columns
+        self.header_colours = header_colours or [None] * len(columns)
+        self.colour = use_colour() if colour is None else colour
+
+    def _format(self, widths, colours):
+        """
+        Build the row format string for these widths and colours, e.g. "| {: <5} | \\033[92m{: <15}\\033[0m |" """
+
+        cells = []
+        for width, colour in zip(widths, colours):
+            cell = "{: <" + str(width) + "}"
+            cells.append(paint(cell, colour, self.colour))
+        return "| " + " | ".join(cells) + " |"
+
+    def render(self, rows, out, header=None, empty_text=None):
+        """
+        Write the table to the Buffer out.
+        header is the header row (default: the column titles), empty_text is shown as one wide row if there are no rows."""
+
+        header = [c.title for c in self.columns] if header is None else [("" if v is None else str(v)) for v in header]
+
+        # turn the rows into columns of strings ("" for None), then the width of a column is its widest cell
+        rows = list(rows)
+        cells = [list(map(str, column)) if None not in column else [("" if v is None else str(v)) for v in column]
+                 for column in zip(*rows)] if rows else [[] for c in self.columns]
+        widths = [max(c.width, len(h), max(map(len, column), default=0)) for c, h, column in zip(self.columns, header, cells)]
+
+        # build the formats once for all rows
+        header_format = self._format(widths, self.header_colours)
+        row_format = self._format(widths, [c.colour for c in self.columns]) + "\n"
+        rule = "-" * (sum(widths) + 3 * len(widths) + 1)
+
+        out.line(rule)
+        out.line(header_format.format(*header))
+        out.line(rule)
+        if len(rows) == 0 and empty_text is not None:
+            out.line("| {: <{}} |".format(empty_text, len(rule) - 4))
+        out.write("".join(map(row_format.format, *cells)))
+        out.line(rule)
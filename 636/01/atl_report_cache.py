@@ -0,0 +1,135 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Cache of reports (options 3 and 4): the structured results and the rendered text, kept until the data they were
+# made from changes. Tours rarely change between two views, so the second view is just printing a string.
+#
+#     reports = ReportCache(db)
+#     text = reports.get(("tour details",), [TOURS], make)      # make() only runs if there is no fresh copy
+#
+# Every entry is stamped with the data versions (see data_version() in atl_storage.py) of what it was made from,
+# and is only used while those versions are still the same, so invalidation is exact: adding a customer moves on
+# CUSTOMERS only, which leaves the tour details (made from TOURS) in the cache, changing an itinerary doesn't.
+# Entries are kept in least recently used order and dropped from the old end once the cache is over its memory budget
+# (ATL_REPORT_CACHE_BYTES, default 8 MiB; sizes are estimated with sys.getsizeof). 0 turns the cache off.
+# Only changes made through this process's backend are seen; with SQLite, changes by another process are not.
+
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import redirect_stdout
+
+from atl_render import use_colour
+
+DEFAULT_BUDGET = int(os.environ.get("ATL_REPORT_CACHE_BYTES", str(8 << 20)))
+
+
+def approximate_size(value):
+    """
+    Estimate the memory held by a value made of lists, tuples, dicts, strings and numbers (shared objects count again)"""
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(v) for v in value)
+    return size
+
+
+class Capture(io.StringIO):
+    """
+    Collects printed output. It claims to be a terminal if stdout is one, so that colours are rendered as they would be."""
+
+    def __init__(self, terminal):
+        super().__init__()
+        self._terminal = terminal
+
+    def isatty(self):
+        return self._terminal
+
+
+def rendered(display, *args):
+    """
+    Run a display function and return what it printed as a string"""
+
+    with redirect_stdout(Capture(sys.stdout.isatty())) as out:
+        display(*args)
+    return out.getvalue()
+
+
+class ReportCache:
+    """
+    Reports stamped with the data versions they were made from, least recently used first, within a memory budget"""
+
+    def __init__(self, db, budget=DEFAULT_BUDGET):
+        self.db = db
+        self.budget = budget
+        self._entries = OrderedDict()       # key -> (stamp, value, size)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def _stamp(self, topics):
+        return tuple(self.db.data_version(topic) for topic in topics)
+
+    def get(self, key, topics, make):
+        """
+        Get the report for key, made from the data of topics (CUSTOMERS, MEMBERS, TOURS).
+        make() is called to make it when there is no copy made from the current data. What it returns is kept as it is,
+        so it should be only what the report needs, in values of its own, not the backend's live structures."""
+
+        stamp = self._stamp(topics)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = make()
+        # made from data at least as new as the stamp; if something changed meanwhile, the stamp is already stale
+        self._put(key, stamp, value, approximate_size(value))
+        return value
+
+    def get_rendered(self, key, topics, display, make_data):
+        """
+        Get the text display(data) prints, data being make_data() (itself cached under key + ("data",)).
+        The text is kept apart for colour and no colour."""
+
+        def make_text():
+            return rendered(display, self.get(key + ("data",), topics, make_data))
+
+        return self.get(key + ("text", use_colour()), topics, make_text)
+
+    def _put(self, key, stamp, value, size):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[2]
+            if size > self.budget:
+                return                      # would not fit even alone
+            self._entries[key] = (stamp, value, size)
+            self._size += size
+            while self._size > self.budget:
+                _, (_, _, dropped) = self._entries.popitem(last=False)
+                self._size -= dropped
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def size(self):
+        """
+        Estimated bytes held by the cached reports"""
+
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,230 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Search customers by first name, family name and email, for finding a customer id without reading the whole list:
+#
+#     index = SearchIndex(db.customers())
+#     index.top("simone char")          # ids of the best matches: customers with a word "simone" and one starting "char"
+#     index.top("hemi")                 # finds Hēmi (macrons are folded away, and so is case)
+#     index.top("chalres")              # finds Charles (typos are matched on trigrams and edit distance)
+#
+# The names and the email are folded (lower case, macrons and other accents dropped) and split into words of letters
+# or digits: "Te Whāiti" -> te, whaiti and "simone.charles2@kiwi.nz" -> simone, charles, 2, kiwi, nz. Names repeat a lot
+# and emails are mostly made of names, so there are far fewer words than customers.
+# For each word the index keeps the ids of the customers who have it (in id order), the words themselves are kept
+# sorted, for prefix search, and split into trigrams ("  c", " ch", "cha", ... "es "), for fuzzy search.
+#
+# Every word searched for has to match a word of the customer: exactly (best), as a prefix of it, or, only when there
+# are not enough matches without, when it is spelled close enough (FUZZY_SIMILARITY of the trigrams are shared, or one
+# letter is wrong, missing, extra or swapped with the next). Customers are ranked on how well their words match, then by id.
+# A customer added to the backend is added to the index straight away (see add()).
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import merge, nsmallest
+from itertools import groupby
+
+from atl_name_order import PREFIX_END
+
+EXACT = 1.0                     # score of a word that matches exactly
+PREFIX = 0.5                    # a prefix scores between PREFIX and EXACT, the more of the word it covers the higher
+FUZZY = 0.5                     # a misspelt word scores its similarity times FUZZY
+FUZZY_SIMILARITY = 0.3          # least share of trigrams (shared / all of both words) to count as misspelt
+FUZZY_MIN_LENGTH = 4            # shorter words are only matched exactly or as prefixes
+
+WORD = re.compile(r"[^\W\d_]+|\d+")
+
+
+def fold(text):
+    """
+    Lower case text without accents, so that "Hēmi" and "hemi" are the same"""
+
+    if text.isascii():
+        return text.lower()
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch)).casefold()
+
+
+def words(text):
+    """
+    Split text into folded words, e.g. "simone.charles2@kiwi.nz" -> ["simone", "charles", "2", "kiwi", "nz"]"""
+
+    return WORD.findall(fold(text))
+
+
+def trigrams(word):
+    """
+    The trigrams of a word, padded so that the start and the end count too: "hemi" -> "  h", " he", "hem", "emi", "mi " """
+
+    padded = "  " + word + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def one_edit_apart(a, b):
+    """
+    Check whether b is a with one letter changed, left out, added, or swapped with the next one"""
+
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0                               # the first letter that differs
+    while i < len(a) and i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) > len(b):
+        return a[i + 1:] == b[i:]
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+
+
+class SearchIndex:
+    """
+    Folded words of the customers' names and emails, with the ids of the customers who have each word"""
+
+    def __init__(self, customers=()):
+        self._ids = {}                  # word -> array of customer ids, in id order
+        self._name_words = {}           # name -> its words (names repeat, so each is folded once)
+        self.last_id = 0                # highest id in the index, customers after it are added in order
+
+        unordered = False
+        for c in customers:
+            unordered = unordered or c[0] < self.last_id
+            self.last_id = max(self.last_id, c[0])
+            for word in self._words_of_customer(c[1], c[2], c[4]):
+                ids = self._ids.get(word)
+                if ids is None:
+                    ids = self._ids[word] = array("q")
+                ids.append(c[0])
+        if unordered:                   # customers don't always come in id order (atl_data doesn't)
+            for ids in self._ids.values():
+                ids[:] = array("q", sorted(ids))
+
+        self._sorted_words = sorted(self._ids)      # every word, for prefix search
+        self._trigrams = {}                         # trigram -> words that have it
+        for word in self._sorted_words:
+            self._add_trigrams(word)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _words_of_name(self, name):
+        found = self._name_words.get(name)
+        if found is None:
+            found = self._name_words[name] = tuple(words(name))
+        return found
+
+    def _words_of_customer(self, first_name, family_name, email):
+        return set(self._words_of_name(first_name) + self._words_of_name(family_name) + tuple(words(email)))
+
+    def _add_trigrams(self, word):
+        for trigram in trigrams(word):
+            self._trigrams.setdefault(trigram, []).append(word)
+
+    def add(self, customer):
+        """
+        Add a new customer (a Customer, or the same fields in a list) to the index"""
+
+        customer_id = customer[0]
+        for word in self._words_of_customer(customer[1], customer[2], customer[4]):
+            ids = self._ids.get(word)
+            if ids is None:
+                ids = self._ids[word] = array("q")
+                insort(self._sorted_words, word)
+                self._add_trigrams(word)
+            if customer_id > self.last_id:
+                ids.append(customer_id)
+            else:                       # not the newest id: keep the ids in order
+                ids.insert(bisect_left(ids, customer_id), customer_id)
+        self.last_id = max(self.last_id, customer_id)
+
+    def matches(self, word, misspelt=False):
+        """
+        The words of the index that the search word matches, with their scores, best first.
+        With misspelt, words spelled close to it match too."""
+
+        scores = {}
+        if word in self._ids:
+            scores[word] = EXACT
+        start = bisect_left(self._sorted_words, word)
+        stop = bisect_left(self._sorted_words, word + PREFIX_END, lo=start)
+        for found in self._sorted_words[start:stop]:
+            if found != word:
+                scores[found] = PREFIX + (EXACT - PREFIX) * len(word) / (len(found) + 1)
+
+        if misspelt and len(word) >= FUZZY_MIN_LENGTH:
+            wanted = trigrams(word)
+            shared = Counter(found for trigram in wanted for found in self._trigrams.get(trigram, ()))
+            # one wrong letter spoils at most 3 of the trigrams, two swapped letters at most 4
+            least = max(1, min(len(wanted) - 4, FUZZY_SIMILARITY * len(wanted)))
+            for found, n in shared.items():
+                if n < least or found in scores:
+                    continue
+                similarity = n / (len(wanted) + len(trigrams(found)) - n)
+                if similarity < FUZZY_SIMILARITY and one_edit_apart(word, found):
+                    similarity = FUZZY_SIMILARITY
+                if similarity >= FUZZY_SIMILARITY:
+                    scores[found] = FUZZY * similarity
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def top(self, text, limit=10):
+        """
+        Get the ids of the (at most limit) customers who match every word of text best, best first.
+        Misspellings are only looked for when there are fewer than limit customers without them."""
+
+        wanted = list(dict.fromkeys(words(text)))
+        if len(wanted) == 0 or limit <= 0:
+            return []
+        result = self._top([self.matches(word) for word in wanted], limit)
+        if len(result) < limit:
+            seen = set(result)
+            more = self._top([self.matches(word, misspelt=True) for word in wanted], limit)
+            result += [customer_id for customer_id in more if customer_id not in seen][:limit - len(result)]
+        return result
+
+    def _top(self, found, limit):
+        """
+        The best limit customers, found being the (word, score) matches of each word searched for"""
+
+        if any(len(f) == 0 for f in found):
+            return []
+
+        if len(found) == 1:
+            # one word: the customers of the best matching words, in id order, until there are enough.
+            # A customer can have more than one of the words, the first time is the best.
+            result = {}
+            for group in _by_score(found[0]):
+                for customer_id in merge(*(self._ids[w] for w in group)):
+                    result.setdefault(customer_id, None)
+                    if len(result) == limit:
+                        return list(result)
+            return list(result)
+
+        # more words: start from the word with the fewest customers, and keep only those who also match the others
+        found.sort(key=lambda f: sum(len(self._ids[w]) for w, _ in f))
+        scores = {}
+        for w, score in reversed(found[0]):         # best last, so that it is the one kept
+            for customer_id in self._ids[w]:
+                scores[customer_id] = score
+        for f in found[1:]:
+            best = {}
+            for w, score in reversed(f):
+                for customer_id in self._ids[w]:
+                    if customer_id in scores:
+                        best[customer_id] = score
+            scores = {customer_id: scores[customer_id] + score for customer_id, score in best.items()}
+            if len(scores) == 0:
+                return []
+        return [customer_id for _, customer_id in nsmallest(limit, ((-score, customer_id) for customer_id, score in scores.items()))]
+
+
+def _by_score(matched):
+    """
+    Group (word, score) pairs, best first, into lists of the words with the same score"""
+
+    for _, group in groupby(matched, key=lambda item: item[1]):
+        yield [w for w, _ in group]
@@ -0,0 +1,313 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# HTTP/JSON server so that many clerks and tools share one running instance (standard library only, asyncio).
+#
+# Run: python atl_server.py [--host 127.0.0.1] [--port 8080]        storage from ATL_STORAGE etc. (see atl_storage.py)
+#
+#   GET  /customers                  customers in (family name, first name) order, ?offset=&limit=
+#                                    ?family_name=Char  only customers whose family name starts with Char
+#   GET  /customers/<id>             one customer
+#   POST /customers                  {"first_name", "family_name", "birth_date": "dd/mm/yyyy", "email"}  -> 201 with the new id
+#   GET  /groups                     tour groups in (tour, date) order, with member ids in name order
+#   GET  /tours                      tours with age restriction and itinerary
+#   GET  /destinations               destinations with the tours that visit them
+#   POST /enrollments                {"customer_id", "tour", "date": "dd/mm/yyyy"} or a list of them  -> a result per row
+#
+# Records look like the JSON output of atl_cli.py. Lists are streamed with chunked transfer encoding,
+# a page of records per chunk, so a list of a million customers is never built up in memory,
+# and a slow client only holds up its own connection. Connections are kept alive (HTTP/1.1) until idle for IDLE_TIMEOUT.
+#
+# Concurrency: every request is handled on the one event loop thread, and the storage backend is only used from it.
+# A backend call never awaits, so each write (add a customer, a batch of enrollments) is done from start to end
+# before any other request runs: writes are never interleaved with each other or with reads.
+# A streamed list awaits between pages, so other requests run in between. It is read from a snapshot taken when the
+# request starts (see atl_versions.py), so a list is the data as it was then, whatever is added while it is sent;
+# each page carries on after the last record sent (keyset cursor), so a list never repeats or skips a record.
+
+import argparse
+import asyncio
+import json
+import traceback
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from atl_cli import CUSTOMER_FIELDS, DESTINATION_FIELDS, GROUP_FIELDS, TOUR_FIELDS, plain
+
+PAGE_SIZE = 500                     # records per chunk of a streamed list
+IDLE_TIMEOUT = 15                   # seconds a kept-alive connection may wait for its next request
+MAX_HEADER = 16 * 1024
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def is_whole_number(s):
+    """
+    Check whether s is a whole number int() can read: ASCII digits only (isdigit() also passes "²")"""
+
+    return s.isascii() and s.isdecimal()
+
+
+def record(fields, row):
+    return json.dumps(dict(zip(fields, map(plain, row))), ensure_ascii=False)
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        self.method = method
+        url = urlsplit(target)
+        self.path = unquote(url.path).rstrip("/") or "/"
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            raise HTTPError(400, "The body is not valid JSON")
+
+    def int_param(self, name, default=None):
+        value = self.query.get(name)
+        if value is None:
+            return default
+        if not is_whole_number(value):
+            raise HTTPError(400, "{} must be a whole number".format(name))
+        return int(value)
+
+
+async def read_request(reader):
+    """
+    Read one request from the connection, None if the client closed it"""
+
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, "Request headers are too large")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(400, "Bad request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    headers[":version"] = version
+
+    length = headers.get("content-length", "0") or "0"
+    if not is_whole_number(length):
+        raise HTTPError(400, "Content-Length must be a whole number")
+    length = int(length)
+    if length > MAX_BODY:
+        raise HTTPError(413, "Request body is too large")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method, target, headers, body)
+
+
+def keep_alive(request):
+    connection = request.headers.get("connection", "").lower()
+    if request.headers[":version"] == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+def head(status, keep, extra):
+    lines = ["HTTP/1.1 {} {}".format(status, REASONS.get(status, "")), "Content-Type: application/json; charset=utf-8",
+             "Connection: " + ("keep-alive" if keep else "close")] + extra
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send_json(writer, status, value, keep):
+    body = json.dumps(value, ensure_ascii=False, default=plain).encode("utf-8")
+    writer.write(head(status, keep, ["Content-Length: {}".format(len(body))]) + body)
+    await writer.drain()
+
+
+async def send_stream(writer, pages, keep):
+    """
+    Send a JSON array with chunked transfer encoding, one chunk per page of JSON records (pages is a generator)"""
+
+    def chunk(s):
+        data = s.encode("utf-8")
+        return b"%x\r\n%s\r\n" % (len(data), data)
+
+    writer.write(head(200, keep, ["Transfer-Encoding: chunked"]) + chunk("["))
+    separator = "\n"
+    try:
+        for page in pages:
+            if page:
+                writer.write(chunk(separator + ",\n".join(page)))
+                separator = ",\n"
+                await writer.drain()        # wait for slow clients here, and let other requests run
+    finally:
+        pages.close()                       # release the snapshot now, also if the client went away
+    writer.write(chunk("\n]\n") + b"0\r\n\r\n")
+    await writer.drain()
+
+
+class Server:
+    """
+    The routes of the API over one storage backend, with snapshots (a VersionedBackend, see atl_versions.py)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    # ---------- reads ----------
+    def customer_pages(self, offset, limit, family_name):
+        """
+        Pages of customer records in name order, fetched one page at a time with keyset cursors"""
+
+        # (prefix, "", 0) comes just before the first customer whose family name starts with prefix
+        after = None if family_name is None else (family_name, "", 0)
+        skip, left = offset, limit
+        with self.db.snapshot() as view:
+            while left is None or left > 0:
+                size = PAGE_SIZE if left is None else min(PAGE_SIZE, left)
+                customers = view.customer_page(after, size, skip)
+                skip = 0
+                if family_name is not None:
+                    customers = [c for c in customers if c.family_name.startswith(family_name)]
+                if not customers:
+                    return
+                yield [record(CUSTOMER_FIELDS, c) for c in customers]
+                if left is not None:
+                    left -= len(customers)
+                if len(customers) < size:
+                    return
+                after = (customers[-1].family_name, customers[-1].first_name, customers[-1].id)
+
+    def group_pages(self):
+        after = None
+        with self.db.snapshot() as view:
+            while True:
+                groups = view.tour_group_page(after, PAGE_SIZE)
+                if not groups:
+                    return
+                yield [record(GROUP_FIELDS, (tg.header.name, tg.header.date, tg.age_restriction,
+                                             [c.id for c in view.group_members_by_name(tg.header.name, tg.header.date)]))
+                       for tg in groups]
+                after = tuple(groups[-1].header)
+
+    # ---------- writes ----------
+    def add_customer(self, value):
+        from atl_validation import validate_customer
+
+        if not isinstance(value, dict):
+            raise HTTPError(400, "Send a customer as a JSON object")
+        customer, reason = validate_customer(*(str(value.get(k, "")) for k in ("first_name", "family_name", "birth_date", "email")))
+        if customer is None:
+            raise HTTPError(422, reason)
+        customer_id = self.db.add_customer(*customer)
+        return dict(zip(CUSTOMER_FIELDS, map(plain, (customer_id,) + customer)))
+
+    def enroll(self, value):
+        from atl_enroll import EnrollResult, enroll_many
+        from atl_validation import parse_date
+
+        rows, bad = [], []
+        for line, item in enumerate(value if isinstance(value, list) else [value], 1):
+            try:
+                rows.append((line, int(item["customer_id"]), str(item["tour"]), parse_date(str(item["date"]))))
+            except (TypeError, KeyError, ValueError):
+                bad.append(EnrollResult(line, None, None, None, False, "Incorrect customer id, tour or date format"))
+        results = sorted(enroll_many(self.db, rows) + bad, key=lambda r: r.line)
+        return [dict(zip(EnrollResult._fields, map(plain, r))) for r in results]
+
+    # ---------- routing ----------
+    async def respond(self, request, writer, keep):
+        db = self.db
+        route = (request.method, request.path)
+        parts = request.path.split("/")
+
+        if route == ("GET", "/customers"):
+            pages = self.customer_pages(request.int_param("offset", 0), request.int_param("limit"), request.query.get("family_name"))
+            await send_stream(writer, pages, keep)
+        elif request.method == "GET" and len(parts) == 3 and parts[1] == "customers":
+            if not is_whole_number(parts[2]) or not db.customer_exists(int(parts[2])):
+                raise HTTPError(404, "Customer ID not existing")
+            await send_json(writer, 200, dict(zip(CUSTOMER_FIELDS, map(plain, db.get_customer(int(parts[2]))))), keep)
+        elif route == ("POST", "/customers"):
+            await send_json(writer, 201, self.add_customer(request.json()), keep)
+        elif route == ("GET", "/groups"):
+            await send_stream(writer, self.group_pages(), keep)
+        elif route == ("GET", "/tours"):
+            await send_json(writer, 200, [dict(zip(TOUR_FIELDS, (name, tour["age_restriction"], tour["itinerary"])))
+                                          for name, tour in db.tour_details()], keep)
+        elif route == ("GET", "/destinations"):
+            await send_json(writer, 200, [dict(zip(DESTINATION_FIELDS, row)) for row in db.destinations()], keep)
+        elif route == ("POST", "/enrollments"):
+            results = self.enroll(request.json())
+            await send_json(writer, 200 if all(r["enrolled"] for r in results) else 422, results, keep)
+        elif request.path in ("/customers", "/groups", "/tours", "/destinations", "/enrollments"):
+            raise HTTPError(405, "{} is not allowed on {}".format(request.method, request.path))
+        else:
+            raise HTTPError(404, "No such path: {}".format(request.path))
+
+    async def handle(self, reader, writer):
+        """
+        Serve the requests of one connection, one after another, until the client closes it or it is idle too long"""
+
+        try:
+            while True:
+                keep = False
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+                    if request is None:
+                        break
+                    keep = keep_alive(request)
+                    await self.respond(request, writer, keep)
+                except HTTPError as e:
+                    await send_json(writer, e.status, {"error": str(e)}, keep)
+                except (asyncio.TimeoutError, ConnectionError):
+                    raise
+                except Exception:
+                    # a bug, or the storage failing: log it here, tell the client only that it failed,
+                    # and close the connection as its state is unknown
+                    traceback.print_exc()
+                    keep = False
+                    await send_json(writer, 500, {"error": "Internal server error"}, keep)
+                if not keep:
+                    break
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(db, host, port):
+    server = await asyncio.start_server(Server(db).handle, host, port, limit=MAX_HEADER)
+    print("Serving on http://{}:{}".format(host, port), flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    from atl_storage import open_storage
+    from atl_versions import VersionedBackend
+
+    parser = argparse.ArgumentParser(description="HTTP/JSON server for the Aotearoa Tours Management System")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    db = VersionedBackend(open_storage())
+    try:
+        asyncio.run(serve(db, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
@@ -0,0 +1,284 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Binary snapshot of an atl_data-shaped module (tours + customers), read through mmap.
+# Importing a huge atl_data.py means compiling and running a huge Python literal;
+# the snapshot is built once and then opened in no time, records are only decoded when they are read.
+#
+# Build:   python atl_snapshot.py atl_data atl_data.snap          (any module with the atl_data schema)
+# Use:     ATL_STORAGE=snapshot ATL_SNAPSHOT=atl_data.snap python atl_Yongzhen_Jiang.py
+# SnapshotWriter writes a snapshot from a stream of customers without holding them in memory (used by atl_generate.py).
+#
+# File layout (little endian):
+#   header     : magic "ATLSNAP1", customer count, string count, then the offset of each section
+#   customers  : fixed-width records sorted by id: id (int64), birthdate ordinal (int32),
+#                first name, family name, email (uint32 string numbers)
+#   strings    : (string count + 1) uint64 offsets into the UTF-8 blob that follows
+#   tours      : tour count, then per tour: name, age_restriction, itinerary, and groups with their member ids
+
+import importlib
+import mmap
+import shutil
+import struct
+import sys
+import tempfile
+from collections import OrderedDict
+from datetime import date
+
+from atl_customer_store import Customer, CustomerStore
+
+MAGIC = b"ATLSNAP1"
+HEADER = struct.Struct("<8sQQQQQ")          # magic, customers, strings, customers offset, strings offset, tours offset
+RECORD = struct.Struct("<qiIII")            # id, birthdate ordinal, first name, family name, email
+UINT32 = struct.Struct("<I")
+UINT64 = struct.Struct("<Q")
+INT32 = struct.Struct("<i")
+INT64 = struct.Struct("<q")
+
+
+class SnapshotWriter:
+    """
+    Write a snapshot file without holding it in memory: customers are added one at a time in increasing id order,
+    then the tours. Records and strings are spooled to temporary files and put together by close().
+    Strings are only looked up among the most recent string_cache ones, so a name seen long ago is stored again
+    (the file stays valid, strings may simply be repeated)."""
+
+    def __init__(self, path, string_cache=100000):
+        self._path = path
+        self._records = tempfile.TemporaryFile()
+        self._offsets = tempfile.TemporaryFile()        # end offset of every string in the blob
+        self._blob = tempfile.TemporaryFile()
+        self._tours = tempfile.TemporaryFile()
+        self._codes = OrderedDict()                     # recent strings -> string number, least recent first
+        self._string_cache = string_cache
+        self._string_count = 0
+        self._blob_size = 0
+        self._customer_count = 0
+        self._last_id = None
+        self._tour_count = 0
+
+    def string(self, s):
+        """
+        Get the string number of s, storing it if it is not among the recent strings"""
+
+        code = self._codes.get(s)
+        if code is not None:
+            self._codes.move_to_end(s)
+            return code
+        data = s.encode("utf-8")
+        self._blob.write(data)
+        self._blob_size += len(data)
+        self._offsets.write(UINT64.pack(self._blob_size))
+        code = self._string_count
+        self._string_count += 1
+        self._codes[s] = code
+        if len(self._codes) > self._string_cache:
+            self._codes.popitem(last=False)
+        return code
+
+    def add_customer(self, customer_id, first_name, family_name, birthdate, email):
+        if self._last_id is not None and customer_id <= self._last_id:
+            raise ValueError("Customers must be added in increasing id order ({} after {})".format(customer_id, self._last_id))
+        self._last_id = customer_id
+        self._records.write(RECORD.pack(customer_id, birthdate.toordinal(), self.string(first_name), self.string(family_name), self.string(email)))
+        self._customer_count += 1
+
+    def add_tour(self, name, itinerary, age_restriction, groups):
+        """
+        Add a tour, groups is a list of (date, member ids) pairs"""
+
+        section = bytearray(UINT32.pack(self.string(name)) + UINT32.pack(age_restriction) + UINT32.pack(len(itinerary)))
+        for destination in itinerary:
+            section += UINT32.pack(self.string(destination))
+        section += UINT32.pack(len(groups))
+        for group_date, member_list in groups:
+            section += INT32.pack(group_date.toordinal()) + UINT32.pack(len(member_list))
+            section += struct.pack("<{}q".format(len(member_list)), *member_list)
+        self._tours.write(section)
+        self._tour_count += 1
+
+    def close(self):
+        customers_offset = HEADER.size
+        strings_offset = customers_offset + self._customer_count * RECORD.size
+        tours_offset = strings_offset + UINT64.size * (self._string_count + 1) + self._blob_size
+
+        with open(self._path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self._customer_count, self._string_count, customers_offset, strings_offset, tours_offset))
+            for spool, head in ((self._records, b""), (self._offsets, UINT64.pack(0)), (self._blob, b""), (self._tours, UINT32.pack(self._tour_count))):
+                f.write(head)
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+                spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            for spool in (self._records, self._offsets, self._blob, self._tours):
+                spool.close()
+
+
+def write_snapshot(path, tours, customers):
+    """
+    Write atl_data-shaped tours and customers to a binary snapshot file"""
+
+    with SnapshotWriter(path) as writer:
+        for c in sorted(customers, key=lambda c: c[0]):
+            writer.add_customer(*c)
+        for name, tour in tours.items():
+            writer.add_tour(name, tour["itinerary"], tour["age_restriction"], list(tour["groups"].items()))
+
+
+def build_snapshot(module_name, path):
+    """
+    Import an atl_data-shaped module and write its tours and customers to a snapshot file"""
+
+    module = importlib.import_module(module_name)
+    write_snapshot(path, module.tours, module.customers)
+
+
+class MappedSnapshot:
+    """
+    A snapshot file mapped into memory. Nothing is decoded until it is asked for."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.customer_count, self._string_count, self._customers_offset, self._strings_offset, self._tours_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not an ATL snapshot".format(path))
+        self._blob_offset = self._strings_offset + UINT64.size * (self._string_count + 1)
+
+    def string(self, n):
+        start, end = struct.unpack_from("<QQ", self._map, self._strings_offset + UINT64.size * n)
+        return self._map[self._blob_offset + start:self._blob_offset + end].decode("utf-8")
+
+    def record(self, row):
+        """
+        The raw record at this row: (id, birthdate ordinal, first name no, family name no, email no)"""
+
+        return RECORD.unpack_from(self._map, self._customers_offset + RECORD.size * row)
+
+    def record_id(self, row):
+        return INT64.unpack_from(self._map, self._customers_offset + RECORD.size * row)[0]
+
+    def find_row(self, customer_id):
+        """
+        Binary search the records (sorted by id) for the customer id, None if the id is not existed"""
+
+        low, high = 0, self.customer_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record_id(middle) < customer_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.customer_count and self.record_id(low) == customer_id:
+            return low
+        return None
+
+    def customer(self, row):
+        customer_id, ordinal, first_name, family_name, email = self.record(row)
+        return Customer(customer_id, self.string(first_name), self.string(family_name), date.fromordinal(ordinal), self.string(email))
+
+    def tours(self):
+        """
+        Decode the tours section into an atl_data-shaped tours dict (tours are few, so they are decoded at once)"""
+
+        offset = self._tours_offset
+
+        def read(fmt):
+            nonlocal offset
+            value = fmt.unpack_from(self._map, offset)[0]
+            offset += fmt.size
+            return value
+
+        tours = {}
+        for _ in range(read(UINT32)):
+            name = self.string(read(UINT32))
+            age_restriction = read(UINT32)
+            itinerary = [self.string(read(UINT32)) for _ in range(read(UINT32))]
+            groups = {}
+            for _ in range(read(UINT32)):
+                group_date = date.fromordinal(read(INT32))
+                groups[group_date] = [read(INT64) for _ in range(read(UINT32))]
+            tours[name] = {"itinerary": itinerary, "age_restriction": age_restriction, "groups": groups}
+        return tours
+
+
+class MappedCustomerStore:
+    """
+    The customers of a snapshot with the same methods as CustomerStore.
+    Records stay in the mapped file and are decoded one at a time when read,
+    customers added after startup are kept in a small CustomerStore on top."""
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._added = CustomerStore()
+        self._max_id = snapshot.record_id(snapshot.customer_count - 1) if snapshot.customer_count else 0
+
+    def __len__(self):
+        return self._snapshot.customer_count + len(self._added)
+
+    def __iter__(self):
+        for row in range(self._snapshot.customer_count):
+            yield self._snapshot.customer(row)
+        yield from self._added
+
+    def __contains__(self, customer_id):
+        return self.exists(customer_id)
+
+    def exists(self, customer_id):
+        return self._snapshot.find_row(customer_id) is not None or self._added.exists(customer_id)
+
+    def get(self, customer_id):
+        row = self._snapshot.find_row(customer_id)
+        if row is None:
+            return self._added.get(customer_id)
+        return self._snapshot.customer(row)
+
+    def name_keys(self):
+        for row in range(self._snapshot.customer_count):
+            customer_id, ordinal, first_name, family_name = self._snapshot.record(row)[:4]
+            yield self._snapshot.string(family_name), self._snapshot.string(first_name), customer_id
+        yield from self._added.name_keys()
+
+    def get_name_key(self, customer_id):
+        row = self._snapshot.find_row(customer_id)
+        if row is None:
+            return self._added.get_name_key(customer_id)
+        first_name, family_name = self._snapshot.record(row)[2:4]
+        return self._snapshot.string(family_name), self._snapshot.string(first_name), customer_id
+
+    def birthdate_ordinals(self):
+        for row in range(self._snapshot.customer_count):
+            customer_id, ordinal = self._snapshot.record(row)[:2]
+            yield ordinal, customer_id
+        yield from self._added.birthdate_ordinals()
+
+    def get_birthdate(self, customer_id):
+        row = self._snapshot.find_row(customer_id)
+        if row is None:
+            return self._added.get_birthdate(customer_id)
+        return date.fromordinal(self._snapshot.record(row)[1])
+
+    def next_id(self):
+        return max(self._max_id, self._added.next_id() - 1) + 1
+
+    def insert(self, first_name, family_name, birthdate, email):
+        customer_id = self.next_id()
+        self._added.add(customer_id, first_name, family_name, birthdate, email)
+        return customer_id
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python atl_snapshot.py <data module, e.g. atl_data> <snapshot file>")
+        sys.exit(1)
+    build_snapshot(sys.argv[1], sys.argv[2])
@@ -0,0 +1,573 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Storage backends. The menu functions only talk to a backend, so the same menu runs against either:
+#   MemoryBackend - the atl_data dicts/lists with the in-memory indexes (customer store, tour groups, destinations, birth dates)
+#   SQLiteBackend - a local SQLite database file, indexed on customer id, (tour, date), membership and destination
+#
+# Choose the backend with environment variables:
+#   ATL_STORAGE=memory (default), ATL_STORAGE=sqlite or ATL_STORAGE=snapshot
+#   ATL_DB=path of the SQLite file (default atl.db). An empty database is filled from atl_data the first time.
+#   ATL_JOURNAL=directory, only for the memory backend: every change is journaled there and reloaded on restart (see atl_journal.py)
+#   ATL_SNAPSHOT=path of a binary snapshot (default atl_data.snap), for the snapshot backend: the memory backend with
+#                customers memory-mapped from the snapshot instead of imported from atl_data (see atl_snapshot.py)
+#
+# Every change made through a backend moves on the data version of what it touched (data_version(CUSTOMERS), etc.),
+# so that cached reports know when they are stale (see atl_report_cache.py). Each change takes a new number from one
+# counter, so two changes at once from different threads still both move the version away from anything seen before.
+
+import itertools
+import os
+import sqlite3
+from contextlib import contextmanager, nullcontext
+from datetime import date
+from itertools import groupby
+
+from atl_customer_store import Customer, CustomerStore
+from atl_destinations import DestinationIndex
+from atl_eligibility import EligibilityIndex, birthdate_cutoff
+from atl_name_order import PREFIX_END, GroupNameOrder, NameOrder
+from atl_search import SearchIndex
+from atl_tour_groups import MemberList, TourGroup, TourGroupHeader, TourGroupIndex
+
+# what a change touches, for data_version()
+CUSTOMERS = "customers"         # a customer added
+MEMBERS = "members"             # a customer added to a tour group
+TOURS = "tours"                 # an itinerary changed
+
+
+class DataVersions:
+    """
+    The data version of each kind of change, 0 until the first change of that kind"""
+
+    def __init__(self):
+        self._changes = itertools.count(1)
+        self._versions = {CUSTOMERS: 0, MEMBERS: 0, TOURS: 0}
+
+    def changed(self, topic):
+        self._versions[topic] = next(self._changes)
+
+    def __getitem__(self, topic):
+        return self._versions[topic]
+
+
+class MemoryBackend:
+    """
+    Keep tours and customers in memory, as atl_data has them, with indexes on top.
+    customer_store can be given instead of customers, e.g. customers mapped from a snapshot file."""
+
+    def __init__(self, tours, customers=(), customer_store=None):
+        self.tours = tours
+        self.customer_store = CustomerStore(customers) if customer_store is None else customer_store
+        self.group_index = TourGroupIndex(tours)
+        self.destination_index = DestinationIndex(tours)
+        self.eligibility_index = EligibilityIndex(self.customer_store)
+        self.name_order = NameOrder(self.customer_store)
+        self.group_name_order = GroupNameOrder(self.customer_store)
+        self.search_index = None            # built the first time a customer is searched for
+        self.versions = DataVersions()
+
+    # ---------- customers ----------
+    def customers(self):
+        """
+        Get all customers, as a sized iterable of Customer"""
+
+        return self.customer_store
+
+    def customer_count(self):
+        return len(self.customer_store)
+
+    def customers_by_name(self, start=0, stop=None):
+        """
+        Get the customers at positions start to stop in (family name, first name, id) order, e.g. (0, 10) for the top 10"""
+
+        return map(self.customer_store.get, self.name_order.range(start, stop))
+
+    def customer_page(self, after=None, limit=20, skip=0):
+        """
+        Get up to limit customers in (family name, first name, id) order that come after the key `after`
+        (None = from the start), skipping the first `skip` of them"""
+
+        return list(map(self.customer_store.get, self.name_order.after(after, limit, skip)))
+
+    def customer_exists(self, customer_id):
+        return self.customer_store.exists(customer_id)
+
+    # indexed lookups for queries (see atl_query.py): the count is cheap, to choose the index, then the ids
+    def count_by_family_prefix(self, prefix):
+        start, stop = self.name_order.family_prefix(prefix)
+        return stop - start
+
+    def customer_ids_by_family_prefix(self, prefix):
+        """
+        Get the ids of the customers whose family name starts with prefix, in name order"""
+
+        return self.name_order.range(*self.name_order.family_prefix(prefix))
+
+    def count_born_between(self, first=None, last=None):
+        start, stop = self.eligibility_index.born_between(first, last)
+        return stop - start
+
+    def customer_ids_born_between(self, first=None, last=None):
+        """
+        Get the ids of the customers born between the date ordinals first and last (both included, None = no limit)"""
+
+        return self.eligibility_index.ids_at(*self.eligibility_index.born_between(first, last))
+
+    def search_customers(self, text, limit=10):
+        """
+        Get the (at most limit) customers whose names and email match text best, best first (see atl_search.py)"""
+
+        if self.search_index is None:
+            self.search_index = SearchIndex(self.customer_store)
+        return [self.customer_store.get(customer_id) for customer_id in self.search_index.top(text, limit)]
+
+    def get_customer(self, customer_id):
+        return self.customer_store.get(customer_id)
+
+    def customer_birthdate(self, customer_id):
+        if not self.customer_store.exists(customer_id):
+            return None
+        return self.customer_store.get_birthdate(customer_id)
+
+    def add_customer(self, first_name, family_name, birthdate, email):
+        """
+        Add a new customer with the next available id, and return the new id"""
+
+        customer_id = self.customer_store.insert(first_name, family_name, birthdate, email)
+        self.eligibility_index.add(customer_id, birthdate)
+        self.name_order.add(customer_id)
+        if self.search_index is not None:
+            self.search_index.add(Customer(customer_id, first_name, family_name, birthdate, email))
+        self.versions.changed(CUSTOMERS)
+        return customer_id
+
+    # ---------- tour groups ----------
+    def tour_groups(self, name_descending=False, date_descending=False):
+        """
+        Get all tour groups as a list of TourGroup, sorted by tour name and then tour date"""
+
+        return self.group_index.view(name_descending, date_descending)
+
+    def group_count(self):
+        return len(self.group_index)
+
+    def tour_group_page(self, after=None, limit=10, skip=0):
+        """
+        Get up to limit tour groups in (tour name, tour date) order that come after the key `after`
+        (None = from the start), skipping the first `skip` of them"""
+
+        return self.group_index.page(after, limit, skip)
+
+    def group_age_restriction(self, tour_name, tour_date):
+        """
+        Get the age restriction of the group (tour name, tour date), None if the group is not existed"""
+
+        group = self.group_index.find(tour_name, tour_date)
+        return None if group is None else group.age_restriction
+
+    def tour_group(self, tour_name, tour_date):
+        """
+        Get the TourGroup (tour name, tour date), None if the group is not existed"""
+
+        return self.group_index.find(tour_name, tour_date)
+
+    def is_member(self, tour_name, tour_date, customer_id):
+        if not _is_sqlite_integer(customer_id):
+            return False
+        return customer_id in self.group_index.find(tour_name, tour_date).member_list
+
+    def group_members_by_name(self, tour_name, tour_date):
+        """
+        Get the members of the group (tour name, tour date) as Customer, in (family name, first name, id) order"""
+
+        member_list = self.group_index.find(tour_name, tour_date).member_list
+        return map(self.customer_store.get, self.group_name_order.members(tour_name, tour_date, member_list))
+
+    def add_member(self, tour_name, tour_date, customer_id):
+        self.group_index.add_member(tour_name, tour_date, customer_id)
+        self.group_name_order.add(tour_name, tour_date, customer_id)
+        self.versions.changed(MEMBERS)
+
+    def is_eligible(self, customer_id, age_restriction):
+        return self.eligibility_index.is_eligible(customer_id, age_restriction)
+
+    def eligible_groups(self, customer_id, tour_group_list):
+        return self.eligibility_index.eligible_groups(customer_id, tour_group_list)
+
+    # ---------- tours and destinations ----------
+    def tour_details(self):
+        """
+        Get (tour name, tour) pairs sorted by tour name, tour is a dict with "itinerary" and "age_restriction" """
+
+        return sorted(self.tours.items(), key=lambda x: x[0])
+
+    def destinations(self):
+        """
+        Get (destination, tour_list) pairs sorted by destination, tour_list is sorted by tour name"""
+
+        return iter(self.destination_index)
+
+    def set_itinerary(self, tour_name, itinerary):
+        self.destination_index.set_itinerary(tour_name, itinerary)
+        self.versions.changed(TOURS)
+
+    def data_version(self, topic):
+        """
+        Get the data version of CUSTOMERS, MEMBERS or TOURS, which changes with every change of that kind"""
+
+        return self.versions[topic]
+
+    def batch(self):
+        """
+        Group many changes together (used by bulk operations), nothing to do in memory"""
+
+        return nullcontext(self)
+
+    def close(self):
+        pass
+
+
+# ---------- SQLite ----------
+# Dates are stored as date.toordinal() integers so that they sort and compare as numbers.
+# Statements are module constants: sqlite3 prepares each distinct SQL string once and reuses it from its statement cache.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id          INTEGER PRIMARY KEY,            -- rowid, so lookup by id is the table's own b-tree
+    first_name  TEXT NOT NULL,
+    family_name TEXT NOT NULL,
+    birthdate   INTEGER NOT NULL,
+    email       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS customers_birthdate ON customers (birthdate);
+CREATE INDEX IF NOT EXISTS customers_name ON customers (family_name, first_name, id);
+
+CREATE TABLE IF NOT EXISTS tours (
+    name            TEXT PRIMARY KEY,
+    age_restriction INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS itinerary (
+    tour        TEXT NOT NULL REFERENCES tours (name),
+    position    INTEGER NOT NULL,
+    destination TEXT NOT NULL,
+    PRIMARY KEY (tour, position)
+);
+CREATE INDEX IF NOT EXISTS itinerary_destination ON itinerary (destination, tour);
+
+CREATE TABLE IF NOT EXISTS tour_groups (
+    tour TEXT NOT NULL REFERENCES tours (name),
+    date INTEGER NOT NULL,
+    PRIMARY KEY (tour, date)
+);
+
+CREATE TABLE IF NOT EXISTS members (
+    seq         INTEGER PRIMARY KEY,            -- keeps the order customers joined the group
+    tour        TEXT NOT NULL,
+    date        INTEGER NOT NULL,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    UNIQUE (tour, date, customer_id),
+    FOREIGN KEY (tour, date) REFERENCES tour_groups (tour, date)
+);
+CREATE INDEX IF NOT EXISTS members_customer ON members (customer_id);
+"""
+
+SQL_COUNT_CUSTOMERS = "SELECT COUNT(*) FROM customers"
+SQL_ALL_CUSTOMERS = "SELECT id, first_name, family_name, birthdate, email FROM customers ORDER BY id"
+SQL_CUSTOMER_PAGE = ("SELECT id, first_name, family_name, birthdate, email FROM customers "
+                     "ORDER BY family_name, first_name, id LIMIT ? OFFSET ?")
+SQL_CUSTOMER_PAGE_AFTER = ("SELECT id, first_name, family_name, birthdate, email FROM customers "
+                           "WHERE (family_name, first_name, id) > (?, ?, ?) ORDER BY family_name, first_name, id LIMIT ? OFFSET ?")
+SQL_CUSTOMERS_AFTER_ID = "SELECT id, first_name, family_name, birthdate, email FROM customers WHERE id > ? ORDER BY id"
+SQL_GET_CUSTOMER = "SELECT id, first_name, family_name, birthdate, email FROM customers WHERE id = ?"
+SQL_GET_BIRTHDATE = "SELECT birthdate FROM customers WHERE id = ?"
+SQL_COUNT_BY_FAMILY_PREFIX = "SELECT COUNT(*) FROM customers WHERE family_name >= ? AND family_name < ?"
+SQL_IDS_BY_FAMILY_PREFIX = "SELECT id FROM customers WHERE family_name >= ? AND family_name < ? ORDER BY family_name, first_name, id"
+SQL_COUNT_BORN_BETWEEN = "SELECT COUNT(*) FROM customers WHERE birthdate BETWEEN ? AND ?"
+SQL_IDS_BORN_BETWEEN = "SELECT id FROM customers WHERE birthdate BETWEEN ? AND ? ORDER BY birthdate"
+SQL_INSERT_CUSTOMER = "INSERT INTO customers (id, first_name, family_name, birthdate, email) VALUES (?, ?, ?, ?, ?)"
+SQL_INSERT_TOUR = "INSERT INTO tours (name, age_restriction) VALUES (?, ?)"
+SQL_INSERT_STOP = "INSERT INTO itinerary (tour, position, destination) VALUES (?, ?, ?)"
+SQL_DELETE_ITINERARY = "DELETE FROM itinerary WHERE tour = ?"
+SQL_INSERT_GROUP = "INSERT INTO tour_groups (tour, date) VALUES (?, ?)"
+SQL_INSERT_MEMBER = "INSERT INTO members (tour, date, customer_id) VALUES (?, ?, ?)"
+SQL_GROUP_AGE = "SELECT t.age_restriction FROM tour_groups g JOIN tours t ON t.name = g.tour WHERE g.tour = ? AND g.date = ?"
+SQL_IS_MEMBER = "SELECT 1 FROM members WHERE tour = ? AND date = ? AND customer_id = ?"
+SQL_GROUPS = ("SELECT g.tour, g.date, t.age_restriction FROM tour_groups g JOIN tours t ON t.name = g.tour "
+              "ORDER BY g.tour {}, g.date {}")
+SQL_MEMBERS = "SELECT tour, date, customer_id FROM members ORDER BY seq"
+SQL_COUNT_GROUPS = "SELECT COUNT(*) FROM tour_groups"
+SQL_GROUP_PAGE = ("SELECT g.tour, g.date, t.age_restriction FROM tour_groups g JOIN tours t ON t.name = g.tour "
+                  "ORDER BY g.tour, g.date LIMIT ? OFFSET ?")
+SQL_GROUP_PAGE_AFTER = ("SELECT g.tour, g.date, t.age_restriction FROM tour_groups g JOIN tours t ON t.name = g.tour "
+                        "WHERE (g.tour, g.date) > (?, ?) ORDER BY g.tour, g.date LIMIT ? OFFSET ?")
+SQL_GROUP_MEMBERS = "SELECT customer_id FROM members WHERE tour = ? AND date = ? ORDER BY seq"
+SQL_GROUP_MEMBERS_BY_NAME = ("SELECT c.id, c.first_name, c.family_name, c.birthdate, c.email FROM members m "
+                             "JOIN customers c ON c.id = m.customer_id WHERE m.tour = ? AND m.date = ? "
+                             "ORDER BY c.family_name, c.first_name, c.id")
+SQL_TOURS = "SELECT name, age_restriction FROM tours ORDER BY name"
+SQL_ITINERARY = "SELECT tour, destination FROM itinerary ORDER BY tour, position"
+SQL_DESTINATIONS = "SELECT DISTINCT destination, tour FROM itinerary ORDER BY destination, tour"
+
+
+def _customer_from_row(row):
+    return Customer(row[0], row[1], row[2], date.fromordinal(row[3]), row[4])
+
+
+def _is_sqlite_integer(n):
+    """
+    Check whether n fits in a SQLite INTEGER (64 bits); larger ids can't be stored, so no customer has them"""
+
+    return -(1 << 63) <= n < (1 << 63)
+
+
+def _ordinal_bounds(first, last):
+    return 1 if first is None else first, date.max.toordinal() if last is None else last
+
+
+class SQLiteCustomers:
+    """
+    All customers of a SQLite database, as a sized iterable of Customer read from a cursor"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __len__(self):
+        return self._connection.execute(SQL_COUNT_CUSTOMERS).fetchone()[0]
+
+    def __iter__(self):
+        for row in self._connection.execute(SQL_ALL_CUSTOMERS):
+            yield _customer_from_row(row)
+
+
+class SQLiteBackend:
+    """
+    Keep tours and customers in a local SQLite database file"""
+
+    def __init__(self, path, tours=None, customers=None):
+        # the connection may be shared by threads through ThreadSafeBackend, which uses it one call at a time
+        self._connection = sqlite3.connect(path, cached_statements=64, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")        # readers don't block the writer
+        self._connection.execute("PRAGMA synchronous=NORMAL")      # safe with WAL, fsync only at checkpoints
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        self._connection.executescript(SCHEMA)
+        self._batch_depth = 0
+        self.search_index = None            # kept in memory, built the first time a customer is searched for
+        self.versions = DataVersions()      # changes made through this connection only
+
+        # fill an empty database from atl_data-shaped tours and customers
+        if tours is not None and self._connection.execute("SELECT COUNT(*) FROM tours").fetchone()[0] == 0:
+            self.load(tours, customers or [])
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Commit the changes in the with block, unless they are inside batch(), which commits them all together"""
+
+        if self._batch_depth > 0:
+            yield
+        else:
+            with self._connection:
+                yield
+
+    @contextmanager
+    def batch(self):
+        """
+        Group many changes into one transaction, e.g. for bulk imports"""
+
+        outermost = self._batch_depth == 0
+        self._batch_depth += 1
+        try:
+            with self._connection if outermost else nullcontext():
+                yield self
+        finally:
+            self._batch_depth -= 1
+
+    def load(self, tours, customers):
+        """
+        Copy atl_data-shaped tours and customers into the database in one transaction"""
+
+        with self._transaction():
+            self._connection.executemany(SQL_INSERT_CUSTOMER, ((c[0], c[1], c[2], c[3].toordinal(), c[4]) for c in customers))
+            for name, tour in tours.items():
+                self._connection.execute(SQL_INSERT_TOUR, (name, tour["age_restriction"]))
+                self._connection.executemany(SQL_INSERT_STOP, ((name, i, d) for i, d in enumerate(tour["itinerary"])))
+                for group_date, member_list in tour["groups"].items():
+                    self._connection.execute(SQL_INSERT_GROUP, (name, group_date.toordinal()))
+                    self._connection.executemany(SQL_INSERT_MEMBER, ((name, group_date.toordinal(), c) for c in member_list))
+
+    # ---------- customers ----------
+    def customers(self):
+        return SQLiteCustomers(self._connection)
+
+    def customer_count(self):
+        return self._connection.execute(SQL_COUNT_CUSTOMERS).fetchone()[0]
+
+    def customers_by_name(self, start=0, stop=None):
+        limit = -1 if stop is None else max(0, stop - start)
+        return map(_customer_from_row, self._connection.execute(SQL_CUSTOMER_PAGE, (limit, start)))
+
+    def customer_page(self, after=None, limit=20, skip=0):
+        if after is None:
+            rows = self._connection.execute(SQL_CUSTOMER_PAGE, (limit, skip))
+        else:
+            rows = self._connection.execute(SQL_CUSTOMER_PAGE_AFTER, (*after, limit, skip))
+        return [_customer_from_row(row) for row in rows]
+
+    def customer_exists(self, customer_id):
+        if not _is_sqlite_integer(customer_id):
+            return False
+        return self._connection.execute(SQL_GET_BIRTHDATE, (customer_id,)).fetchone() is not None
+
+    def get_customer(self, customer_id):
+        if not _is_sqlite_integer(customer_id):
+            return None
+        row = self._connection.execute(SQL_GET_CUSTOMER, (customer_id,)).fetchone()
+        return None if row is None else _customer_from_row(row)
+
+    def customer_birthdate(self, customer_id):
+        if not _is_sqlite_integer(customer_id):
+            return None
+        row = self._connection.execute(SQL_GET_BIRTHDATE, (customer_id,)).fetchone()
+        return None if row is None else date.fromordinal(row[0])
+
+    # family names compare as UTF-8 bytes (BINARY collation), which is the same order as Python's
+    def count_by_family_prefix(self, prefix):
+        return self._connection.execute(SQL_COUNT_BY_FAMILY_PREFIX, (prefix, prefix + PREFIX_END)).fetchone()[0]
+
+    def customer_ids_by_family_prefix(self, prefix):
+        return [row[0] for row in self._connection.execute(SQL_IDS_BY_FAMILY_PREFIX, (prefix, prefix + PREFIX_END))]
+
+    def count_born_between(self, first=None, last=None):
+        return self._connection.execute(SQL_COUNT_BORN_BETWEEN, _ordinal_bounds(first, last)).fetchone()[0]
+
+    def customer_ids_born_between(self, first=None, last=None):
+        return [row[0] for row in self._connection.execute(SQL_IDS_BORN_BETWEEN, _ordinal_bounds(first, last))]
+
+    def search_customers(self, text, limit=10):
+        # the search index is kept in memory, built the first time; customers added since the last search (by any
+        # process) have higher ids, so they are read and added first
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+        for row in self._connection.execute(SQL_CUSTOMERS_AFTER_ID, (self.search_index.last_id,)):
+            self.search_index.add(_customer_from_row(row))
+        return [self.get_customer(customer_id) for customer_id in self.search_index.top(text, limit)]
+
+    def add_customer(self, first_name, family_name, birthdate, email):
+        with self._transaction():
+            # id NULL lets SQLite pick one higher than the current maximum id
+            cursor = self._connection.execute(SQL_INSERT_CUSTOMER, (None, first_name, family_name, birthdate.toordinal(), email))
+        self.versions.changed(CUSTOMERS)
+        return cursor.lastrowid
+
+    # ---------- tour groups ----------
+    def tour_groups(self, name_descending=False, date_descending=False):
+        sql = SQL_GROUPS.format("DESC" if name_descending else "ASC", "DESC" if date_descending else "ASC")
+
+        groups = {}         # (tour, date ordinal) -> TourGroup, in the order asked for
+        for name, ordinal, age_restriction in self._connection.execute(sql):
+            groups[(name, ordinal)] = TourGroup(TourGroupHeader(name, date.fromordinal(ordinal)), age_restriction, MemberList())
+        for name, ordinal, customer_id in self._connection.execute(SQL_MEMBERS):
+            groups[(name, ordinal)].member_list.append(customer_id)
+
+        return list(groups.values())
+
+    def group_count(self):
+        return self._connection.execute(SQL_COUNT_GROUPS).fetchone()[0]
+
+    def tour_group_page(self, after=None, limit=10, skip=0):
+        if after is None:
+            rows = self._connection.execute(SQL_GROUP_PAGE, (limit, skip)).fetchall()
+        else:
+            rows = self._connection.execute(SQL_GROUP_PAGE_AFTER, (after[0], after[1].toordinal(), limit, skip)).fetchall()
+
+        groups = []
+        for name, ordinal, age_restriction in rows:
+            member_list = MemberList(row[0] for row in self._connection.execute(SQL_GROUP_MEMBERS, (name, ordinal)))
+            groups.append(TourGroup(TourGroupHeader(name, date.fromordinal(ordinal)), age_restriction, member_list))
+        return groups
+
+    def group_age_restriction(self, tour_name, tour_date):
+        row = self._connection.execute(SQL_GROUP_AGE, (tour_name, tour_date.toordinal())).fetchone()
+        return None if row is None else row[0]
+
+    def tour_group(self, tour_name, tour_date):
+        age_restriction = self.group_age_restriction(tour_name, tour_date)
+        if age_restriction is None:
+            return None
+        member_list = MemberList(row[0] for row in self._connection.execute(SQL_GROUP_MEMBERS, (tour_name, tour_date.toordinal())))
+        return TourGroup(TourGroupHeader(tour_name, tour_date), age_restriction, member_list)
+
+    def group_members_by_name(self, tour_name, tour_date):
+        return map(_customer_from_row, self._connection.execute(SQL_GROUP_MEMBERS_BY_NAME, (tour_name, tour_date.toordinal())))
+
+    def is_member(self, tour_name, tour_date, customer_id):
+        if not _is_sqlite_integer(customer_id):
+            return False
+        return self._connection.execute(SQL_IS_MEMBER, (tour_name, tour_date.toordinal(), customer_id)).fetchone() is not None
+
+    def add_member(self, tour_name, tour_date, customer_id):
+        with self._transaction():
+            self._connection.execute(SQL_INSERT_MEMBER, (tour_name, tour_date.toordinal(), customer_id))
+        self.versions.changed(MEMBERS)
+
+    def is_eligible(self, customer_id, age_restriction):
+        birthdate = self._connection.execute(SQL_GET_BIRTHDATE, (customer_id,)).fetchone()[0]
+        return birthdate <= birthdate_cutoff(age_restriction, date.today()).toordinal()
+
+    def eligible_groups(self, customer_id, tour_group_list):
+        allowed = {}
+        for age_restriction in {tg.age_restriction for tg in tour_group_list}:
+            allowed[age_restriction] = self.is_eligible(customer_id, age_restriction)
+        return [tg for tg in tour_group_list if allowed[tg.age_restriction]]
+
+    # ---------- tours and destinations ----------
+    def tour_details(self):
+        itineraries = {name: [row[1] for row in rows] for name, rows in groupby(self._connection.execute(SQL_ITINERARY), key=lambda row: row[0])}
+        return [(name, {"itinerary": itineraries.get(name, []), "age_restriction": age_restriction})
+                for name, age_restriction in self._connection.execute(SQL_TOURS)]
+
+    def destinations(self):
+        for destination, rows in groupby(self._connection.execute(SQL_DESTINATIONS), key=lambda row: row[0]):
+            yield destination, [row[1] for row in rows]
+
+    def set_itinerary(self, tour_name, itinerary):
+        with self._transaction():
+            self._connection.execute(SQL_DELETE_ITINERARY, (tour_name,))
+            self._connection.executemany(SQL_INSERT_STOP, ((tour_name, i, d) for i, d in enumerate(itinerary)))
+        self.versions.changed(TOURS)
+
+    def data_version(self, topic):
+        return self.versions[topic]
+
+    def close(self):
+        self._connection.close()
+
+
+def open_storage(kind=None, path=None):
+    """
+    Open the storage backend chosen by ATL_STORAGE (memory, sqlite or snapshot)"""
+
+    kind = kind or os.environ.get("ATL_STORAGE", "memory")
+
+    if kind == "snapshot":
+        from atl_snapshot import MappedCustomerStore, MappedSnapshot, build_snapshot
+        path = path or os.environ.get("ATL_SNAPSHOT", "atl_data.snap")
+        if not os.path.exists(path):
+            build_snapshot("atl_data", path)
+        snapshot = MappedSnapshot(path)
+        return MemoryBackend(snapshot.tours(), customer_store=MappedCustomerStore(snapshot))
+
+    from atl_data import customers, tours
+
+    if kind == "memory":
+        if os.environ.get("ATL_JOURNAL"):
+            from atl_journal import JournaledBackend
+            return JournaledBackend(os.environ["ATL_JOURNAL"], tours, customers)
+        return MemoryBackend(tours, customers)
+    if kind == "sqlite":
+        return SQLiteBackend(path or os.environ.get("ATL_DB", "atl.db"), tours, customers)
+    raise ValueError("Unknown storage backend: {}".format(kind))
@@ -0,0 +1,172 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Stress run of the thread-safe backend (atl_locking.py): many threads add customers and enroll customers into
+# tour groups at the same time, then the result is checked for lost or doubled updates:
+#   every new customer got its own id, and every id can be read back with the details it was added with
+#   every enrollment reported as done is in its group exactly once, and no group has anyone twice
+#   every group holds exactly the enrollments reported as done (nothing added that was reported as rejected)
+# Meanwhile reader threads take snapshots (atl_versions.py) and check that each one stays the same while the writers
+# carry on, and that it is consistent: every member of every group is a customer of the same snapshot.
+# Once all readers are done, no old version may be left (everything reclaimed).
+#
+# Run: python atl_stress.py [--threads 16] [--rounds 2000] [--readers 4] [--unsafe]
+# --unsafe runs the same on the bare backend, without the locks, to show what goes wrong there.
+# The thread switch interval is made very short so that threads interleave as much as possible.
+
+import argparse
+import copy
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+from atl_enroll import ALREADY_MEMBER, NO_CUSTOMER, NO_GROUP, TOO_YOUNG
+
+
+def unsafe_enroll(db, customer_id, tour_name, tour_date):
+    """
+    The check-then-add of option 5 on a bare backend, for --unsafe"""
+
+    age_restriction = db.group_age_restriction(tour_name, tour_date)
+    if not db.customer_exists(customer_id):
+        return NO_CUSTOMER
+    if age_restriction is None:
+        return NO_GROUP
+    if db.is_member(tour_name, tour_date, customer_id):
+        return ALREADY_MEMBER
+    if not db.is_eligible(customer_id, age_restriction):
+        return TOO_YOUNG
+    db.add_member(tour_name, tour_date, customer_id)
+    return None
+
+
+def worker(db, enroll, number, rounds, groups, customer_ids, added, enrolled, start):
+    """
+    Alternate between adding a customer and enrolling a random customer into a random group"""
+
+    rng = random.Random(number)
+    start.wait()
+    for i in range(rounds):
+        if i % 4 == 0:
+            details = ("T{}".format(number), "R{}".format(i), date(1950 + rng.randrange(60), 1 + rng.randrange(12), 1),
+                       "t{}r{}@stress.nz".format(number, i))
+            customer_id = db.add_customer(*details)
+            added.append((customer_id, details))
+            customer_ids.append(customer_id)
+        else:
+            tour_name, tour_date = rng.choice(groups)
+            customer_id = rng.choice(customer_ids)
+            if enroll(customer_id, tour_name, tour_date) is None:
+                enrolled.append((tour_name, tour_date, customer_id))
+
+
+def reader(db, done, problems):
+    """
+    Take snapshots until the writers are done, read each one twice and check it against itself"""
+
+    while not done.is_set():
+        with db.snapshot() as view:
+            groups = [(tuple(tg.header), list(tg.member_list)) for tg in view.tour_groups()]
+            customers = [c.id for c in view.customers_by_name()]
+            if len(customers) != view.customer_count():
+                problems.append("snapshot {} lists {} customers but counts {}".format(view.version, len(customers), view.customer_count()))
+            visible = set(customers)
+            for group, members in groups:
+                if not visible.issuperset(members):
+                    problems.append("snapshot {}: {} has members that are not customers of the snapshot".format(view.version, group))
+            again = [(tuple(tg.header), list(tg.member_list)) for tg in view.tour_groups()]
+            if again != groups or [c.id for c in view.customers_by_name()] != customers:
+                problems.append("snapshot {} changed while it was read".format(view.version))
+
+
+def check(db, initial_members, added, enrolled):
+    """
+    Return a list of problems found, empty if nothing was lost or doubled"""
+
+    problems = []
+
+    ids = Counter(customer_id for customer_id, _ in added)
+    doubled_ids = [customer_id for customer_id, n in ids.items() if n > 1]
+    if doubled_ids:
+        problems.append("{} customer ids were handed out more than once, e.g. {}".format(len(doubled_ids), doubled_ids[:5]))
+    for customer_id, details in added:
+        customer = db.get_customer(customer_id)
+        if customer is None or tuple(customer[1:]) != details:
+            problems.append("customer {} reads back as {}, added as {}".format(customer_id, customer, details))
+            break
+
+    reported = Counter(enrolled)
+    doubled_enrollments = [row for row, n in reported.items() if n > 1]
+    if doubled_enrollments:
+        problems.append("{} enrollments were reported done more than once, e.g. {}".format(len(doubled_enrollments), doubled_enrollments[:3]))
+
+    for tg in db.tour_groups():
+        group = (tg.header.name, tg.header.date)
+        members = Counter(tg.member_list)
+        doubled = [c for c, n in members.items() if n > 1]
+        if doubled:
+            problems.append("{} {} has customers twice: {}".format(group[0], group[1], doubled[:5]))
+        expected = Counter(initial_members[group]) + Counter(c for name, day, c in enrolled if (name, day) == group)
+        if +members != +expected:
+            problems.append("{} {} has {} members, {} expected".format(group[0], group[1], len(members), sum(expected.values())))
+    return problems
+
+
+def run(threads, rounds, readers, unsafe):
+    from atl_data import customers, tours
+    from atl_storage import MemoryBackend
+    from atl_versions import VersionedBackend
+
+    backend = MemoryBackend(copy.deepcopy(tours), customers)
+    db = backend if unsafe else VersionedBackend(backend)
+    readers = 0 if unsafe else readers
+    enroll = (lambda *args: unsafe_enroll(backend, *args)) if unsafe else db.enroll
+
+    groups = [tuple(tg.header) for tg in db.tour_groups()]
+    initial_members = {tuple(tg.header): list(tg.member_list) for tg in db.tour_groups()}
+    customer_ids = [c.id for c in db.customers()]          # shared, new customers are enrolled by other threads too
+    added, enrolled = [], []
+    start = threading.Barrier(threads)
+
+    done = threading.Event()
+    problems = []
+    pool = [threading.Thread(target=worker, args=(db, enroll, n, rounds, groups, customer_ids, added, enrolled, start))
+            for n in range(threads)]
+    reading = [threading.Thread(target=reader, args=(db, done, problems)) for _ in range(readers)]
+    started = time.perf_counter()
+    for t in pool + reading:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for t in reading:
+        t.join()
+
+    problems += check(db, initial_members, added, enrolled)
+    if readers and db.log_size() != 0:
+        problems.append("{} old versions were not reclaimed after all snapshots were released".format(db.log_size()))
+    print("{} threads x {} rounds in {:.2f}s: {} customers added, {} enrollments done ({:.0f} operations/s), {} readers".format(
+        threads, rounds, elapsed, len(added), len(enrolled), threads * rounds / elapsed, readers))
+    for problem in problems:
+        print("LOST/DOUBLED UPDATE: " + problem)
+    if not problems:
+        print("OK: no lost or doubled updates")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress the thread-safe backend with many threads")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=4, help="threads reading snapshots meanwhile")
+    parser.add_argument("--unsafe", action="store_true", help="run on the bare backend, without locks (and without readers)")
+    args = parser.parse_args()
+
+    sys.setswitchinterval(1e-6)
+    sys.exit(1 if run(args.threads, args.rounds, args.readers, args.unsafe) else 0)
@@ -0,0 +1,144 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Tour group index: every (tour name, tour date) group of atl_data.tours, kept sorted by name then date.
+# The index is built once at startup and updated in place when groups change,
+# so listing groups never needs to flatten and sort the tours dict again.
+# Each group's member list is replaced by a MemberList, which is a list with a set for O(1) membership checks.
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# (header, age_restriction, member_list) -> (("name" "date"), age_restriction, member_list) -> (("UK", date(2023,7,10)), 0, [816,923,343])
+TourGroup = namedtuple("TourGroup", "header age_restriction member_list")
+TourGroupHeader = namedtuple("TourGroupHeader", "name date")              # header is embedded named tuple
+
+
+class MemberList(list):
+    """
+    The member list of a tour group. It is still a list (customer ids in the order they joined),
+    with a set alongside so that checking and adding a member doesn't scan or copy the list.
+    A customer is only ever once in a group. Only append, extend and remove keep the set up to date,
+    other list changes are not used for member lists."""
+
+    def __init__(self, members=()):
+        super().__init__(members)
+        self._members = set(self)
+
+    def __contains__(self, customer_id):
+        return customer_id in self._members
+
+    def append(self, customer_id):
+        super().append(customer_id)
+        self._members.add(customer_id)
+
+    def extend(self, customer_ids):
+        for customer_id in customer_ids:
+            self.append(customer_id)
+
+    def remove(self, customer_id):
+        super().remove(customer_id)
+        self._members.discard(customer_id)
+
+
+class TourGroupIndex:
+    """
+    Keep all tour groups sorted by (tour name, tour date), and keep the tours dict up to date when a group changes."""
+
+    def __init__(self, tours):
+        self._tours = tours
+        self._keys = []             # sorted (name, date), used to bisect
+        self._groups = []           # TourGroup at the same position as its key
+
+        for name, tour in tours.items():
+            for group_date, member_list in tour["groups"].items():
+                self._keys.append((name, group_date))
+
+        self._keys.sort()
+        for name, group_date in self._keys:
+            tour = tours[name]
+            member_list = MemberList(tour["groups"][group_date])        # the tours dict gets the same MemberList, so both always agree
+            tour["groups"][group_date] = member_list
+            self._groups.append(TourGroup(TourGroupHeader(name, group_date), tour["age_restriction"], member_list))
+
+    def __len__(self):
+        return len(self._groups)
+
+    def __iter__(self):
+        return iter(self._groups)
+
+    def position(self, name, group_date):
+        """
+        Get the position of the group (tour name, tour date) in name/date order, None if the group is not existed"""
+
+        i = bisect_left(self._keys, (name, group_date))
+        if i < len(self._keys) and self._keys[i] == (name, group_date):
+            return i
+        return None
+
+    def find(self, name, group_date):
+        """
+        Get the group by (tour name, tour date), None if the group is not existed"""
+
+        i = self.position(name, group_date)
+        return None if i is None else self._groups[i]
+
+    def page(self, after=None, limit=10, skip=0):
+        """
+        Get up to limit groups that come after the (tour name, tour date) key `after` (None = from the start),
+        skipping the first `skip` of them"""
+
+        start = (0 if after is None else bisect_right(self._keys, tuple(after))) + skip
+        return self._groups[start:start + limit]
+
+    def by_number(self, number):
+        """
+        Get the group by its display number (starts from 1) in name/date ascending order"""
+
+        return self._groups[number - 1]
+
+    def add_group(self, name, group_date, member_list=None):
+        """
+        Add a new tour date to an existing tour, and put it in the right position of the index"""
+
+        tour = self._tours[name]
+        member_list = MemberList(() if member_list is None else member_list)
+        tour["groups"][group_date] = member_list
+
+        i = bisect_left(self._keys, (name, group_date))
+        self._keys.insert(i, (name, group_date))
+        self._groups.insert(i, TourGroup(TourGroupHeader(name, group_date), tour["age_restriction"], member_list))
+
+    def add_member(self, name, group_date, customer_id):
+        """
+        Add the customer into the group (tour name, tour date).
+        The index and the tours dict share the same MemberList, so one append updates both"""
+
+        self._groups[self.position(name, group_date)].member_list.append(customer_id)
+
+    def view(self, name_descending=False, date_descending=False):
+        """
+        Get the groups as a list in the order asked for.
+        The index is already sorted ascending, so other orders only reverse the whole list or the dates within each tour."""
+
+        if not name_descending and not date_descending:
+            return list(self._groups)
+        if name_descending and date_descending:
+            return self._groups[::-1]
+
+        # split into runs of the same tour name, then reverse either the runs or the dates inside each run
+        runs = []
+        start = 0
+        for i in range(1, len(self._groups) + 1):
+            if i == len(self._groups) or self._keys[i][0] != self._keys[start][0]:
+                runs.append(self._groups[start:i])
+                start = i
+
+        if name_descending:
+            runs.reverse()
+        else:
+            runs = [run[::-1] for run in runs]
+
+        return [group for run in runs for group in run]
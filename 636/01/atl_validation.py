@@ -0,0 +1,121 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Validation rules for customer details, shared by the menu (one customer at a time) and the bulk importer (many at once).
+
+import re
+from datetime import date
+
+EMAIL_PATTERN = re.compile(r"^\S+@\S+\.\S+$")
+
+# 'dd/mm/yyyy' accepting exactly what datetime.strptime(s, "%d/%m/%Y") accepts, but much faster than strptime
+DATE_PATTERN = re.compile(r"^(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])/(1[0-2]|0[1-9]|[1-9])/(\d\d\d\d)$")
+
+
+def is_email(email):
+    """
+    Check email address format using regex"""
+
+    return EMAIL_PATTERN.match(email)
+
+
+def parse_date(s):
+    """
+    Parse a 'dd/mm/yyyy' date, raise ValueError if it is not a valid date"""
+
+    match = DATE_PATTERN.match(s)
+    if match is None:
+        raise ValueError("Incorrect date format")
+    return date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+
+
+def is_valid_date(birth_date, today=None):
+    """
+    Check whether the birth date is a valid date.
+    Return the date if it is valid, otherwise the reason why it is not valid"""
+
+    if today is None:
+        today = date.today()
+
+    try:
+        birth_date = parse_date(birth_date)
+
+        # check whether the date is later than today
+        if birth_date > today:
+            return "The date input is later than today"
+        # check whether the date is earlier than 110 years ago
+        elif birth_date < yearsago(110, today):
+            return "The date input is earlier than 110 years ago"
+        else:
+            return birth_date
+    except ValueError:      # Incorrect date format which should be 'dd/mm/yyyy'
+        return "Incorrect date format"
+
+
+def yearsago(years, current_date=None):
+    """
+    Calcuate the date which is a number of years ago. Need to check whether that year was a leap year and the current date is 29 Feb."""
+
+    if current_date is None:
+        current_date = date.today()
+
+    try:
+        # It was not a leap year
+        return current_date.replace(year=current_date.year - years)
+    except ValueError:
+        # Leap year and is 29 Feb, then replace the date as 28 Feb
+        return current_date.replace(year=current_date.year - years, month=2, day=28)
+
+
+def validate_customer(first_name, family_name, birth_date, email, today=None):
+    """
+    Check one customer's details with the same rules as adding a customer from the menu.
+    Return ((first_name, family_name, birthdate, email), None) if valid, otherwise (None, reason)"""
+
+    first_name = (first_name or "").strip()
+    family_name = (family_name or "").strip()
+    birth_date = (birth_date or "").strip()
+    email = (email or "").strip()
+
+    if first_name == "":
+        return None, "First name can not be empty"
+    if family_name == "":
+        return None, "Family name can not be empty"
+    if birth_date == "":
+        return None, "Birth date can not be empty"
+    if email == "":
+        return None, "Email can not be empty"
+
+    birthdate = is_valid_date(birth_date, today)
+    if type(birthdate) != date:
+        return None, birthdate
+    if not is_email(email):
+        return None, "Incorrect email format"
+
+    return (first_name, family_name, birthdate, email), None
+
+
+def validate_customers(rows, today=None):
+    """
+    Check a batch of (line number, first_name, family_name, birth_date, email) rows.
+    A row with a sixth item, the reason it couldn't be read, is rejected for that reason.
+    Return (accepted, rejected): accepted is a list of (line number, customer), rejected a list of (line number, row, reason).
+    Takes and returns plain lists, so a batch can be sent to another process."""
+
+    if today is None:
+        today = date.today()
+
+    accepted = []
+    rejected = []
+    for row in rows:
+        if len(row) > 5:
+            rejected.append((row[0], row[:5], row[5]))
+            continue
+        customer, reason = validate_customer(row[1], row[2], row[3], row[4], today)
+        if customer is None:
+            rejected.append((row[0], row, reason))
+        else:
+            accepted.append((row[0], customer))
+    return accepted, rejected
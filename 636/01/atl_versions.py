@@ -0,0 +1,245 @@
+# ============== AOTEAROA TOURISM MANAGEMENT SYSTEM ==============
+# Student Name: Yongzhen Jiang
+# Student ID :  1162376
+# ================================================================
+
+# Point-in-time snapshots for long reports, so that a report never blocks writers and never sees half of a change.
+#
+#     with db.snapshot() as view:
+#         display_customer_by_tour_group(view.tour_groups())      # the data as it was when the snapshot was taken
+#
+# Every change is given a version number when it is made (the commit counter), and a snapshot is just the version
+# it was taken at. Customers and group members are only ever appended, so what a snapshot sees of them is the start of
+# each list: the customers and members added at or before its version. Nothing is copied when a snapshot is taken.
+# New customers get ever larger ids, so a snapshot sees the customers up to the last id given out before it.
+# For group members, the version of each member added since is kept in a small log per group,
+# which is how far into the member list a snapshot may read.
+# Tours and destinations are small and rarely change: they are copied when an itinerary changes (copy-on-write)
+# and a snapshot keeps the copy that was current at its version.
+#
+# Old versions are reclaimed when the last snapshot that can see them is released: log entries older than the oldest
+# open snapshot are folded into the base counts, and superseded tour copies are dropped. With no snapshot open,
+# changes aren't logged at all.
+
+import threading
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import islice
+
+from atl_locking import ThreadSafeBackend
+from atl_tour_groups import MemberList, TourGroup
+
+
+class TourState:
+    """
+    A frozen copy of the tours and destinations, as tour_details() and destinations() give them"""
+
+    def __init__(self, backend):
+        self.tours = [(name, {"itinerary": list(tour["itinerary"]), "age_restriction": tour["age_restriction"]})
+                      for name, tour in backend.tour_details()]
+        self.destinations = [(destination, list(tour_list)) for destination, tour_list in backend.destinations()]
+
+
+class VersionedBackend(ThreadSafeBackend):
+    """
+    The thread-safe backend (atl_locking.py) with point-in-time snapshots for readers, see snapshot()"""
+
+    def __init__(self, backend):
+        super().__init__(backend)
+        self._commit = threading.Lock()     # held only to give out a version and log it, and to read the logs
+        self._version = 0
+        self._readers = Counter()           # version -> number of snapshots open at that version
+
+        # customers: how many there are and the last id given out, both counted only once the change has its version
+        self._customer_count = backend.customer_count()
+        if hasattr(backend, "customer_store"):
+            self._last_customer_id = backend.customer_store.next_id() - 1
+        else:
+            self._last_customer_id = max((c.id for c in backend.customers()), default=0)
+
+        # members: per group, the member count before the log, then the version of every member added since
+        self._member_base = {tuple(tg.header): len(tg.member_list) for tg in backend.tour_groups()}
+        self._member_versions = {group: array("q") for group in self._member_base}
+
+        # tours: (version, TourState) pairs, oldest first, the last one is current
+        self._tour_states = [(0, TourState(backend))]
+
+    # ---------- writers: make the change, then give it the next version ----------
+    def add_customer(self, first_name, family_name, birthdate, email):
+        with self._locked(self._customers, write=True):
+            customer_id = super().add_customer(first_name, family_name, birthdate, email)
+            with self._commit:
+                self._version += 1
+                self._customer_count += 1
+                self._last_customer_id = customer_id
+            return customer_id
+
+    def _member_added(self, tour_name, tour_date):
+        """
+        Give the member just added the next version. It is only logged if an open snapshot needs to tell it apart."""
+
+        group = (tour_name, tour_date)
+        with self._commit:
+            self._version += 1
+            if self._readers:
+                self._member_versions[group].append(self._version)
+            else:
+                self._member_base[group] += 1
+
+    def add_member(self, tour_name, tour_date, customer_id):
+        with self._locked(self._group(tour_name, tour_date), write=True):
+            super().add_member(tour_name, tour_date, customer_id)
+            self._member_added(tour_name, tour_date)
+
+    def enroll(self, customer_id, tour_name, tour_date):
+        with self._locked(self._group(tour_name, tour_date), write=True):
+            reason = super().enroll(customer_id, tour_name, tour_date)
+            if reason is None:
+                self._member_added(tour_name, tour_date)
+            return reason
+
+    def set_itinerary(self, tour_name, itinerary):
+        with self._locked(self._tours, write=True):
+            super().set_itinerary(tour_name, itinerary)
+            state = TourState(self.backend)             # copy-on-write: earlier snapshots keep the old copy
+            with self._commit:
+                self._version += 1
+                self._tour_states.append((self._version, state))
+                if not self._readers:
+                    del self._tour_states[:-1]
+
+    # ---------- readers ----------
+    def snapshot(self):
+        """
+        Take a snapshot of the data as it is now. Use it as a with block, or call release() when done with it."""
+
+        with self._commit:
+            self._readers[self._version] += 1
+            return Snapshot(self, self._version, self._customer_count, self._last_customer_id)
+
+    def _release(self, version):
+        with self._commit:
+            self._readers[version] -= 1
+            if self._readers[version] == 0:
+                del self._readers[version]
+            self._reclaim(min(self._readers, default=self._version))
+
+    def _reclaim(self, oldest):
+        """
+        Fold the log entries no open snapshot can tell apart (version <= oldest) into the base counts,
+        and drop the tour copies that no open snapshot uses"""
+
+        for group, versions in self._member_versions.items():
+            n = bisect_right(versions, oldest)
+            if n:
+                self._member_base[group] += n
+                del versions[:n]
+
+        n = bisect_right([version for version, state in self._tour_states], oldest)
+        if n > 1:
+            del self._tour_states[:n - 1]           # keep the copy current at the oldest version, and all newer ones
+
+    def log_size(self):
+        """
+        Number of versions still kept for open snapshots (log entries and tour copies), 0 once all are released"""
+
+        with self._commit:
+            return sum(map(len, self._member_versions.values())) + len(self._tour_states) - 1
+
+    # what a snapshot at a version sees, worked out from the logs
+    def _visible_members(self, group, version):
+        with self._commit:
+            return self._member_base[group] + bisect_right(self._member_versions[group], version)
+
+    def _tour_state(self, version):
+        with self._commit:
+            return [state for state_version, state in self._tour_states if state_version <= version][-1]
+
+
+class Snapshot:
+    """
+    A read-only view of the data at one version, with the read methods of the backends.
+    Everything read from it stays the same however many changes are made meanwhile."""
+
+    def __init__(self, db, version, customer_count, last_customer_id):
+        self._db = db
+        self.version = version
+        self._customer_count = customer_count
+        self._last_customer_id = last_customer_id       # customers with a larger id are added after the snapshot
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._db._release(self.version)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    # ---------- customers ----------
+    def _is_visible(self, customer_id):
+        return customer_id <= self._last_customer_id
+
+    def customer_count(self):
+        return self._customer_count
+
+    def customer_exists(self, customer_id):
+        return self._is_visible(customer_id) and self._db.customer_exists(customer_id)
+
+    def get_customer(self, customer_id):
+        return self._db.get_customer(customer_id) if self._is_visible(customer_id) else None
+
+    def _customers_after(self, after, page_size=500):
+        """
+        Visible customers in name order after the key `after`, read from the live name order a page at a time"""
+
+        while True:
+            page = self._db.customer_page(after, page_size)
+            yield from (c for c in page if self._is_visible(c.id))
+            if len(page) < page_size:
+                return
+            after = (page[-1].family_name, page[-1].first_name, page[-1].id)
+
+    def customer_page(self, after=None, limit=20, skip=0):
+        return list(islice(self._customers_after(after, max(limit + skip, 20)), skip, skip + limit))
+
+    def customers_by_name(self, start=0, stop=None):
+        return islice(self._customers_after(None), start, stop)
+
+    # ---------- tour groups ----------
+    def _at_version(self, tg):
+        """
+        The group as it was at the version: its members are the first ones of the live member list"""
+
+        count = self._db._visible_members(tuple(tg.header), self.version)
+        return TourGroup(tg.header, tg.age_restriction, MemberList(tg.member_list[:count]))
+
+    def tour_groups(self, name_descending=False, date_descending=False):
+        return [self._at_version(tg) for tg in self._db.tour_groups(name_descending, date_descending)]
+
+    def group_count(self):
+        return self._db.group_count()
+
+    def tour_group_page(self, after=None, limit=10, skip=0):
+        return [self._at_version(tg) for tg in self._db.tour_group_page(after, limit, skip)]
+
+    def group_members_by_name(self, tour_name, tour_date):
+        members = self._at_version(self._find_group(tour_name, tour_date)).member_list
+        return [c for c in self._db.group_members_by_name(tour_name, tour_date) if c.id in members]
+
+    def _find_group(self, tour_name, tour_date):
+        return self._db.tour_group(tour_name, tour_date)
+
+    def is_member(self, tour_name, tour_date, customer_id):
+        return customer_id in self._at_version(self._find_group(tour_name, tour_date)).member_list
+
+    # ---------- tours and destinations ----------
+    def tour_details(self):
+        return self._db._tour_state(self.version).tours
+
+    def destinations(self):
+        return iter(self._db._tour_state(self.version).destinations)